@@ -0,0 +1,117 @@
+"""
+异步文件操作模块
+阻塞的文件系统调用统一提交到有界的专用线程池执行，不占用事件循环；
+线程池大小由 IO_MAX_WORKERS 配置，app.core 与 app.lib.db 共用同一套接口
+"""
+import asyncio
+import functools
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+
+from app.core.config import settings
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """获取文件操作线程池，首次使用时创建"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(settings.IO_MAX_WORKERS), thread_name_prefix='moss-io')
+        return _executor
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """
+    在文件操作线程池中执行阻塞函数
+    Args:
+        func: 阻塞函数
+        *args, **kwargs: 函数参数
+    Returns:
+        函数的返回值
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def exists(path: str) -> bool:
+    return await run_io(os.path.exists, path)
+
+
+async def isdir(path: str) -> bool:
+    return await run_io(os.path.isdir, path)
+
+
+async def isfile(path: str) -> bool:
+    return await run_io(os.path.isfile, path)
+
+
+async def stat(path: str) -> os.stat_result:
+    return await run_io(os.stat, path)
+
+
+async def listdir(path: str) -> List[str]:
+    return await run_io(os.listdir, path)
+
+
+async def makedirs(path: str):
+    await run_io(os.makedirs, path, exist_ok=True)
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+async def remove(path: str) -> bool:
+    """
+    删除文件
+    Returns:
+        bool: 文件是否存在
+    """
+    return await run_io(_remove, path)
+
+
+async def rmtree(path: str):
+    await run_io(shutil.rmtree, path, ignore_errors=True)
+
+
+def _read_file(path: str, mode: str, encoding: str = None):
+    with open(path, mode, encoding=encoding) as f:
+        return f.read()
+
+
+def _write_file(path: str, mode: str, data, encoding: str = None):
+    # 先写入临时文件再替换，目标可能是共享内容的硬链接，不能原地截断
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, mode, encoding=encoding) as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        _remove(temp_path)
+        raise
+
+
+async def read_text(path: str) -> str:
+    return await run_io(_read_file, path, 'r', 'utf-8')
+
+
+async def read_bytes(path: str) -> bytes:
+    return await run_io(_read_file, path, 'rb')
+
+
+async def write_text(path: str, content: str):
+    await run_io(_write_file, path, 'w', content, 'utf-8')
+
+
+async def write_bytes(path: str, content: bytes):
+    await run_io(_write_file, path, 'wb', content)
@@ -1,72 +1,94 @@
-import json
 import os
-import shutil
-import tempfile
+
+from app.core import aio
+from app.core.cache import read_json_cached, invalidate_json
+from app.core.journal import locate_journal, write_atomic, apply_record, MISSING, OP_SET, OP_MERGE, \
+    OP_UPSERT, OP_REMOVE, OP_DELETE
 
 
 # 确保目录存在
 async def ensure_dir(dir_path):
     try:
-        if not os.path.exists(dir_path):
-            os.makedirs(dir_path, exist_ok=True)
+        await aio.makedirs(dir_path)
     except Exception as error:
         print(f"确保目录 {dir_path} 存在时出错: {str(error)}")
 
 
-# 读取JSON文件
+# 获取数据目录，项目目录下的JSON文件通过日志写入
+def get_json_directory():
+    return os.path.join(os.getcwd(), 'local-db')
+
+
+# 读取JSON文件，包含日志中尚未写回文件的修改；结果在调用方之间共享，不应原地修改
 async def read_json_file(file_path):
-    try:
-        if not os.path.exists(file_path):
-            return None
+    journal, path = await locate_journal(file_path, get_json_directory())
+    if journal is not None:
+        return await journal.read(path)
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = f.read()
-            return json.loads(data)
+    try:
+        return await aio.run_io(read_json_cached, file_path)
+    except FileNotFoundError:
+        return None
     except Exception as error:
         print(f"读取JSON文件 {file_path} 出错: {str(error)}")
         return None
 
 
-# 写入JSON文件
+# 写入JSON文件，项目目录下的文件追加到日志，其余文件直接写入
 async def write_json_file(file_path, data):
-    # 使用临时文件策略，避免写入中断导致文件损坏
-    fd, temp_file_path = tempfile.mkstemp(suffix='.tmp')
-    os.close(fd)
-
     try:
-        # 序列化为JSON字符串
-        json_string = json.dumps(data, ensure_ascii=False, indent=2)
-
-        # 先写入临时文件
-        with open(temp_file_path, 'w', encoding='utf-8') as f:
-            f.write(json_string)
-
-        # 从临时文件读取内容并验证
-        try:
-            with open(temp_file_path, 'r', encoding='utf-8') as f:
-                written_content = f.read()
-                json.loads(written_content)  # 验证JSON是否有效
-
-            # 验证通过后，原子性地重命名文件替换原文件
-            # 确保目标目录存在
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            shutil.move(temp_file_path, file_path)
-        except Exception as validation_error:
-            # 验证失败，删除临时文件并抛出错误
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
-            raise ValueError(f"写入的JSON文件内容无效: {str(validation_error)}")
+        journal, path = await locate_journal(file_path, get_json_directory())
+        if journal is not None:
+            await journal.write(path, OP_SET, value=data)
+        else:
+            await aio.run_io(write_atomic, file_path, data)
+        return data
+    except Exception as error:
+        print(f"写入JSON文件 {file_path} 失败: {str(error)}")
+        raise
+
 
+# 直接写入JSON文件，不经过日志，用于导出等需要立即生成文件的场景
+async def write_json_snapshot(file_path, data):
+    try:
+        await aio.run_io(write_atomic, file_path, data)
         return data
     except Exception as error:
         print(f"写入JSON文件 {file_path} 失败: {str(error)}")
         raise
-    finally:
-        # 确保临时文件被删除
-        try:
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-        except:
-            pass
\ No newline at end of file
+
+
+async def _update_json_file(file_path, op, **fields):
+    journal, path = await locate_journal(file_path, get_json_directory())
+    if journal is not None:
+        await journal.write(path, op, **fields)
+        return
+
+    # 不在项目目录下的文件没有日志，读取后整体写回
+    document = await read_json_file(file_path)
+    document = apply_record(document if document is not None else MISSING, {'op': op, **fields})
+    if document is MISSING:
+        await aio.remove(file_path)
+        invalidate_json(file_path)
+    else:
+        await aio.run_io(write_atomic, file_path, document)
+
+
+# 按键替换或追加列表JSON文件中的一项，只记录该项
+async def upsert_json_record(file_path, key, item):
+    await _update_json_file(file_path, OP_UPSERT, key=key, value=item)
+
+
+# 按键删除列表JSON文件中的多项
+async def remove_json_records(file_path, key, values):
+    await _update_json_file(file_path, OP_REMOVE, key=key, values=list(values))
+
+
+# 合并字段到对象JSON文件
+async def merge_json_file(file_path, values):
+    await _update_json_file(file_path, OP_MERGE, value=values)
+
+
+# 删除JSON文件
+async def delete_json_file(file_path):
+    await _update_json_file(file_path, OP_DELETE)
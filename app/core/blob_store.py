@@ -0,0 +1,212 @@
+"""
+内容寻址存储模块
+上传的文件分块写入并同时计算SHA-256，按摘要只保存一份，项目中的文件是指向它的硬链接；
+分割结果等由内容决定的中间结果也按摘要保存，内容相同的文件直接复用
+"""
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows 上只在进程内加锁
+    fcntl = None
+
+import aiofiles
+
+from app.core.aio import get_io_executor, remove, run_io
+from app.core.base import get_json_directory, write_json_snapshot
+from app.core.cache import read_json_cached
+
+# 存储目录，位于数据目录下，所有项目共用
+BLOB_DIR = '_blobs'
+
+
+def get_blob_directory() -> str:
+    return os.path.join(get_json_directory(), BLOB_DIR)
+
+
+def get_blob_path(digest: str) -> str:
+    """按摘要的前两位分目录，避免单个目录下文件过多"""
+    return os.path.join(get_blob_directory(), digest[:2], digest)
+
+
+def get_artifact_path(digest: str, name: str) -> str:
+    return os.path.join(get_blob_directory(), digest[:2], f"{digest}.{name}.json")
+
+
+# 按摘要前两位分组的进程内锁
+_locks = [threading.Lock() for _ in range(64)]
+
+
+@contextmanager
+def _blob_lock(digest: str):
+    """
+    同一内容的保存、链接与释放串行执行，避免释放时删除了其他上传正要链接的内容；
+    文件锁同时对其他工作进程生效
+    """
+    with _locks[int(digest[:2], 16) % len(_locks)]:
+        if fcntl is None:
+            yield
+            return
+        directory = os.path.dirname(get_blob_path(digest))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _create_temp_file() -> str:
+    directory = get_blob_directory()
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix='.upload', dir=directory)
+    os.close(fd)
+    return temp_path
+
+
+class BlobTooLargeError(ValueError):
+    """写入的内容超过大小限制"""
+
+
+class BlobWriter:
+    """
+    分块写入内容并计算摘要，提交时按摘要保存，内容已存在时丢弃本次写入
+    内存占用与内容大小无关，超过大小限制时立即停止写入
+    用法：
+        async with BlobWriter(max_size) as writer:
+            await writer.write(block)
+            digest = await writer.commit(target_path)
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size
+        self.temp_path = None
+        self._file = None
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.digest = None
+
+    async def write(self, data: bytes):
+        """
+        写入一块内容
+        Raises:
+            BlobTooLargeError: 累计大小超过限制
+        """
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise BlobTooLargeError(f"文件大小超过限制 {self.max_size} 字节")
+        self._hash.update(data)
+        await self._file.write(data)
+
+    async def commit(self, target_path: Optional[str] = None) -> str:
+        """
+        保存内容
+        Args:
+            target_path: 项目中的文件路径，指定时在同一把锁内链接到保存的内容
+        Returns:
+            str: 内容的SHA-256
+        """
+        await self._file.close()
+        digest = self._hash.hexdigest()
+        await run_io(self._store, digest, target_path)
+        self.digest = digest
+        return digest
+
+    def _store(self, digest: str, target_path: Optional[str]):
+        blob_path = get_blob_path(digest)
+        with _blob_lock(digest):
+            if os.path.exists(blob_path):
+                os.remove(self.temp_path)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                # 设为只读，避免通过项目中的硬链接原地修改共享的内容
+                os.chmod(self.temp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                os.replace(self.temp_path, blob_path)
+            if target_path is not None:
+                _link(blob_path, target_path)
+
+    async def abort(self):
+        if self._file is not None:
+            await self._file.close()
+        if self.temp_path is not None:
+            await remove(self.temp_path)
+
+    async def __aenter__(self):
+        self.temp_path = await run_io(_create_temp_file)
+        self._file = await aiofiles.open(self.temp_path, 'wb', executor=get_io_executor())
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self.digest is None:
+            await self.abort()
+
+
+def _link(blob_path: str, target_path: str):
+    temp_path = f"{target_path}.link"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    try:
+        os.link(blob_path, temp_path)
+    except OSError:
+        shutil.copyfile(blob_path, temp_path)
+    # 替换目录项而不是写入原文件，原文件可能是其他内容的硬链接
+    os.replace(temp_path, target_path)
+
+
+def link_blob(digest: str, target_path: str):
+    """
+    将项目中的文件指向已保存的内容，不同文件系统之间无法创建硬链接时复制
+    Args:
+        digest: 内容摘要
+        target_path: 项目中的文件路径
+    Raises:
+        FileNotFoundError: 内容不存在
+    """
+    with _blob_lock(digest):
+        _link(get_blob_path(digest), target_path)
+
+
+def release_blob(digest: str):
+    """项目中的文件删除或替换后，没有其他硬链接引用的内容随之删除，中间结果保留以便再次上传时复用"""
+    blob_path = get_blob_path(digest)
+    with _blob_lock(digest):
+        try:
+            if os.stat(blob_path).st_nlink == 1:
+                os.remove(blob_path)
+        except FileNotFoundError:
+            pass
+
+
+async def read_artifact(digest: str, name: str) -> Optional[Any]:
+    """
+    读取按内容摘要保存的中间结果
+    Args:
+        digest: 内容摘要
+        name: 中间结果名称，应包含影响结果的参数
+    Returns:
+        中间结果，不存在时返回None
+    """
+    if not digest:
+        return None
+    # 存储目录不属于任何项目，不经过项目日志
+    try:
+        return await run_io(read_json_cached, get_artifact_path(digest, name))
+    except FileNotFoundError:
+        return None
+    except Exception as error:
+        print(f"读取中间结果 {name} 出错: {str(error)}")
+        return None
+
+
+async def write_artifact(digest: str, name: str, data: Any):
+    """保存按内容摘要的中间结果"""
+    if digest:
+        await write_json_snapshot(get_artifact_path(digest, name), data)
@@ -0,0 +1,129 @@
+"""
+读取缓存模块
+JSON文件与文本块内容在进程内按 LRU 缓存，每个条目带有校验值，
+校验值与当前文件状态不一致时重新读取，因此进程外的修改同样可以读到
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from app.core.config import settings
+
+
+class ReadCache:
+    """
+    带校验的 LRU 读取缓存
+    缓存的对象在所有调用方之间共享，调用方不应原地修改，修改后应通过写入接口保存
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (校验值, 对象, 估算大小)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, validator, loader, size):
+        """
+        读取缓存，校验值不一致或不存在时调用 loader 并缓存结果
+        Args:
+            key: 缓存键
+            validator: 校验值，与缓存时的值不同表示已修改
+            loader (Callable): 读取函数
+            size (int): 对象的估算大小（字节）
+        Returns:
+            缓存或重新读取的对象
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == validator:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader()
+
+        with self.lock:
+            self._remove(key)
+            # 超过总预算的对象不缓存
+            if size <= self.max_bytes:
+                self.entries[key] = (validator, value, size)
+                self.size += size
+                while self.size > self.max_bytes:
+                    _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                    self.size -= evicted_size
+                    self.evictions += 1
+        return value
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def invalidate(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """
+        获取缓存统计
+        Returns:
+            dict: 命中数、未命中数、淘汰数、条目数与占用字节数
+        """
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / total, 4) if total else 0,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'maxBytes': self.max_bytes
+            }
+
+
+# JSON文件与文本块共用的缓存
+read_cache = ReadCache(int(settings.READ_CACHE_MAX_BYTES))
+
+
+def file_validator(stat):
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def read_json_cached(file_path):
+    """
+    读取并缓存JSON文件，按 (mtime_ns, size, inode) 校验
+    Args:
+        file_path (str): 文件路径
+    Returns:
+        解析后的JSON数据，调用方不应原地修改
+    Raises:
+        FileNotFoundError: 文件不存在
+    """
+    key = ('json', os.path.abspath(file_path))
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        read_cache.invalidate(key)
+        raise
+
+    def load():
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    # 解析后的对象大小按文件大小估算
+    return read_cache.get(key, file_validator(stat), load, stat.st_size)
+
+
+def invalidate_json(file_path):
+    read_cache.invalidate(('json', os.path.abspath(file_path)))
@@ -0,0 +1,388 @@
+"""
+文本块存储模块
+每个项目的文本块追加写入同一个数据文件，并维护按文本块ID索引的偏移量，
+删除时只追加删除标记，由后台压缩回收空间；
+多个工作进程可以同时打开同一个存储，追加、读取与压缩通过文件锁互斥
+"""
+import asyncio
+import json
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows 上只在进程内加锁，存储只能由单个进程使用
+    fcntl = None
+
+from app.core.aio import get_io_executor
+from app.core.cache import read_cache
+
+# 数据文件与索引文件的名称，位于项目的 chunks 目录下
+DATA_FILE = 'segment.dat'
+INDEX_FILE = 'segment.idx'
+LOCK_FILE = 'segment.lock'
+
+# 记录类型
+RECORD_PUT = 1
+RECORD_DELETE = 2
+
+# 记录头：类型、ID长度、内容长度、CRC32
+_HEADER = struct.Struct('<BHII')
+
+# 每追加多少条记录保存一次索引，索引之后的记录在打开时重放
+INDEX_FLUSH_INTERVAL = 1000
+# 失效数据超过该比例且超过最小字节数时触发压缩
+COMPACT_RATIO = 0.5
+COMPACT_MIN_BYTES = 1024 * 1024
+
+# 已打开的存储：chunks 目录 -> ChunkStore
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class ChunkStore:
+    """
+    单个项目的文本块存储
+    数据文件由记录顺序组成，每条记录为记录头、文本块ID和内容；
+    索引为 {ID: (内容偏移, 内容长度)}，与数据文件已索引的长度一起保存
+    """
+
+    def __init__(self, chunks_dir):
+        self.chunks_dir = chunks_dir
+        self.data_path = os.path.join(chunks_dir, DATA_FILE)
+        self.index_path = os.path.join(chunks_dir, INDEX_FILE)
+        self.index = {}  # chunk_id -> (offset, length)
+        self.size = 0  # 数据文件中已索引的长度
+        self.dead_bytes = 0  # 被覆盖或删除的记录占用的字节数
+        self.inode = None  # 数据文件的 inode，其他进程压缩后会改变
+        self.lock = threading.RLock()
+        self.compacting = False
+        self._pending = 0  # 上次保存索引后追加的记录数
+        self._lock_depth = 0  # 当前线程嵌套持有锁的层数
+
+        os.makedirs(chunks_dir, exist_ok=True)
+        self._lock_file = open(os.path.join(chunks_dir, LOCK_FILE), 'a')
+        with self._locked():
+            self._load()
+            self._migrate()
+
+    @contextmanager
+    def _locked(self, exclusive=True):
+        """
+        进程内加锁，同时对存储加文件锁，使其他工作进程的追加、读取与压缩互斥；
+        文件锁只在最外层获取，嵌套调用时不会改变锁的类型
+        Args:
+            exclusive (bool): 是否加排他锁，只读取时加共享锁
+        """
+        with self.lock:
+            outermost = fcntl is not None and self._lock_depth == 0
+            if outermost:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if outermost:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        """读取索引文件，并重放索引之后追加的记录"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.index = {chunk_id: tuple(entry) for chunk_id, entry in data['chunks'].items()}
+            self.size = data['size']
+            self.dead_bytes = data.get('deadBytes', 0)
+        except FileNotFoundError:
+            pass
+        except Exception as error:
+            # 索引损坏时从头重放数据文件
+            print(f"读取文本块索引 {self.index_path} 出错，将重建索引:", str(error))
+            self.index, self.size, self.dead_bytes = {}, 0, 0
+
+        if not os.path.exists(self.data_path) or os.path.getsize(self.data_path) < self.size:
+            # 数据文件缺失或比索引短，索引不可信
+            self.index, self.size, self.dead_bytes = {}, 0, 0
+        self._replay(repair=True)
+
+    def _sync(self):
+        """与数据文件同步：其他进程压缩过数据文件时重新加载，否则重放新追加的记录"""
+        try:
+            inode = os.stat(self.data_path).st_ino
+        except FileNotFoundError:
+            return
+        if self.inode is not None and inode != self.inode:
+            self.index, self.size, self.dead_bytes = {}, 0, 0
+            self._load()
+        else:
+            self._replay()
+
+    def _replay(self, repair=False):
+        """
+        应用数据文件中尚未索引的记录
+        Args:
+            repair (bool): 是否截断末尾不完整的记录，只在打开时进行，以免截断其他进程正在写入的记录
+        """
+        try:
+            stat = os.stat(self.data_path)
+        except FileNotFoundError:
+            return
+        self.inode = stat.st_ino
+        file_size = stat.st_size
+        if file_size == self.size:
+            return
+
+        with open(self.data_path, 'rb') as f:
+            f.seek(self.size)
+            position = self.size
+            while position < file_size:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                kind, id_length, content_length, checksum = _HEADER.unpack(header)
+                body = f.read(id_length + content_length)
+                if len(body) < id_length + content_length or zlib.crc32(body) != checksum:
+                    break
+                chunk_id = body[:id_length].decode('utf-8')
+                record_size = _HEADER.size + id_length + content_length
+                self._apply(kind, chunk_id, position + _HEADER.size + id_length, content_length, record_size)
+                position += record_size
+                self._pending += 1
+
+        if repair and position < file_size:
+            # 末尾是写入中断的不完整记录，截断后继续追加
+            print(f"文本块数据文件 {self.data_path} 末尾存在不完整的记录，已截断")
+            with open(self.data_path, 'r+b') as f:
+                f.truncate(position)
+        self.size = position
+
+    def _apply(self, kind, chunk_id, offset, length, record_size):
+        previous = self.index.pop(chunk_id, None)
+        if previous is not None:
+            self.dead_bytes += _HEADER.size + len(chunk_id.encode('utf-8')) + previous[1]
+        if kind == RECORD_PUT:
+            self.index[chunk_id] = (offset, length)
+        else:
+            # 删除标记本身也是失效数据
+            self.dead_bytes += record_size
+
+    def _migrate(self):
+        """将旧版本每个文本块一个 .txt 文件的目录导入数据文件"""
+        names = [name for name in os.listdir(self.chunks_dir) if name.endswith('.txt')]
+        if not names:
+            return
+
+        for name in sorted(names):
+            with open(os.path.join(self.chunks_dir, name), 'r', encoding='utf-8') as f:
+                self._append(RECORD_PUT, name[:-len('.txt')], f.read())
+        self.flush_index()
+        # 数据文件和索引写入后再删除旧文件，中途失败时可重新迁移
+        for name in names:
+            os.remove(os.path.join(self.chunks_dir, name))
+
+    def _append(self, kind, chunk_id, content=''):
+        id_bytes = chunk_id.encode('utf-8')
+        content_bytes = content.encode('utf-8')
+        body = id_bytes + content_bytes
+        record = _HEADER.pack(kind, len(id_bytes), len(content_bytes), zlib.crc32(body)) + body
+
+        # 先同步其他进程追加的记录，再在文件末尾追加
+        self._sync()
+        with open(self.data_path, 'ab') as f:
+            f.write(record)
+            end = f.tell()
+        if end - len(record) == self.size:
+            self._apply(kind, chunk_id, self.size + _HEADER.size + len(id_bytes), len(content_bytes), len(record))
+            self.size = end
+        else:
+            # 其他进程同时追加了记录，按文件顺序重放
+            self._replay()
+
+        self._pending += 1
+        if self._pending >= INDEX_FLUSH_INTERVAL:
+            self.flush_index()
+
+    def flush_index(self):
+        """保存索引"""
+        with self._locked():
+            data = {
+                'size': self.size,
+                'deadBytes': self.dead_bytes,
+                'chunks': {chunk_id: list(entry) for chunk_id, entry in self.index.items()}
+            }
+            temp_path = f"{self.index_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, self.index_path)
+            self._pending = 0
+
+    def put(self, chunk_id, content):
+        with self._locked():
+            self._append(RECORD_PUT, chunk_id, content)
+            read_cache.invalidate(('chunk', self.data_path, chunk_id))
+
+    def delete(self, chunk_id):
+        """
+        删除文本块
+        Returns:
+            bool: 文本块是否存在
+        """
+        with self._locked():
+            self._sync()
+            if chunk_id not in self.index:
+                return False
+            self._append(RECORD_DELETE, chunk_id)
+            read_cache.invalidate(('chunk', self.data_path, chunk_id))
+            return True
+
+    def get(self, chunk_id):
+        """
+        读取文本块内容
+        Returns:
+            str: 内容，不存在时返回None
+        """
+        with self._locked(exclusive=False):
+            self._sync()
+            entry = self.index.get(chunk_id)
+            if entry is None:
+                return None
+
+            def load():
+                with open(self.data_path, 'rb') as f:
+                    f.seek(entry[0])
+                    return f.read(entry[1]).decode('utf-8')
+
+            # 记录写入后不会再改变，按记录所在的文件和位置校验；覆盖写入或压缩后位置随之改变
+            return read_cache.get(('chunk', self.data_path, chunk_id), (self.inode, entry[0], entry[1]), load, entry[1])
+
+    def get_many(self, chunk_ids=None):
+        """
+        批量读取文本块内容，按文件中的位置顺序读取，只打开一次数据文件
+        Args:
+            chunk_ids (list, optional): 文本块ID，默认读取全部
+        Returns:
+            dict: 文本块ID -> 内容，按传入顺序，不存在的文本块不包含在结果中
+        """
+        with self._locked(exclusive=False):
+            self._sync()
+            if chunk_ids is None:
+                chunk_ids = list(self.index)
+            entries = [(chunk_id, self.index[chunk_id]) for chunk_id in chunk_ids if chunk_id in self.index]
+            if not entries:
+                return {}
+
+            contents = {}
+            with open(self.data_path, 'rb') as f:
+                for chunk_id, (offset, length) in sorted(entries, key=lambda item: item[1][0]):
+                    def load():
+                        f.seek(offset)
+                        return f.read(length).decode('utf-8')
+
+                    contents[chunk_id] = read_cache.get(('chunk', self.data_path, chunk_id),
+                                                        (self.inode, offset, length), load, length)
+            return {chunk_id: contents[chunk_id] for chunk_id, _ in entries}
+
+    def __contains__(self, chunk_id):
+        with self._locked(exclusive=False):
+            self._sync()
+            return chunk_id in self.index
+
+    def ids(self):
+        """按写入顺序返回所有文本块ID"""
+        with self._locked(exclusive=False):
+            self._sync()
+            return list(self.index)
+
+    def needs_compaction(self):
+        return (not self.compacting and self.dead_bytes >= COMPACT_MIN_BYTES
+                and self.dead_bytes >= self.size * COMPACT_RATIO)
+
+    def compact(self):
+        """
+        压缩数据文件，只保留有效的文本块
+        复制期间不持有锁，复制完成后在锁内补齐复制期间追加的记录再替换文件；
+        复制期间其他进程已经压缩并替换了数据文件时放弃本次压缩
+        """
+        with self._locked():
+            if self.compacting:
+                return
+            self._sync()
+            self.compacting = True
+            snapshot = dict(self.index)
+            snapshot_size = self.size
+            # 在锁内打开数据文件，复制与补齐都从同一个文件读取
+            source = open(self.data_path, 'rb')
+
+        temp_path = f"{self.data_path}.compact"
+        try:
+            new_index = {}
+            with open(temp_path, 'wb') as target:
+                # 按原有顺序复制，ID列表保持写入顺序
+                for chunk_id, (offset, length) in snapshot.items():
+                    id_bytes = chunk_id.encode('utf-8')
+                    source.seek(offset)
+                    content_bytes = source.read(length)
+                    body = id_bytes + content_bytes
+                    position = target.tell()
+                    target.write(_HEADER.pack(RECORD_PUT, len(id_bytes), length, zlib.crc32(body)) + body)
+                    new_index[chunk_id] = (position + _HEADER.size + len(id_bytes), length)
+
+            with self._locked():
+                if os.fstat(source.fileno()).st_ino != os.stat(self.data_path).st_ino:
+                    os.remove(temp_path)
+                    self._sync()
+                    return
+
+                self._replay()
+                with open(temp_path, 'ab') as target:
+                    # 复制期间新增或删除的记录原样追加到新文件末尾
+                    source.seek(snapshot_size)
+                    tail = source.read(self.size - snapshot_size)
+                    target.write(tail)
+                    target.flush()
+                    os.fsync(target.fileno())
+                os.replace(temp_path, self.data_path)
+
+                self.index, self.dead_bytes = new_index, 0
+                self.size = os.path.getsize(self.data_path) - len(tail)
+                self._replay()
+                self.flush_index()
+        except Exception as error:
+            print(f"压缩文本块数据文件 {self.data_path} 失败:", str(error))
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        finally:
+            source.close()
+            self.compacting = False
+
+
+def get_chunk_store(chunks_dir):
+    """
+    获取项目的文本块存储，每个目录只打开一次
+    Args:
+        chunks_dir (str): 项目的 chunks 目录
+    Returns:
+        ChunkStore: 文本块存储
+    """
+    chunks_dir = os.path.abspath(chunks_dir)
+    with _stores_lock:
+        store = _stores.get(chunks_dir)
+        if store is None:
+            store = _stores[chunks_dir] = ChunkStore(chunks_dir)
+        return store
+
+
+def schedule_compaction(store):
+    """失效数据过多时在文件操作线程池中压缩，不阻塞事件循环"""
+    if not store.needs_compaction():
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        store.compact()
+        return
+    loop.run_in_executor(get_io_executor(), store.compact)
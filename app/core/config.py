@@ -113,6 +113,83 @@ class Settings(BaseSettings):
         "LIGHTRAG_STORAGE_DIR",
         "./rag_storage"
     )
+
+    # 文本分割
+    TEXT_SPLIT_MAX_WORKERS: int = os.getenv(
+        "TEXT_SPLIT_MAX_WORKERS",
+        os.cpu_count() or 1
+    )
+    # 分割模式：char 按字符计数，token 按Token计数
+    TEXT_SPLIT_MODE: str = os.getenv(
+        "TEXT_SPLIT_MODE",
+        "char"
+    )
+    TEXT_SPLIT_TOKEN_ENCODING: str = os.getenv(
+        "TEXT_SPLIT_TOKEN_ENCODING",
+        "cl100k_base"
+    )
+    TEXT_SPLIT_MIN_TOKENS: int = os.getenv(
+        "TEXT_SPLIT_MIN_TOKENS",
+        500
+    )
+    TEXT_SPLIT_MAX_TOKENS: int = os.getenv(
+        "TEXT_SPLIT_MAX_TOKENS",
+        1000
+    )
+
+    # 读取缓存：JSON文件与文本块内容的内存预算（字节）
+    READ_CACHE_MAX_BYTES: int = os.getenv(
+        "READ_CACHE_MAX_BYTES",
+        64 * 1024 * 1024
+    )
+
+    # 文件操作线程池的大小，阻塞的文件系统调用在该线程池中执行
+    IO_MAX_WORKERS: int = os.getenv(
+        "IO_MAX_WORKERS",
+        8
+    )
+
+    # LLM 请求的连接池：每个服务地址的最大连接数、空闲连接保持时间与超时（秒）
+    LLM_HTTP_MAX_CONNECTIONS_PER_HOST: int = os.getenv(
+        "LLM_HTTP_MAX_CONNECTIONS_PER_HOST",
+        32
+    )
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = os.getenv(
+        "LLM_HTTP_KEEPALIVE_EXPIRY",
+        60
+    )
+    LLM_HTTP_CONNECT_TIMEOUT: float = os.getenv(
+        "LLM_HTTP_CONNECT_TIMEOUT",
+        10
+    )
+    LLM_HTTP_READ_TIMEOUT: float = os.getenv(
+        "LLM_HTTP_READ_TIMEOUT",
+        300
+    )
+
+    # LLM 响应缓存：是否启用、数据库路径、有效期（秒，0 表示不过期）与总大小上限（字节）
+    LLM_CACHE_ENABLED: bool = os.getenv(
+        "LLM_CACHE_ENABLED",
+        True
+    )
+    LLM_CACHE_PATH: str = os.getenv(
+        "LLM_CACHE_PATH",
+        "./local-db/_llm_cache.db"
+    )
+    LLM_CACHE_TTL: float = os.getenv(
+        "LLM_CACHE_TTL",
+        7 * 24 * 60 * 60
+    )
+    LLM_CACHE_MAX_BYTES: int = os.getenv(
+        "LLM_CACHE_MAX_BYTES",
+        256 * 1024 * 1024
+    )
+
+    # 上传文件的大小上限（字节）
+    UPLOAD_MAX_BYTES: int = os.getenv(
+        "UPLOAD_MAX_BYTES",
+        200 * 1024 * 1024
+    )
     
     class Config:
         env_file = ".env"
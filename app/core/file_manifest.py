@@ -0,0 +1,218 @@
+"""
+文件清单模块
+每个项目维护 files 目录的清单 {文件ID: 文件信息}，按ID查找为常数时间，文件列表不再遍历目录；
+清单记录 files 目录的修改时间，目录在进程外增删文件后，下次访问时重新扫描
+"""
+import hashlib
+import os
+from typing import Any, Dict, List, Optional
+
+from app.core.aio import run_io
+from app.core.base import read_json_file, write_json_file
+
+# 清单文件名称，位于项目目录下
+MANIFEST_FILE = 'files-manifest.json'
+
+# 分割状态
+SPLIT_PENDING = 'pending'
+SPLIT_DONE = 'split'
+
+# 已加载的清单：项目目录 -> {'directory': 目录校验值, 'files': {文件ID: 文件信息}}
+_manifests = {}
+
+
+def get_file_id(file_name: str) -> str:
+    """文件ID为文件名的MD5"""
+    return hashlib.md5(file_name.encode()).hexdigest()
+
+
+def file_digest(file_path: str) -> str:
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _directory_validator(files_dir: str) -> List[int]:
+    stats = os.stat(files_dir)
+    return [stats.st_mtime_ns, stats.st_ino]
+
+
+def _file_info(files_dir: str, file_name: str, stats: os.stat_result, previous: Optional[dict] = None,
+               digest: Optional[str] = None) -> dict:
+    """生成文件信息，大小和修改时间未变化时沿用原有的内容摘要和分割状态"""
+    file_path = os.path.join(files_dir, file_name)
+    if previous and previous['size'] == stats.st_size and previous['mtime'] == stats.st_mtime_ns:
+        digest, split_status = previous['digest'], previous['splitStatus']
+    else:
+        digest, split_status = digest or file_digest(file_path), SPLIT_PENDING
+
+    return {
+        'id': get_file_id(file_name),
+        'name': file_name,
+        'path': file_path,
+        'size': stats.st_size,
+        'mtime': stats.st_mtime_ns,
+        'digest': digest,
+        'splitStatus': split_status
+    }
+
+
+async def _save(project_path: str, manifest: dict):
+    _manifests[project_path] = manifest
+    await write_json_file(os.path.join(project_path, MANIFEST_FILE), {
+        'directory': manifest['directory'],
+        'files': list(manifest['files'].values())
+    })
+
+
+async def _load(project_path: str) -> Optional[dict]:
+    """
+    获取项目的文件清单，files 目录变化时重新扫描
+    Returns:
+        dict: 清单，files 目录不存在时返回None
+    """
+    files_dir = os.path.join(project_path, 'files')
+    try:
+        validator = await run_io(_directory_validator, files_dir)
+    except FileNotFoundError:
+        _manifests.pop(project_path, None)
+        return None
+
+    manifest = _manifests.get(project_path)
+    if manifest is None:
+        saved = await read_json_file(os.path.join(project_path, MANIFEST_FILE))
+        if saved:
+            # 路径按当前的项目目录生成，项目目录移动后仍然有效
+            manifest = {
+                'directory': saved['directory'],
+                'files': {item['id']: {**item, 'path': os.path.join(files_dir, item['name'])}
+                          for item in saved['files']}
+            }
+
+    if manifest is not None and manifest['directory'] == validator:
+        _manifests[project_path] = manifest
+        return manifest
+
+    # 目录已变化，重新扫描，未变化的文件沿用原有的摘要
+    files = await run_io(_scan, files_dir, manifest['files'] if manifest else {})
+    manifest = {'directory': validator, 'files': files}
+    await _save(project_path, manifest)
+    return manifest
+
+
+def _scan(files_dir: str, previous: dict) -> dict:
+    """扫描 files 目录，在文件操作线程池中执行"""
+    files = {}
+    for file_name in os.listdir(files_dir):
+        file_path = os.path.join(files_dir, file_name)
+        # 只记录Markdown文件
+        if not file_name.endswith('.md') or not os.path.isfile(file_path):
+            continue
+        info = _file_info(files_dir, file_name, os.stat(file_path), previous.get(get_file_id(file_name)))
+        files[info['id']] = info
+    return files
+
+
+async def _current(project_path: str) -> Optional[dict]:
+    """
+    获取已加载的清单，不检查目录是否变化，用于本进程自身修改 files 目录之后
+    清单尚未加载时按 _load 读取或扫描
+    """
+    manifest = _manifests.get(project_path)
+    return manifest if manifest is not None else await _load(project_path)
+
+
+async def list_files(project_path: str) -> List[Dict[str, Any]]:
+    """
+    获取项目的所有文件
+    Args:
+        project_path: 项目目录
+    Returns:
+        List[Dict]: 文件信息，调用方不应原地修改
+    """
+    manifest = await _load(project_path)
+    return list(manifest['files'].values()) if manifest else []
+
+
+async def find_file(project_path: str, file_id: str) -> Optional[Dict[str, Any]]:
+    """
+    按文件ID查找文件
+    Args:
+        project_path: 项目目录
+        file_id: 文件ID
+    Returns:
+        Dict: 文件信息，不存在时返回None
+    """
+    manifest = await _load(project_path)
+    if not manifest:
+        return None
+    info = manifest['files'].get(file_id)
+    if info is None:
+        return None
+
+    # 目录未变化时文件内容仍可能被原地修改，只检查这一个文件
+    try:
+        stats = await run_io(os.stat, info['path'])
+    except FileNotFoundError:
+        return None
+    if stats.st_size != info['size'] or stats.st_mtime_ns != info['mtime']:
+        info = await run_io(_file_info, os.path.dirname(info['path']), info['name'], stats)
+        manifest['files'][file_id] = info
+        await _save(project_path, manifest)
+    return info
+
+
+async def record_file(project_path: str, file_name: str, digest: Optional[str] = None) -> Dict[str, Any]:
+    """
+    保存文件后更新清单
+    Args:
+        project_path: 项目目录
+        file_name: 文件名
+        digest: 写入时已计算的内容摘要，不提供时读取文件计算
+    Returns:
+        Dict: 文件信息
+    """
+    files_dir = os.path.join(project_path, 'files')
+    manifest = await _current(project_path)
+    file_id = get_file_id(file_name)
+    stats = await run_io(os.stat, os.path.join(files_dir, file_name))
+    info = await run_io(_file_info, files_dir, file_name, stats, manifest['files'].get(file_id), digest)
+    if file_name.endswith('.md'):
+        manifest['files'][file_id] = info
+    # 记录写入后的目录状态，本次写入不触发重新扫描
+    manifest['directory'] = await run_io(_directory_validator, files_dir)
+    await _save(project_path, manifest)
+    return info
+
+
+async def remove_file(project_path: str, file_id: str):
+    """
+    删除文件后更新清单
+    Args:
+        project_path: 项目目录
+        file_id: 文件ID
+    """
+    manifest = await _current(project_path)
+    if manifest is None:
+        return
+    manifest['files'].pop(file_id, None)
+    manifest['directory'] = await run_io(_directory_validator, os.path.join(project_path, 'files'))
+    await _save(project_path, manifest)
+
+
+async def set_split_status(project_path: str, file_id: str, status: str):
+    """
+    更新文件的分割状态
+    Args:
+        project_path: 项目目录
+        file_id: 文件ID
+        status: 分割状态
+    """
+    manifest = await _load(project_path)
+    if not manifest or file_id not in manifest['files']:
+        return
+    manifest['files'][file_id] = {**manifest['files'][file_id], 'splitStatus': status}
+    await _save(project_path, manifest)
@@ -0,0 +1,310 @@
+"""
+JSON文件日志模块
+项目目录下JSON文件的修改以JSONL记录追加到项目的日志文件，短时间内的多次写入合并为一次 fsync；
+完整的JSON文件在日志过大时由后台压缩写出，读取时为JSON文件加上日志中的修改
+同一项目目录只应由一个进程写入
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+from app.core.aio import run_io
+from app.core.cache import read_json_cached, invalidate_json
+
+# 日志文件名称，位于项目目录下
+JOURNAL_FILE = 'journal.jsonl'
+
+# 组提交的等待时间（秒），期间到达的写入与第一个写入一起提交
+COMMIT_WINDOW = 0.002
+# 日志记录数或大小超过阈值时压缩
+COMPACT_RECORDS = 1000
+COMPACT_BYTES = 8 * 1024 * 1024
+
+# 修改类型
+OP_SET = 'set'  # 替换整个文档
+OP_MERGE = 'merge'  # 合并字段到对象文档
+OP_UPSERT = 'upsert'  # 按键替换或追加列表文档中的一项
+OP_REMOVE = 'remove'  # 按键删除列表文档中的多项
+OP_DELETE = 'delete'  # 删除文档
+
+# 文档不存在
+MISSING = object()
+
+# 已打开的日志：项目目录 -> JsonJournal
+_journals = {}
+# 正在打开的日志：项目目录 -> Future，同一项目同时只打开一次
+_opening = {}
+
+
+def apply_record(document, record):
+    """
+    将一条修改应用到文档
+    Args:
+        document: 当前文档，不存在时为 MISSING；不会被原地修改，已经返回给调用方的文档保持不变
+        record (dict): 修改记录
+    Returns:
+        修改后的文档
+    """
+    op = record['op']
+    if op == OP_SET:
+        return record['value']
+    if op == OP_DELETE:
+        return MISSING
+    if op == OP_MERGE:
+        return {**document, **record['value']} if isinstance(document, dict) else dict(record['value'])
+
+    # 只复制列表本身，列表项仍然共享
+    document = list(document) if isinstance(document, list) else []
+    key = record['key']
+    if op == OP_UPSERT:
+        value = record['value']
+        for index, item in enumerate(document):
+            if isinstance(item, dict) and item.get(key) == value.get(key):
+                document[index] = value
+                break
+        else:
+            document.append(value)
+        return document
+    if op == OP_REMOVE:
+        removed = set(record['values'])
+        return [item for item in document if not (isinstance(item, dict) and item.get(key) in removed)]
+    raise ValueError(f"未知的修改类型: {op}")
+
+
+def write_atomic(file_path, data):
+    """
+    原子地写入JSON文件：临时文件与目标文件位于同一目录，fsync 后重命名替换
+    Args:
+        file_path (str): 文件路径
+        data: JSON数据
+    """
+    # 序列化失败时不会产生任何文件，无需再读回校验
+    json_string = json.dumps(data, ensure_ascii=False, indent=2)
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(json_string)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+        invalidate_json(file_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def _read_file(file_path):
+    try:
+        return read_json_cached(file_path)
+    except FileNotFoundError:
+        return MISSING
+
+
+class JsonJournal:
+    """
+    单个项目的JSON文件日志
+    documents 保存日志中修改过、尚未压缩的文档，其余文档直接从JSON文件读取
+    """
+
+    def __init__(self, project_dir):
+        self.project_dir = project_dir
+        self.log_path = os.path.join(project_dir, JOURNAL_FILE)
+        self.documents = {}  # 相对路径 -> 文档
+        self.records = 0  # 日志中的记录数
+        self.log_size = 0
+        self._pending = []  # (记录行, future)
+        self._flushing = False
+        self._replay()
+
+    def _replay(self):
+        """打开时重放日志，末尾写入中断的记录被截断"""
+        if not os.path.exists(self.log_path):
+            return
+
+        position = 0
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self._apply(record)
+                position += len(line)
+                self.records += 1
+
+        if position < os.path.getsize(self.log_path):
+            print(f"JSON日志 {self.log_path} 末尾存在不完整的记录，已截断")
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(position)
+        self.log_size = position
+
+    def _apply(self, record):
+        path = record['path']
+        document = self.documents.get(path, MISSING)
+        # 替换和删除不依赖原有内容，无需读取JSON文件
+        if path not in self.documents and record['op'] not in (OP_SET, OP_DELETE):
+            try:
+                document = _read_file(os.path.join(self.project_dir, path))
+            except Exception as error:
+                print(f"读取JSON文件 {path} 出错: {str(error)}")
+        self.documents[path] = apply_record(document, record)
+
+    async def read(self, path):
+        """
+        读取文档，日志中没有的文档在文件操作线程池中读取
+        Args:
+            path (str): 相对于项目目录的路径
+        Returns:
+            文档，与缓存共享，调用方不应原地修改；不存在时返回None
+        """
+        if path in self.documents:
+            document = self.documents[path]
+            # 修改记录不会原地修改文档，可以直接返回
+            return None if document is MISSING else document
+        try:
+            document = await run_io(_read_file, os.path.join(self.project_dir, path))
+            return None if document is MISSING else document
+        except Exception as error:
+            print(f"读取JSON文件 {os.path.join(self.project_dir, path)} 出错: {str(error)}")
+            return None
+
+    def _load_documents(self, paths):
+        """读取修改记录依赖的原有文档，在文件操作线程池中执行"""
+        documents = {}
+        for path in paths:
+            try:
+                documents[path] = _read_file(os.path.join(self.project_dir, path))
+            except Exception as error:
+                print(f"读取JSON文件 {path} 出错: {str(error)}")
+                documents[path] = MISSING
+        return documents
+
+    async def write(self, path, op, **fields):
+        """
+        追加一条修改，提交到日志后返回
+        Args:
+            path (str): 相对于项目目录的路径
+            op (str): 修改类型
+            **fields: 修改内容，如 value、key、values
+        """
+        line = (json.dumps({'path': path, 'op': op, **fields}, ensure_ascii=False, separators=(',', ':'))
+                + '\n').encode('utf-8')
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((line, future))
+        if not self._flushing:
+            self._flushing = True
+            loop.create_task(self._flush())
+        await future
+
+    async def _flush(self):
+        """组提交：等待片刻后将期间的所有记录一次写入并 fsync，提交后再更新内存中的文档"""
+        try:
+            await asyncio.sleep(COMMIT_WINDOW)
+            while self._pending:
+                batch, self._pending = self._pending, []
+                try:
+                    await run_io(self._append, b''.join(line for line, _ in batch))
+                except Exception as error:
+                    print(f"写入JSON日志 {self.log_path} 失败: {str(error)}")
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(error)
+                    continue
+
+                # 从记录行解析出的文档归日志所有，不与调用方共享
+                records = [json.loads(line) for line, _ in batch]
+                # 合并类的修改依赖原有文档，先在线程池中读取，应用时不再阻塞事件循环
+                paths = {record['path'] for record in records
+                         if record['path'] not in self.documents and record['op'] not in (OP_SET, OP_DELETE)}
+                if paths:
+                    self.documents.update(await run_io(self._load_documents, paths))
+
+                for record, (_, future) in zip(records, batch):
+                    self._apply(record)
+                    self.records += 1
+                    if not future.done():
+                        future.set_result(None)
+
+                if self.records >= COMPACT_RECORDS or self.log_size >= COMPACT_BYTES:
+                    await self._compact()
+        finally:
+            self._flushing = False
+
+    def _append(self, data):
+        with open(self.log_path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            self.log_size = f.tell()
+
+    async def _compact(self):
+        """
+        将日志中修改过的文档写回JSON文件并清空日志
+        在 _flush 中执行，期间不会追加新的记录，写入的记录在下一批提交
+        """
+        try:
+            await run_io(self._write_documents)
+            self.documents = {}
+        except Exception as error:
+            # 日志保持不变，下次提交后重试
+            print(f"压缩JSON日志 {self.log_path} 失败: {str(error)}")
+
+    def _write_documents(self):
+        for path, document in self.documents.items():
+            file_path = os.path.join(self.project_dir, path)
+            if document is MISSING:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                invalidate_json(file_path)
+            else:
+                write_atomic(file_path, document)
+
+        # JSON文件全部写入后才清空日志
+        with open(self.log_path, 'wb') as f:
+            os.fsync(f.fileno())
+        self.records = 0
+        self.log_size = 0
+
+
+def _open_journal(project_dir):
+    """打开项目的日志并重放，在文件操作线程池中执行；项目目录不存在时返回None"""
+    if not os.path.isdir(project_dir):
+        return None
+    return JsonJournal(project_dir)
+
+
+async def locate_journal(file_path, db_directory):
+    """
+    查找文件所属项目的日志，首次访问项目时在文件操作线程池中打开并重放日志，不阻塞事件循环
+    Args:
+        file_path (str): JSON文件路径
+        db_directory (str): 数据目录
+    Returns:
+        tuple: (JsonJournal, 相对路径)，不在已存在的项目目录下时返回 (None, None)
+    """
+    relative = os.path.relpath(os.path.abspath(file_path), os.path.abspath(db_directory))
+    parts = relative.split(os.sep)
+    if len(parts) < 2 or parts[0] in ('.', '..'):
+        return None, None
+
+    project_dir = os.path.join(os.path.abspath(db_directory), parts[0])
+    journal = _journals.get(project_dir)
+    if journal is None:
+        opening = _opening.get(project_dir)
+        if opening is None:
+            opening = _opening[project_dir] = asyncio.ensure_future(run_io(_open_journal, project_dir))
+            opening.add_done_callback(lambda _: _opening.pop(project_dir, None))
+        # 等待的请求被取消时不影响其他请求继续等待同一次打开
+        journal = await asyncio.shield(opening)
+        if journal is None:
+            return None, None
+        journal = _journals.setdefault(project_dir, journal)
+    return journal, '/'.join(parts[1:])
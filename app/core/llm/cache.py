@@ -0,0 +1,205 @@
+"""
+LLM 响应缓存模块
+相同的请求（提供商、服务地址、模型、消息与参数）按规范化后的哈希值缓存响应，
+保存在 SQLite 数据库中，重启后仍然有效，多个工作进程共用同一个数据库文件；
+条目超过有效期后失效，总大小超过上限时按最近访问时间淘汰
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from app.core import aio
+from app.core.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_expires_at ON llm_cache (expires_at);
+"""
+
+
+def make_cache_key(kind: str, request: dict) -> str:
+    """
+    计算请求的缓存键
+    Args:
+        kind: 响应类型，chat 或 stream
+        request: 请求内容，字典键的顺序不影响结果
+    Returns:
+        str: SHA-256 十六进制摘要
+    """
+    canonical = json.dumps([kind, request], sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    基于 SQLite 的 LLM 响应缓存
+    数据库操作在文件操作线程池中执行；命中率等统计为当前进程的计数
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl  # 有效期（秒），0 表示不过期
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            # WAL 模式下多个进程可同时读，写入互不阻塞读取
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self.lock:
+            conn = self._connect()
+            row = conn.execute('SELECT value, expires_at FROM llm_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+                return None
+            conn.execute('UPDATE llm_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            return value
+
+    def _set(self, key: str, value: str) -> int:
+        size = len(value.encode('utf-8'))
+        # 超过总预算的响应不缓存
+        if size > self.max_bytes:
+            return 0
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl > 0 else None
+        with self.lock:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute(
+                    'INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, expires_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, value, size, now, expires_at, now)
+                )
+                conn.execute('DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,))
+                evicted = self._evict(conn)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            return evicted
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """按最近访问时间从旧到新淘汰，直到总大小不超过上限"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM llm_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        evicted = 0
+        for key, size in conn.execute('SELECT key, size FROM llm_cache ORDER BY accessed_at').fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+        return evicted
+
+    def _usage(self) -> tuple:
+        with self.lock:
+            return self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache').fetchone()
+
+    def _clear(self):
+        with self.lock:
+            self._connect().execute('DELETE FROM llm_cache')
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存的响应
+        Args:
+            key: 缓存键
+        Returns:
+            缓存的响应，不存在或已过期时返回 None
+        """
+        try:
+            value = await aio.run_io(self._get, key)
+        except sqlite3.Error as error:
+            # 缓存不可用时不影响正常请求
+            print('读取 LLM 响应缓存出错:', str(error))
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    async def set(self, key: str, value: Any):
+        """
+        缓存响应
+        Args:
+            key: 缓存键
+            value: 可序列化为JSON的响应
+        """
+        try:
+            self.evictions += await aio.run_io(self._set, key, json.dumps(value, ensure_ascii=False))
+            self.stores += 1
+        except sqlite3.Error as error:
+            print('写入 LLM 响应缓存出错:', str(error))
+
+    def bypass(self):
+        """记录一次跳过缓存的请求"""
+        self.bypasses += 1
+
+    async def clear(self):
+        await aio.run_io(self._clear)
+
+    async def stats(self) -> dict:
+        """
+        获取缓存统计
+        Returns:
+            dict: 命中数、未命中数、写入数、跳过数、淘汰数，以及数据库中的条目数与占用字节数
+        """
+        total = self.hits + self.misses
+        result = {
+            'enabled': bool(settings.LLM_CACHE_ENABLED),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': round(self.hits / total, 4) if total else 0,
+            'stores': self.stores,
+            'bypasses': self.bypasses,
+            'evictions': self.evictions,
+            'maxBytes': self.max_bytes,
+            'ttl': self.ttl
+        }
+        if not settings.LLM_CACHE_ENABLED:
+            return result
+        try:
+            result['entries'], result['bytes'] = await aio.run_io(self._usage)
+        except sqlite3.Error as error:
+            print('读取 LLM 响应缓存统计出错:', str(error))
+        return result
+
+
+llm_cache = LLMResponseCache(
+    settings.LLM_CACHE_PATH,
+    int(settings.LLM_CACHE_MAX_BYTES),
+    float(settings.LLM_CACHE_TTL)
+)
@@ -1,12 +1,15 @@
-import http.client
 import json
 from typing import List, Optional, Union, Any
 from urllib.parse import urlparse
 
 from pydantic import BaseModel
 
+from app.core.config import settings
+from app.core.llm.cache import llm_cache, make_cache_key
 from app.core.llm.common import extract_think_chain, extract_answer
 from app.core.llm.ollama import OllamaAPI
+from app.core.llm.stream import iter_sse, SSE_DONE
+from app.core.llm.transport import get_http_client
 
 
 # 添加OpenAI请求模型
@@ -57,46 +60,69 @@ class LLMClient:
         Args:
             prompt: 用户输入的提示词或对话历史
             options: 可选参数
+                cache: 响应缓存，默认 True 读取并写入缓存，False 跳过缓存，'refresh' 重新请求并更新缓存
         Returns:
             模型响应
         """
-        options = options or {}
+        options = dict(options or {})
+        cache = options.pop('cache', True)
         messages = prompt if isinstance(prompt, list) else [{'role': 'user', 'content': prompt}]
 
+        key = self._cache_key('chat', messages, options, cache)
+        if key and cache is True:
+            cached = await llm_cache.get(key)
+            if cached is not None:
+                return cached
+
         # 根据不同提供商调用不同的 API
         provider = self.provider.lower()
         if provider == 'ollama':
-            return await self._chat_ollama(messages, options)
+            response = await self._chat_ollama(messages, options)
         elif provider in ['openai', 'siliconflow', 'deepseek']:  # 兼容 OpenAI 接口
-            return await self._chat_openai(messages, options)
+            response = await self._chat_openai(messages, options)
         elif provider == 'zhipu':  # 智谱 AI
-            return await self._chat_zhipu(messages, options)
+            response = await self._chat_zhipu(messages, options)
         else:
             # 默认尝试 OpenAI 兼容接口
-            return await self._chat_openai(messages, options)
+            response = await self._chat_openai(messages, options)
+
+        if key and _is_cacheable(response):
+            await llm_cache.set(key, response)
+        return response
 
     async def chat_stream(self, prompt: Union[str, List[dict]], options: dict = None):
         """
         流式生成对话响应
         Args:
             prompt: 用户输入的提示词或对话历史
-            options: 可选参数
+            options: 可选参数，cache 的含义同 chat；完整读取的流会被缓存，命中时按原数据块回放
         Returns:
             可读流
         """
-        options = options or {}
+        options = dict(options or {})
+        cache = options.pop('cache', True)
         messages = prompt if isinstance(prompt, list) else [{'role': 'user', 'content': prompt}]
 
+        key = self._cache_key('stream', messages, options, cache)
+        if key and cache is True:
+            cached = await llm_cache.get(key)
+            if cached is not None:
+                return _replay_stream(cached)
+
         # 根据不同提供商调用不同的流式 API
         provider = self.provider.lower()
         if provider == 'ollama':
-            return await self._chat_ollama_stream(messages, options)
+            stream = await self._chat_ollama_stream(messages, options)
         elif provider in ['openai', 'siliconflow', 'deepseek']:
-            return await self._chat_openai_stream(messages, options)
+            stream = await self._chat_openai_stream(messages, options)
         elif provider == 'zhipu':
-            return await self._chat_zhipu_stream(messages, options)
+            stream = await self._chat_zhipu_stream(messages, options)
         else:
-            return await self._chat_openai_stream(messages, options)
+            stream = await self._chat_openai_stream(messages, options)
+
+        if key:
+            return _cache_stream(key, stream)
+        return stream
 
     async def get_response(self, prompt: Union[str, List[dict]], options: dict = None) -> str:
         """获取响应文本"""
@@ -186,12 +212,9 @@ class LLMClient:
             }
 
             return await self._make_http_request(
-                url.geturl(),
+                url._replace(path=path).geturl(),
                 method='POST',
-                headers={
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {self.api_key}'
-                },
+                headers=self._headers(),
                 body=json.dumps(request_options)
             )
         except Exception as error:
@@ -216,44 +239,25 @@ class LLMClient:
             }
 
             async def stream_generator():
-                conn = (http.client.HTTPSConnection(url.hostname, url.port or 443)
-                        if url.scheme == 'https' else
-                        http.client.HTTPConnection(url.hostname, url.port or 80))
-
-                headers = {
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {self.api_key}',
-                    'Accept': 'text/event-stream'
-                }
-
-                try:
-                    conn.request('POST', path, json.dumps(request_options), headers)
-                    response = conn.getresponse()
-
-                    if response.status != 200:
-                        raise Exception(f'HTTP error! status: {response.status}')
-
-                    while True:
-                        chunk = response.read1()
-                        if not chunk:
-                            break
-
-                        text = chunk.decode()
-                        for line in text.split('\n'):
-                            if line.startswith('data: '):
-                                data = line[6:]
-                                if data == '[DONE]':
-                                    return
-                                try:
-                                    parsed = json.loads(data)
-                                    content = parsed.get('choices', [{}])[0].get('delta', {}).get('content', '')
-                                    if content:
-                                        yield content.encode()
-                                except json.JSONDecodeError:
-                                    print('解析 SSE 数据失败')
-
-                finally:
-                    conn.close()
+                stream_url = url._replace(path=path).geturl()
+                headers = self._headers(Accept='text/event-stream')
+
+                async with get_http_client(stream_url).stream(
+                        'POST', stream_url, content=json.dumps(request_options), headers=headers) as response:
+                    if response.status_code != 200:
+                        raise Exception(f'HTTP error! status: {response.status_code}')
+
+                    # 数据块可能截断消息或多字节字符，按 SSE 消息解析
+                    async for event in iter_sse(response.aiter_bytes()):
+                        if event.data == SSE_DONE:
+                            return
+                        try:
+                            parsed = event.json()
+                            content = (parsed.get('choices') or [{}])[0].get('delta', {}).get('content', '')
+                            if content:
+                                yield content.encode()
+                        except json.JSONDecodeError:
+                            print('解析 SSE 数据失败')
 
             return stream_generator()
         except Exception as error:
@@ -282,10 +286,7 @@ class LLMClient:
             return await self._make_http_request(
                 self.endpoint,
                 method='POST',
-                headers={
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {self.api_key}'
-                },
+                headers=self._headers(),
                 body=json.dumps(request_options)
             )
         except Exception as error:
@@ -313,66 +314,101 @@ class LLMClient:
             }
 
             async def stream_generator():
-                url = urlparse(self.endpoint)
-                conn = (http.client.HTTPSConnection(url.hostname, url.port or 443)
-                        if url.scheme == 'https' else
-                        http.client.HTTPConnection(url.hostname, url.port or 80))
-
-                headers = {
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {self.api_key}',
-                    'Accept': 'text/event-stream'
-                }
-
-                try:
-                    conn.request('POST', url.path, json.dumps(request_options), headers)
-                    response = conn.getresponse()
+                headers = self._headers(Accept='text/event-stream')
 
-                    if response.status != 200:
-                        raise Exception(f'HTTP error! status: {response.status}')
+                async with get_http_client(self.endpoint).stream(
+                        'POST', self.endpoint, content=json.dumps(request_options), headers=headers) as response:
+                    if response.status_code != 200:
+                        raise Exception(f'HTTP error! status: {response.status_code}')
 
-                    while True:
-                        chunk = response.read1()
-                        if not chunk:
+                    async for event in iter_sse(response.aiter_bytes()):
+                        if event.data == SSE_DONE or event.event == 'finish':
                             break
-
                         try:
-                            data = json.loads(chunk)
-                            if data.get('data'):
-                                content = data['data'].get('content', '')
-                                if content:
-                                    yield content.encode()
-                            if data.get('meta', {}).get('is_end'):
-                                break
+                            data = event.json()
                         except json.JSONDecodeError:
-                            print('处理智谱 AI 流数据出错')
-
-                finally:
-                    conn.close()
+                            data = None
+                        if not isinstance(data, dict):
+                            # 旧版接口的 add 消息中 data 为生成的文本
+                            if event.event == 'add' and event.data:
+                                yield event.data.encode()
+                            elif data is None:
+                                print('处理智谱 AI 流数据出错')
+                            continue
+
+                        if data.get('choices'):
+                            content = data['choices'][0].get('delta', {}).get('content', '')
+                        else:
+                            content = (data.get('data') or {}).get('content', '')
+                        if content:
+                            yield content.encode()
+                        if data.get('meta', {}).get('is_end'):
+                            break
 
             return stream_generator()
         except Exception as error:
             print('智谱 AI 流式 API 调用出错:', str(error))
             raise
 
+    def _cache_key(self, kind: str, messages: list[dict], options: dict, cache) -> Optional[str]:
+        """
+        计算请求的缓存键
+        Returns:
+            str: 缓存键，未启用缓存或本次请求跳过缓存时返回 None
+        """
+        if not settings.LLM_CACHE_ENABLED:
+            return None
+        if cache is not True:
+            llm_cache.bypass()
+            if cache != 'refresh':
+                return None
+        return make_cache_key(kind, {
+            'provider': self.provider.lower(),
+            'endpoint': self.endpoint,
+            'model': self.model,
+            'messages': messages,
+            'options': options
+        })
+
+    def _headers(self, **extra) -> dict:
+        """请求头，未配置 API 密钥时不发送认证头"""
+        headers = {'Content-Type': 'application/json', **extra}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        return headers
+
     async def _make_http_request(self, url: str, method: str, headers: dict, body: str = None) -> dict:
-        """发送 HTTP 请求"""
-        url_parts = urlparse(url)
-        is_https = url_parts.scheme == 'https'
-        conn = (http.client.HTTPSConnection(url_parts.hostname, url_parts.port or 443)
-                if is_https else
-                http.client.HTTPConnection(url_parts.hostname, url_parts.port or 80))
+        """发送 HTTP 请求，通过共享的连接池复用连接"""
+        response = await get_http_client(url).request(method, url, content=body, headers=headers)
+        data = response.text
 
         try:
-            conn.request(method, url_parts.path, body, headers)
-            response = conn.getresponse()
-            data = response.read().decode()
-
-            if 200 <= response.status < 300:
+            if 200 <= response.status_code < 300:
                 return json.loads(data)
             else:
-                raise Exception(f'请求失败，状态码: {response.status}, 响应: {data}')
+                raise Exception(f'请求失败，状态码: {response.status_code}, 响应: {data}')
         except json.JSONDecodeError:
             raise Exception('响应解析失败')
-        finally:
-            conn.close()
\ No newline at end of file
+
+
+def _is_cacheable(response) -> bool:
+    """只缓存成功的响应：不含 error，且有 choices 或 response 内容"""
+    if not isinstance(response, dict) or response.get('error'):
+        return False
+    return bool(response.get('choices') or response.get('response'))
+
+
+async def _replay_stream(chunks: List[str]):
+    """按缓存的数据块回放流式响应"""
+    for chunk in chunks:
+        yield chunk.encode()
+
+
+async def _cache_stream(key: str, stream):
+    """转发流式响应，完整读取后写入缓存；中途出错或调用方提前结束时不缓存"""
+    chunks = []
+    async for chunk in stream:
+        chunks.append(chunk)
+        yield chunk
+    if chunks:
+        await llm_cache.set(key, [chunk.decode() for chunk in chunks])
@@ -1,6 +1,8 @@
-import http.client
 import json
-from typing import Dict, Any, List, Callable, Union
+from typing import Dict, Any, AsyncIterator
+
+from app.core.llm.stream import iter_ndjson
+from app.core.llm.transport import get_http_client
 
 
 class OllamaAPI:
@@ -76,75 +78,68 @@ class OllamaAPI:
             print('Ollama API 调用出错:', str(error))
             raise
 
-    async def chat_stream(self, prompt: str, on_data: Callable[[dict], None], options: dict[str, Any] = None):
+    async def chat_stream(self, prompt: str, options: dict[str, Any] = None) -> AsyncIterator[dict[str, Any]]:
         """
         流式生成对话响应
         Args:
             prompt: 用户输入的提示词
-            on_data: 处理每个数据块的回调函数
             options: 可选参数
+        Returns:
+            AsyncIterator[Dict]: 逐条返回响应消息，最后一条的 done 为 True；
+                提前结束迭代或取消时关闭连接
         """
         request_options = {
-            **(options or {}),
             'model': self.model,
+            **(options or {}),
             'prompt': prompt,
             'stream': True
         }
 
         try:
-            await self._make_stream_request('/api/generate', {
+            async for data in self._make_stream_request('/api/generate', {
                 'method': 'POST',
                 'headers': {
                     'Content-Type': 'application/json'
                 },
                 'body': json.dumps(request_options)
-            }, on_data)
+            }):
+                if data.get('error'):
+                    raise Exception(data['error'])
+                yield data
         except Exception as error:
             print('Ollama 流式API调用出错:', str(error))
             raise
 
     async def _make_request(self, path: str, options: dict[str, Any]) -> dict[str, Any] | None:
-        """发送HTTP请求"""
-        conn = http.client.HTTPConnection(self.host, self.port)
-        try:
-            conn.request(
-                options['method'],
-                path,
-                options.get('body'),
-                options.get('headers', {})
-            )
-            response = conn.getresponse()
-            data = response.read().decode()
-
-            try:
-                return json.loads(data)
-            except json.JSONDecodeError:
-                raise Exception('响应解析失败')
-        finally:
-            conn.close()
-
-    async def _make_stream_request(self, path: str, options: dict[str, Any], on_data: Callable[[dict], None]):
-        """发送流式HTTP请求"""
-        conn = http.client.HTTPConnection(self.host, self.port)
+        """发送HTTP请求，通过共享的连接池复用连接"""
+        url = f"{self.base_url}{path}"
+        response = await get_http_client(url).request(
+            options['method'],
+            url,
+            content=options.get('body'),
+            headers=options.get('headers', {})
+        )
+
+        if not 200 <= response.status_code < 300:
+            raise Exception(f'请求失败，状态码: {response.status_code}, 响应: {response.text}')
+
         try:
-            conn.request(
+            return json.loads(response.text)
+        except json.JSONDecodeError:
+            raise Exception('响应解析失败')
+
+    async def _make_stream_request(self, path: str, options: dict[str, Any]) -> AsyncIterator[dict[str, Any]]:
+        """发送流式HTTP请求，按行解析响应"""
+        url = f"{self.base_url}{path}"
+        async with get_http_client(url).stream(
                 options['method'],
-                path,
-                options.get('body'),
-                options.get('headers', {})
-            )
-            response = conn.getresponse()
-
-            while True:
-                chunk = response.read1()
-                if not chunk:
-                    break
-
-                try:
-                    data = json.loads(chunk)
-                    on_data(data)
-                except json.JSONDecodeError:
-                    print('数据块解析失败')
-
-        finally:
-            conn.close()
\ No newline at end of file
+                url,
+                content=options.get('body'),
+                headers=options.get('headers', {})
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise Exception(f'请求失败，状态码: {response.status_code}, 响应: {response.text}')
+
+            async for data in iter_ndjson(response.aiter_bytes()):
+                yield data
\ No newline at end of file
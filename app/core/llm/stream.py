@@ -0,0 +1,181 @@
+"""
+LLM 流式响应解析模块
+网络读取的数据块与消息边界无关，一个数据块可能包含多条消息，也可能只有半条，
+多字节的UTF-8字符也可能被截断在两个数据块之间；
+解析时先增量解码并按行缓冲，完整的一行才解析为一条消息
+"""
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, List, Optional
+
+# SSE 的行结束符为 \r\n、\r 或 \n
+_LINE_END = re.compile(r'\r\n|\r|\n')
+
+# OpenAI 兼容接口的结束标记
+SSE_DONE = '[DONE]'
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """
+    按行解析 NDJSON 字节流，如 Ollama 的流式响应
+    Args:
+        chunks: 字节数据块的异步迭代器
+    Returns:
+        AsyncIterator: 每行解析出的对象，空行跳过
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+            # json.loads 可直接解析 UTF-8 字节，完整的一行不会截断多字节字符
+            line = bytes(buffer[start:end]).strip()
+            start = end + 1
+            if line:
+                yield json.loads(line)
+        # 每个数据块只移动一次剩余的半行
+        del buffer[:start]
+
+    line = bytes(buffer).strip()
+    if line:
+        yield json.loads(line)
+
+
+class ServerSentEvent:
+    """一条 SSE 消息"""
+
+    __slots__ = ('event', 'data', 'id', 'retry')
+
+    def __init__(self, event: str = 'message', data: str = '', id: Optional[str] = None, retry: Optional[int] = None):
+        self.event = event
+        self.data = data
+        self.id = id
+        self.retry = retry
+
+    def json(self) -> Any:
+        return json.loads(self.data)
+
+    def __repr__(self):
+        return f"ServerSentEvent(event={self.event!r}, data={self.data!r}, id={self.id!r}, retry={self.retry!r})"
+
+
+class SSEDecoder:
+    """
+    增量解析 SSE 字节流
+    按 WHATWG 规范处理 data/event/id/retry 字段，以冒号开头的注释行（如保活消息）跳过，
+    空行结束一条消息；用法：
+        decoder = SSEDecoder()
+        for chunk in chunks:
+            for event in decoder.feed(chunk):
+                ...
+        events = decoder.flush()
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._buffer = ''
+        self._event = None
+        self._data = []
+        self._retry = None
+        self.last_event_id = None  # 最近一条消息的ID，重连时作为 Last-Event-ID
+        self.retry = None  # 服务端指定的重连间隔（毫秒）
+
+    def feed(self, chunk: bytes) -> List[ServerSentEvent]:
+        """
+        解析一个数据块
+        Args:
+            chunk: 网络读取的字节数据
+        Returns:
+            List[ServerSentEvent]: 本数据块中完整的消息
+        """
+        text = self._decoder.decode(chunk)
+        if not text:
+            return []
+        buffer = self._buffer + text if self._buffer else text
+
+        if '\r' in buffer:
+            lines = []
+            position = 0
+            for match in _LINE_END.finditer(buffer):
+                # 末尾的 \r 可能与下一个数据块开头的 \n 组成一个换行
+                if match.group() == '\r' and match.end() == len(buffer):
+                    break
+                lines.append(buffer[position:match.start()])
+                position = match.end()
+            self._buffer = buffer[position:]
+        else:
+            # 只有 \n 换行时直接切分，最后一段是不完整的行
+            lines = buffer.split('\n')
+            self._buffer = lines.pop()
+
+        events = []
+        for line in lines:
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self) -> List[ServerSentEvent]:
+        """
+        流结束时解析剩余的内容；部分服务端最后一条消息之后没有空行，同样派发
+        Returns:
+            List[ServerSentEvent]: 剩余的消息
+        """
+        rest = self._buffer + self._decoder.decode(b'', final=True)
+        self._buffer = ''
+        events = []
+        for line in _LINE_END.split(rest) + ['']:
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _process_line(self, line: str) -> Optional[ServerSentEvent]:
+        if not line:
+            return self._dispatch()
+        if line.startswith(':'):
+            # 注释行，通常是保活消息
+            return None
+
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+
+        if field == 'data':
+            self._data.append(value)
+        elif field == 'event':
+            self._event = value
+        elif field == 'id':
+            if '\0' not in value:
+                self.last_event_id = value
+        elif field == 'retry':
+            if value.isdigit():
+                self.retry = self._retry = int(value)
+        return None
+
+    def _dispatch(self) -> Optional[ServerSentEvent]:
+        data, event, retry = self._data, self._event, self._retry
+        self._data, self._event, self._retry = [], None, None
+        if not data:
+            return None
+        return ServerSentEvent(event or 'message', '\n'.join(data), self.last_event_id, retry)
+
+
+async def iter_sse(chunks: AsyncIterator[bytes]) -> AsyncIterator[ServerSentEvent]:
+    """
+    解析 SSE 字节流
+    Args:
+        chunks: 字节数据块的异步迭代器
+    Returns:
+        AsyncIterator[ServerSentEvent]: 逐条返回消息
+    """
+    decoder = SSEDecoder()
+    async for chunk in chunks:
+        for event in decoder.feed(chunk):
+            yield event
+    for event in decoder.flush():
+        yield event
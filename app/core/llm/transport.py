@@ -0,0 +1,58 @@
+"""
+LLM HTTP 传输模块
+所有提供商共用基于 httpx.AsyncClient 的连接池：每个服务地址一个客户端，连接保持复用，
+并限制单个地址的并发连接数；请求不阻塞事件循环，一个进程可同时进行多个生成请求
+"""
+import asyncio
+import weakref
+from urllib.parse import urlparse
+
+import httpx
+
+from app.core.config import settings
+
+# 事件循环 -> {服务地址: 客户端}，客户端的连接只能在创建它的事件循环中使用
+_clients = weakref.WeakKeyDictionary()
+
+
+def _create_client() -> httpx.AsyncClient:
+    max_connections = int(settings.LLM_HTTP_MAX_CONNECTIONS_PER_HOST)
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=float(settings.LLM_HTTP_KEEPALIVE_EXPIRY)
+        ),
+        timeout=httpx.Timeout(
+            connect=float(settings.LLM_HTTP_CONNECT_TIMEOUT),
+            # 生成较长的回答时，两次数据之间的间隔可能较长
+            read=float(settings.LLM_HTTP_READ_TIMEOUT),
+            write=float(settings.LLM_HTTP_CONNECT_TIMEOUT),
+            # 等待连接池空闲连接的时间不限，由连接数限制排队
+            pool=None
+        )
+    )
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    """
+    获取服务地址对应的客户端
+    Args:
+        url: 请求地址，按 scheme://host:port 区分客户端
+    Returns:
+        httpx.AsyncClient: 共享的客户端，调用方不应关闭
+    """
+    parts = urlparse(url)
+    origin = (parts.scheme, parts.hostname, parts.port)
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(origin)
+    if client is None or client.is_closed:
+        client = clients[origin] = _create_client()
+    return client
+
+
+async def close_http_clients():
+    """关闭当前事件循环中的所有客户端，在应用退出时调用"""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
@@ -0,0 +1,306 @@
+"""
+目录大纲索引模块
+"""
+from array import array
+from bisect import bisect_left
+
+
+class OutlineIndex:
+    """
+    目录大纲索引，每篇文档构建一次，使标题路径查询为常数时间
+    标题的级别、位置与父标题保存在并行的数组中，标题文本只在标题表中保存一份，
+    每个标题只占用几十个字节，不再为每个标题保留字典和节点对象
+    iter_sections 扫描到的标题通过 append 追加，可以边扫描边查询
+    """
+
+    def __init__(self, outline=None):
+        # 传入列表时，后续追加的标题同样写入该列表，调用方可以继续使用原有的大纲列表
+        self.items = outline if isinstance(outline, list) else None
+        self.levels = array('b')
+        self.positions = array('q')
+        self.title_ids = array('l')
+        self.parents = array('l')  # 父标题的下标，-1 表示没有父标题
+        self.firsts = array('l')  # 同名同级标题中第一次出现的下标
+        self.titles = []  # 标题表
+        self.anchors = []  # 与标题表对应的锚点ID，None 表示尚未生成
+        self._title_ids = {}
+        # 每个标题第一次出现的下标，同名标题出现在其他级别时记录到 _first_by_level
+        self._title_firsts = array('l')
+        self._first_by_level = {}  # (title_id, level) -> 第一次出现的下标
+        self._last_by_level = [-1] * 7  # 每个级别最近出现的标题
+        self._last_position = -1
+        self._sorted = True  # 位置是否递增，递增时按位置二分查找
+
+        if outline:
+            self.extend(outline)
+
+    def append(self, item):
+        self._add(item)
+        if self.items is not None:
+            self.items.append(item)
+
+    def extend(self, items):
+        """
+        批量添加标题，与逐个 append 的结果一致，但不写入传入的列表
+        Args:
+            items (Iterable[dict]): 大纲项
+        """
+        title_ids = self._title_ids
+        titles = self.titles
+        title_firsts = self._title_firsts
+        levels = self.levels
+        last_by_level = self._last_by_level
+        ids, parents, firsts, positions, new_levels = [], [], [], [], []
+        index = len(levels)
+        last_position = self._last_position
+
+        for item in items:
+            title = item['title']
+            level = item['level']
+            position = item['position']
+
+            title_id = title_ids.get(title)
+            if title_id is None:
+                title_id = len(titles)
+                title_ids[title] = title_id
+                titles.append(title)
+                self.anchors.append(item.get('anchorId'))
+                title_firsts.append(index)
+                first = index
+            else:
+                first = title_firsts[title_id]
+                if (levels[first] if first < len(levels) else new_levels[first - len(levels)]) != level:
+                    first = self._first_by_level.setdefault((title_id, level), index)
+
+            if position <= last_position:
+                self._sorted = False
+            last_position = position
+
+            ids.append(title_id)
+            parents.append(last_by_level[level - 1])
+            firsts.append(first)
+            positions.append(position)
+            new_levels.append(level)
+            last_by_level[level] = index
+            index += 1
+
+        self._last_position = last_position
+        levels.extend(new_levels)
+        self.positions.extend(positions)
+        self.title_ids.extend(ids)
+        self.parents.extend(parents)
+        self.firsts.extend(firsts)
+
+    def _add(self, item):
+        title = item['title']
+        level = item['level']
+        position = item['position']
+
+        title_id = self._title_ids.get(title)
+        if title_id is None:
+            title_id = len(self.titles)
+            self._title_ids[title] = title_id
+            self.titles.append(title)
+            self.anchors.append(item.get('anchorId'))
+            self._title_firsts.append(len(self.levels))
+
+        index = len(self.levels)
+        if position <= self._last_position:
+            self._sorted = False
+        self._last_position = position
+        self.levels.append(level)
+        self.positions.append(position)
+        self.title_ids.append(title_id)
+        # 与原有的向前查找逻辑一致：父标题为此前最近一个级别恰好小 1 的标题
+        self.parents.append(self._last_by_level[level - 1])
+        self.firsts.append(self._find_first(title_id, level, index))
+        self._last_by_level[level] = index
+
+    def _find_first(self, title_id, level, index):
+        # 绝大多数标题只出现在一个级别，按标题记录即可，无需为每个标题建立字典项
+        first = self._title_firsts[title_id]
+        if first == index or self.levels[first] == level:
+            return first
+        return self._first_by_level.setdefault((title_id, level), index)
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __iter__(self):
+        for index in range(len(self.levels)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.levels)
+        title_id = self.title_ids[index]
+        item = {'level': self.levels[index], 'title': self.titles[title_id], 'position': self.positions[index]}
+        if self.anchors[title_id] is not None:
+            item['anchorId'] = self.anchors[title_id]
+        return item
+
+    def title(self, index):
+        return self.titles[self.title_ids[index]]
+
+    def locate(self, position):
+        """
+        根据位置查找标题的下标
+        Args:
+            position (int): 标题位置
+        Returns:
+            int: 下标，不存在时返回-1
+        """
+        positions = self.positions
+        if self._sorted:
+            index = bisect_left(positions, position)
+            return index if index < len(positions) and positions[index] == position else -1
+        for index, value in enumerate(positions):
+            if value == position:
+                return index
+        return -1
+
+    def find(self, title, level, position=None):
+        """
+        查找标题的下标
+        Args:
+            title (str): 标题
+            level (int): 标题级别
+            position (int, optional): 标题位置，不提供时返回同名同级标题中第一次出现的下标
+        Returns:
+            int: 下标，不存在时返回None
+        """
+        title_id = self._title_ids.get(title)
+        if title_id is None:
+            return None
+        if position is None:
+            first = self._title_firsts[title_id]
+            if self.levels[first] == level:
+                return first
+            return self._first_by_level.get((title_id, level))
+
+        index = self.locate(position)
+        if index >= 0 and self.title_ids[index] == title_id and self.levels[index] == level:
+            return index
+        return None
+
+    def path(self, index):
+        """
+        获取标题的完整路径，如 "第一章 > 第一节 > 概述"，沿父标题下标向上拼接
+        """
+        titles = []
+        while index >= 0:
+            titles.append(self.titles[self.title_ids[index]])
+            index = self.parents[index]
+        titles.reverse()
+        return ' > '.join(titles)
+
+    def breadcrumb(self, title, level, position=None):
+        """
+        获取标题的完整路径
+        Returns:
+            str: 标题路径，不存在时返回None
+        """
+        index = self.find(title, level, position)
+        return self.path(index) if index is not None else None
+
+    def heading_paths(self, indices):
+        """
+        获取各标题的路径，跳过空标题，同名同级标题取第一次出现的位置
+        Args:
+            indices (Iterable[int]): 标题下标
+        Returns:
+            list: 标题路径，按出现顺序
+        """
+        return [self.path(self.firsts[index]) for index in indices if self.titles[self.title_ids[index]]]
+
+
+class SectionGroup:
+    """
+    合并后的段落，所含标题只记录为大纲中的下标，不再为每个标题保存字典
+    相邻段落合并时标题是连续的，记录为下标范围；累积段落只记录各段落自身的标题，记录为下标数组
+    按原文范围分割时，layout 记录内容在原文中的布局，与 content 同步拼接
+    """
+
+    __slots__ = ('heading', 'level', 'content', 'position', 'start', 'end', 'index', 'headings', 'layout')
+
+    def __init__(self, heading, level, content, position, index=-1, start=None, end=None, layout=None):
+        self.heading = heading
+        self.level = level
+        self.content = content
+        self.position = position
+        self.index = index  # 段落自身标题在大纲中的下标，-1 表示没有标题
+        self.headings = range(index, index + 1) if index >= 0 else range(0)
+        self.start = start
+        self.end = end
+        self.layout = list(layout) if layout is not None else None
+
+    def merge(self, index, content, end=None, layout=None):
+        """
+        并入紧随其后的单个段落
+        Args:
+            index (int): 该段落标题的下标，-1 表示没有标题
+            content (str): 合并后的内容
+            end (int, optional): 该段落在原文中的结束位置
+            layout (list, optional): 追加到内容末尾的部分的布局
+        """
+        self.content = content
+        if index >= 0:
+            self.headings = range(self.headings.start if self.headings else index, index + 1)
+        if self.start is not None and end is not None:
+            self.end = end
+        if self.layout is not None and layout is not None:
+            self.layout.extend(layout)
+
+    def detached(self):
+        """复制段落，标题只保留段落自身的标题"""
+        return SectionGroup(self.heading, self.level, self.content, self.position, self.index, self.start, self.end,
+                            self.layout)
+
+    def accumulate(self, other, content):
+        """
+        累积后续段落，只记录该段落自身的标题
+        Args:
+            other (SectionGroup): 后续段落
+            content (str): 累积后的内容
+        """
+        self.content = content
+        if other.index >= 0:
+            if not isinstance(self.headings, array):
+                self.headings = array('l', self.headings)
+            self.headings.append(other.index)
+        if self.start is not None and other.end is not None:
+            self.end = other.end
+        if self.layout is not None and other.layout is not None:
+            # 与内容的拼接方式一致：空行、后续段落的标题行、后续段落的内容
+            self.layout.append(('\n\n' + other.heading_line, other.start))
+            self.layout.extend(other.layout)
+
+    @property
+    def heading_line(self):
+        return '#' * self.level + ' ' + self.heading + '\n' if self.heading else ''
+
+    def source_range(self, with_heading=False):
+        """
+        带有原文范围时返回 {'start', 'end'}，记录了布局时另含 layout，否则返回空字典
+        Args:
+            with_heading (bool): 内容前是否拼接了标题行
+        """
+        if self.start is None:
+            return {}
+        if self.layout is None:
+            return {'start': self.start, 'end': self.end}
+        heading = [(self.heading_line, self.start)] if with_heading and self.heading_line else []
+        return {'start': self.start, 'end': self.end, 'layout': heading + self.layout}
+
+
+def build_outline_index(outline):
+    """
+    获取大纲索引，已经是索引时直接返回
+    Args:
+        outline (list | OutlineIndex): 目录大纲
+    Returns:
+        OutlineIndex: 大纲索引
+    """
+    if isinstance(outline, OutlineIndex):
+        return outline
+    return OutlineIndex(outline)
@@ -1,24 +1,33 @@
 import re
 
+from app.core.markdown import topic
+
+
 def extract_outline(text):
     """
-
+    提取文档大纲，代码块中的 # 行不视为标题
     :param text:
     :return:
     """
-    outline_regex = re.compile(r'^(#{1,6})\s+(.+?)(?:\s*\{#[\w-]+\})?\s*$', re.MULTILINE)
     outline = []
-    for match in outline_regex.finditer(text):
-        level = len(match.group(1))
-        title = match.group(2).strip()
-        outline.append({
-            'level': level,
-            'title': title,
-            'position': match.start()
-        })
+    for _ in iter_sections(iter_lines(text), outline):
+        pass
     return outline
 
 
+def iter_lines(text):
+    """
+    按 \\n 逐行切分文本并保留换行符，与正则的多行模式一致，不会在其他换行字符处断行
+    """
+    position = 0
+    size = len(text)
+    while position < size:
+        end = text.find('\n', position)
+        end = size if end < 0 else end + 1
+        yield text[position:end]
+        position = end
+
+
 def split_by_headings(text, outline):
     if len(outline) == 0:
         return [{
@@ -47,8 +56,8 @@ def split_by_headings(text, outline):
         next_item = outline[i + 1] if i < len(outline) - 1 else None
 
         # 获取标题行并计算内容起始位置
-        heading_line = text[current['position']:].split('\n')[0]
-        start_pos = current['position'] + len(heading_line) + 1
+        line_end = text.find('\n', current['position'])
+        start_pos = (line_end if line_end >= 0 else len(text)) + 1
         end_pos = next_item['position'] if next_item else len(text)
 
         # 提取内容并存入列表
@@ -60,4 +69,158 @@ def split_by_headings(text, outline):
             'position': current['position']
         })
 
-    return sections
\ No newline at end of file
+    return sections
+
+# 逐行扫描时使用的正则，语义与 extract_outline 保持一致
+_HEADING_LINE_REGEX = re.compile(r'^(#{1,6})\s+(.+?)(?:\s*\{#[\w-]+\})?\s*$')
+# 只有 # 号的标题行，其标题位于下一个非空行（\s+ 会跨越换行）
+_BARE_HEADING_REGEX = re.compile(r'(#{1,6})\s*')
+_TITLE_REGEX = re.compile(r'(.+?)(?:\s*\{#[\w-]+\})?\s*$')
+# 代码块的开始行：最多 3 个空格缩进，3 个以上的 ` 或 ~，` 代码块的信息字符串中不能再有 `
+_FENCE_OPEN_REGEX = re.compile(r' {0,3}(`{3,}(?=[^`]*$)|~{3,})')
+_FENCE_CLOSE_REGEX = re.compile(r' {0,3}(`{3,}|~{3,})[ \t]*')
+
+
+def iter_sections(lines, outline=None):
+    """
+    逐行扫描Markdown文本并按标题分割，每个段落结束时立即产出
+    大纲、段落边界和锚点ID在同一次扫描中得到，目录可直接由大纲生成；
+    ``` 或 ~~~ 代码块中的 # 行属于段落内容，不视为标题
+    结果与 split_by_headings(text, extract_outline(text)) 完全一致，但无需将全文载入内存
+    每个段落额外记录 start、end，即该段落（含标题行）在原文中的范围，body 为内容行在原文中的起始位置；
+    传入字节行时范围为字节偏移，可直接用于 mmap 切片，position 仍为字符偏移
+    Args:
+        lines (Iterable[str | bytes]): 保留行尾换行符的文本行，如以文本模式打开的文件对象或 SourceFile.lines()
+        outline (list, optional): 扫描到的标题会按顺序追加到该列表中，每项包含 level、title、position、anchorId
+    Returns:
+        Generator[dict]: 段落对象
+    """
+    if outline is None:
+        outline = []
+
+    position = 0  # 当前行在全文中的字符偏移
+    offset = 0  # 当前行在原文中的偏移，字节行时为字节偏移
+    current = None  # 当前标题，None 表示第一个标题之前的内容
+    current_offset = 0
+    buffer = []  # 当前段落的内容行
+    body_offset = 0  # 内容行在原文中的起始偏移
+    bare = None  # 待确定标题的 # 行：(level, position, offset, 下一行的偏移)
+    bare_lines = []
+    fence = None  # 当前所在代码块的围栏，如 ```
+
+    def open_section(level, title, heading_position, heading_offset):
+        nonlocal current, current_offset
+        previous, previous_offset = current, current_offset
+        current = {'level': level, 'title': title, 'position': heading_position}
+        current_offset = heading_offset
+        outline.append({**current, 'anchorId': topic.generate_anchor_id(title)})
+
+        content = ''.join(buffer).strip()
+        if previous is None:
+            # 第一个标题前的内容
+            if heading_position > 0 and len(content) > 0:
+                return {'heading': None, 'level': 0, 'content': content, 'position': 0,
+                        'start': 0, 'end': heading_offset, 'body': body_offset}
+            return None
+        return {
+            'heading': previous['title'],
+            'level': previous['level'],
+            'content': content,
+            'position': previous['position'],
+            'start': previous_offset,
+            'end': heading_offset,
+            'body': body_offset
+        }
+
+    for line in lines:
+        line_offset = offset
+        offset += len(line)
+        if isinstance(line, bytes):
+            # 与文本模式读取一致，统一换行符
+            line = line.decode('utf-8')
+            if line.endswith('\r\n'):
+                line = line[:-2] + '\n'
+
+        line_position = position
+        position += len(line)
+        text = line[:-1] if line.endswith('\n') else line
+
+        if bare is not None:
+            if not text.strip():
+                bare_lines.append(line)
+                continue
+
+            # 标题位于第一个非空行，该行同时属于段落内容
+            title = _TITLE_REGEX.match(text.lstrip()).group(1).strip()
+            section = open_section(bare[0], title, bare[1], bare[2])
+            buffer = bare_lines[1:] + [line]
+            body_offset = bare[3]
+            bare = None
+            bare_lines = []
+            if section is not None:
+                yield section
+            continue
+
+        if fence is not None:
+            # 代码块内的行均为内容，遇到同类且不短于开始围栏的围栏时结束
+            close_match = _FENCE_CLOSE_REGEX.fullmatch(text)
+            if close_match and close_match.group(1)[0] == fence[0] and len(close_match.group(1)) >= len(fence):
+                fence = None
+            buffer.append(line)
+            continue
+
+        fence_match = _FENCE_OPEN_REGEX.match(text)
+        if fence_match:
+            fence = fence_match.group(1)
+            buffer.append(line)
+            continue
+
+        bare_match = _BARE_HEADING_REGEX.fullmatch(text)
+        if bare_match:
+            bare = (len(bare_match.group(1)), line_position, line_offset, offset)
+            bare_lines = [line]
+            continue
+
+        match = _HEADING_LINE_REGEX.match(text)
+        if match:
+            section = open_section(len(match.group(1)), match.group(2).strip(), line_position, line_offset)
+            buffer = []
+            body_offset = offset
+            if section is not None:
+                yield section
+            continue
+
+        buffer.append(line)
+
+    if bare is not None:
+        # 文件结束仍未出现非空行：只要 # 之后除首个字符外还有非换行的空白字符，即构成空标题
+        rest = ''.join(bare_lines)[bare[0]:]
+        if any(char != '\n' for char in rest[1:]):
+            section = open_section(bare[0], '', bare[1], bare[2])
+            buffer = bare_lines[1:]
+            body_offset = bare[3]
+            if section is not None:
+                yield section
+        else:
+            buffer.extend(bare_lines)
+
+    if current is None:
+        yield {
+            'heading': None,
+            'level': 0,
+            'content': ''.join(buffer).strip(),
+            'position': 0,
+            'start': 0,
+            'end': offset,
+            'body': body_offset
+        }
+    else:
+        yield {
+            'heading': current['title'],
+            'level': current['level'],
+            'content': ''.join(buffer).strip(),
+            'position': current['position'],
+            'start': current_offset,
+            'end': offset,
+            'body': body_offset
+        }
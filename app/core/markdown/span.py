@@ -0,0 +1,248 @@
+"""
+源文件范围模块
+分块只记录 (file_id, start, end) 字节偏移，文本在访问时才从 mmap 中解码；
+分块直接引用打开它的源文件，同一文件的多次分割各自持有独立的映射，互不影响
+
+分割时拼接的内容用布局表示，布局由以下两种项组成，按顺序连接即为内容：
+    (start, end): 原文的字节范围，统一换行符后原样使用
+    (text, position): 拼接时插入的文本，如段落之间的空行和重新生成的标题行，position 为其对应的原文位置
+"""
+import mmap
+import os
+import re
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+class SourceFile:
+    """只读映射的源文件"""
+
+    def __init__(self, file_id, path):
+        self.file_id = file_id
+        self.path = path
+        self.closed = False
+        self._file = open(path, 'rb')
+        # 空文件无法映射
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buffer = b''
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def read(self, start, end):
+        """
+        解码指定范围的原文
+        Args:
+            start (int): 起始字节偏移
+            end (int): 结束字节偏移
+        Returns:
+            str: 原文，换行符保持不变
+        """
+        return self.buffer[start:end].decode('utf-8')
+
+    def lines(self):
+        """
+        逐行读取原文，保留行尾换行符
+        Returns:
+            Generator[bytes]: 字节行
+        """
+        buffer = self.buffer
+        size = len(buffer)
+        position = 0
+        while position < size:
+            end = buffer.find(b'\n', position)
+            end = size if end < 0 else end + 1
+            yield buffer[position:end]
+            position = end
+
+    def close(self):
+        self.closed = True
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+
+@contextmanager
+def open_source(file_id, path):
+    """
+    打开源文件，退出时关闭映射
+    Args:
+        file_id (str): 文件ID
+        path (str): 文件路径
+    Returns:
+        SourceFile: 源文件，由它创建的分块只能在退出前读取内容
+    """
+    source = SourceFile(file_id, path)
+    try:
+        yield source
+    finally:
+        source.close()
+
+
+def format_result(summary, content):
+    """在分块内容前加上摘要标题"""
+    return f"> **📑 Summarization：** *{summary}*\n\n---\n\n{content}"
+
+
+class _RawText:
+    """原文范围的文本，将统一换行符后的字符偏移换算为字节偏移，偏移按升序查询时增量计算"""
+
+    def __init__(self, source, start, end):
+        self.start = start
+        self.raw = source.read(start, end)
+        # 被统一为 \n 的 \r\n 在统一后文本中的位置，每个多占一个字符
+        self.crlf = [match.start() - i for i, match in enumerate(re.finditer('\r\n', self.raw))]
+        self.length = len(self.raw) - len(self.crlf)
+        self._last_index = 0
+        self._last_offset = start
+
+    def offset(self, index):
+        """统一换行符后的字符偏移对应的字节偏移"""
+        index += bisect_left(self.crlf, index)
+        if index < self._last_index:
+            self._last_index, self._last_offset = 0, self.start
+        self._last_offset += len(self.raw[self._last_index:index].encode('utf-8'))
+        self._last_index = index
+        return self._last_offset
+
+
+def body_layout(source, start, end):
+    """
+    段落内容的布局，与 iter_sections 的段落内容相同，即原文范围统一换行符并去除首尾空白
+    Args:
+        source (SourceFile): 源文件
+        start (int): 内容行的起始字节偏移
+        end (int): 结束字节偏移
+    Returns:
+        list: 布局，内容为空时为空列表
+    """
+    text = _RawText(source, start, end)
+    normalized = text.raw.replace('\r\n', '\n')
+    content_start = len(normalized) - len(normalized.lstrip())
+    content_end = len(normalized.rstrip())
+    if content_start >= content_end:
+        return []
+    return [(text.offset(content_start), text.offset(content_end))]
+
+
+def render_layout(source, layout):
+    """
+    按布局拼接内容
+    Args:
+        source (SourceFile): 源文件
+        layout (list): 布局
+    Returns:
+        str: 内容
+    """
+    return ''.join(item[0] if isinstance(item[0], str) else source.read(item[0], item[1]).replace('\r\n', '\n')
+                   for item in layout)
+
+
+def slice_layout(source, layout, ranges):
+    """
+    截取布局中的多个字符范围，每段原文只读取一次
+    Args:
+        source (SourceFile): 源文件
+        layout (list): 布局
+        ranges (list): 按升序排列、互不重叠的 (start, end) 字符范围
+    Returns:
+        list: 各范围的布局
+    """
+    segments = []  # (字符起始, 字符结束, 布局项, 原文)
+    position = 0
+    for item in layout:
+        text = None if isinstance(item[0], str) else _RawText(source, item[0], item[1])
+        length = len(item[0]) if text is None else text.length
+        segments.append((position, position + length, item, text))
+        position += length
+
+    result = []
+    first = 0
+    for start, end in ranges:
+        # 范围按升序排列，跳过已经结束的片段
+        while first < len(segments) and segments[first][1] <= start:
+            first += 1
+        pieces = []
+        for segment_start, segment_end, item, text in segments[first:]:
+            if segment_start >= end:
+                break
+            low, high = max(start, segment_start) - segment_start, min(end, segment_end) - segment_start
+            if low >= high:
+                continue
+            if text is None:
+                pieces.append((item[0][low:high], item[1]))
+            else:
+                pieces.append((text.offset(low), text.offset(high)))
+        result.append(pieces)
+    return result
+
+
+def layout_range(layout, position):
+    """
+    布局覆盖的原文范围
+    Args:
+        layout (list): 布局
+        position (int): 布局为空时使用的位置
+    Returns:
+        dict: {'start', 'end'}
+    """
+    offsets = [offset for item in layout for offset in ((item[1],) if isinstance(item[0], str) else item)]
+    if not offsets:
+        return {'start': position, 'end': position}
+    return {'start': min(offsets), 'end': max(offsets)}
+
+
+class ChunkSpan:
+    """
+    文本块在源文件中的范围，内容按需解码
+    源文件关闭后无法再读取内容，需要保存的文本应在分割过程中写出
+    """
+
+    __slots__ = ('file_id', 'start', 'end', 'summary', 'layout', '_source')
+
+    def __init__(self, file_id, start, end, summary='', source=None, layout=None):
+        self.file_id = file_id
+        self.start = start
+        self.end = end
+        self.summary = summary
+        self.layout = layout
+        self._source = source
+
+    @property
+    def source(self):
+        if self._source is None or self._source.closed:
+            raise ValueError(f"源文件 {self.file_id} 未打开")
+        return self._source
+
+    @property
+    def content(self):
+        """
+        有布局时按布局拼接，与 split_markdown 的分块内容相同；
+        否则为原文中对应范围的内容，只统一换行符并去除首尾空白
+        """
+        if self.layout is not None:
+            return render_layout(self.source, self.layout)
+        return self.source.read(self.start, self.end).replace('\r\n', '\n').strip()
+
+    @property
+    def result(self):
+        return format_result(self.summary, self.content)
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __str__(self):
+        return self.content
+
+    def __repr__(self):
+        return f"ChunkSpan({self.file_id!r}, {self.start}, {self.end})"
+
+    def to_dict(self):
+        return {'fileId': self.file_id, 'start': self.start, 'end': self.end, 'summary': self.summary,
+                'layout': self.layout}
+
+    @classmethod
+    def from_dict(cls, data, source=None):
+        return cls(data['fileId'], data['start'], data['end'], data.get('summary', ''), source, data.get('layout'))
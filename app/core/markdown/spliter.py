@@ -3,277 +3,570 @@ Markdown文档分割模块
 """
 import logging
 import re
+from collections import deque
 
 from app.core.markdown import summary
-from app.core.markdown.parser import extract_outline, split_by_headings
+from app.core.markdown.outline import SectionGroup, build_outline_index
+from app.core.markdown.parser import iter_lines, iter_sections
+from app.core.markdown.span import ChunkSpan, format_result, body_layout, slice_layout, layout_range
+from app.core.markdown.tokens import measure_batch
+
+def split_markdown(md_text, min_split_len, max_split_len, length_function=len):
+    # 一次扫描同时得到大纲与段落
+    outline = []
+    sections = list(iter_sections(iter_lines(md_text), outline))
+    res = process_sections(sections, build_outline_index(outline), min_split_len, max_split_len, length_function)
+    if length_function is not len:
+        # 与 split_markdown_stream 一致，按Token计数时上限为硬性限制
+        res = enforce_max_length(res, max_split_len, length_function)
+    return [_with_summary_header(r) for r in res]
+
+
+def split_markdown_stream(lines, min_split_len, max_split_len, outline=None, length_function=len):
+    """
+    流式分割Markdown文档，逐行读取并在每个分块确定后立即产出
+    输出与 split_markdown 一致，内存占用取决于最长的单个段落而非整篇文档
+    Args:
+        lines (Iterable[str]): 保留行尾换行符的文本行，如以文本模式打开的文件对象
+        min_split_len (int): 最小分割字数
+        max_split_len (int): 最大分割字数
+        outline (list, optional): 扫描到的标题会追加到该列表中，可用于生成目录
+        length_function (callable, optional): 长度函数，默认按字符计数，传入 TokenCounter 时按Token计数
+    Returns:
+        Generator[dict]: 分块结果
+    """
+    # 扫描与摘要共用同一个索引，新扫描到的标题在查询时增量建立索引
+    outline = build_outline_index(outline)
+    sections = iter_sections(lines, outline)
+    results = iter_process_sections(sections, outline, min_split_len, max_split_len, length_function)
+    if length_function is not len:
+        # 按Token计数时上限为硬性限制，拼接标题行后超出上限的分块需要再次切分
+        results = enforce_max_length(results, max_split_len, length_function)
+    for r in results:
+        yield _with_summary_header(r)
+
+
+def split_markdown_file(file_path, min_split_len, max_split_len, outline=None, length_function=len):
+    """
+    流式分割Markdown文件
+    Args:
+        file_path (str): 文件路径
+        min_split_len (int): 最小分割字数
+        max_split_len (int): 最大分割字数
+        outline (list, optional): 扫描到的标题会追加到该列表中
+        length_function (callable, optional): 长度函数，默认按字符计数，传入 TokenCounter 时按Token计数
+    Returns:
+        Generator[dict]: 分块结果
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        yield from split_markdown_stream(f, min_split_len, max_split_len, outline, length_function)
 
-def split_markdown(md_text, min_split_len, max_split_len):
-    outline = extract_outline(md_text)
-    sections = split_by_headings(md_text, outline)
-    res = process_sections(sections, outline, min_split_len, max_split_len)
-    return [{**r, "result": f"> **📑 Summarization：** *{r['summary']}*\n\n---\n\n{r['content']}"} for r in res]
 
+def split_markdown_spans(source, min_split_len, max_split_len, outline=None, length_function=len):
+    """
+    以原文范围的形式分割Markdown文件
+    文件通过 mmap 读取，分块只记录原文范围与内容的布局，内容在访问时才解码；
+    分块的边界、摘要与内容均与 split_markdown 相同：超长内容在与 split_markdown 相同的文本上装箱，
+    再通过布局映射回原文，重新生成的标题行和段落之间的空行作为布局中的插入文本
+    需在 source 关闭前迭代并读取分块内容
+    Args:
+        source (SourceFile): 由 open_source 打开的源文件
+        min_split_len (int): 最小分割字数
+        max_split_len (int): 最大分割字数
+        outline (list, optional): 扫描到的标题会追加到该列表中
+        length_function (callable, optional): 长度函数，默认按字符计数，传入 TokenCounter 时按Token计数
+    Returns:
+        Generator[ChunkSpan]: 分块范围
+    """
+    def with_layout(section):
+        section['layout'] = body_layout(source, section['body'], section['end'])
+        return section
+
+    def split_pieces(content, layout, position):
+        ranges = _pack_spans(content, max_split_len, length_function)
+        return [{'content': content[start:end], 'layout': piece_layout, **layout_range(piece_layout, position)}
+                for (start, end), piece_layout in zip(ranges, slice_layout(source, layout, ranges))]
+
+    outline = build_outline_index(outline)
+    sections = (with_layout(section) for section in iter_sections(source.lines(), outline))
+    results = iter_process_sections(sections, outline, min_split_len, max_split_len, length_function,
+                                    lambda section: split_pieces(section.content, section.layout, section.start))
+    if length_function is not len:
+        # 按Token计数时上限为硬性限制
+        results = enforce_max_length(results, max_split_len, length_function,
+                                     lambda r: split_pieces(r['content'], r['layout'], r['start']))
+    for r in results:
+        yield ChunkSpan(source.file_id, r['start'], r['end'], r['summary'], source, r['layout'])
+
+
+def enforce_max_length(results, max_split_len, length_function=len, split_function=None):
+    """
+    确保每个分块的内容都不超过上限，超出的分块按段落、句子再次切分
+    Args:
+        results (Iterable[dict]): 分块结果
+        max_split_len (int): 最大分割长度
+        length_function (callable, optional): 长度函数
+        split_function (callable, optional): 超长分块的分割函数，接收分块结果，
+            返回不含摘要的分块列表，默认使用 split_long_section
+    Returns:
+        Generator[dict]: 分块结果
+    """
+    if split_function is None:
+        def split_function(r):
+            return [{'content': piece} for piece in split_long_section(r, max_split_len, length_function)]
 
-def split_long_section(section, max_split_length):
+    def split_result(r):
+        if length_function(r['content']) <= max_split_len:
+            return None
+        return split_function(r)
+
+    yield from _split_parts(results, lambda r: r['summary'], split_result, lambda r, s: {**r, 'summary': s})
+
+
+# 分块摘要末尾的分段信息
+PART_SUFFIX_REGEX = re.compile(r' - Part (\d+)/(\d+)$')
+
+
+def _iter_part_groups(items, summary_of):
+    """
+    按摘要末尾的 " - Part i/n" 将同一段落切分出的各部分归为一组
+    Args:
+        items (Iterable): 分块
+        summary_of (callable): 获取分块的摘要
+    Returns:
+        Generator[tuple]: (不含分段信息的摘要, 分块列表)，不属于任何分段的分块单独成组，摘要为 None
+    """
+    base, group = None, []
+    for item in items:
+        summary_text = summary_of(item)
+        match = PART_SUFFIX_REGEX.search(summary_text)
+        # 遇到其他分块或新的第1部分时结束当前分组，末尾部分被合并时分组不完整
+        if group and (match is None or int(match.group(1)) == 1 or summary_text[:match.start()] != base):
+            yield base, group
+            base, group = None, []
+        if match is None:
+            yield None, [item]
+            continue
+
+        base = summary_text[:match.start()]
+        group.append(item)
+        if int(match.group(1)) == int(match.group(2)):
+            yield base, group
+            base, group = None, []
+
+    if group:
+        yield base, group
+
+
+def _split_parts(items, summary_of, split_item, with_summary):
+    """
+    再次切分超长的分块，同一段落的各部分统一重新编号，而不是在原有分段信息后再追加一层
+    Args:
+        items (Iterable): 分块
+        summary_of (callable): 获取分块的摘要
+        split_item (callable): 分块未超出上限时返回 None，否则返回切分后的分块列表
+        with_summary (callable): 返回带有指定摘要的分块
+    Returns:
+        Generator: 分块
+    """
+    for base, group in _iter_part_groups(items, summary_of):
+        pieces = []
+        split = False
+        for item in group:
+            sub_items = split_item(item)
+            if sub_items is None:
+                pieces.append(item)
+            else:
+                pieces.extend(sub_items)
+                split = True
+
+        if not split:
+            yield from group
+            continue
+
+        if base is None:
+            base = summary_of(group[0])
+        for i, piece in enumerate(pieces):
+            yield with_summary(piece, f"{base} - Part {i + 1}/{len(pieces)}")
+
+
+def _with_summary_header(r):
+    # 原文范围只在内部使用，返回的分块只包含摘要与内容
+    return {'summary': r['summary'], 'content': r['content'], 'result': format_result(r['summary'], r['content'])}
+
+
+# 段落分隔符
+PARAGRAPH_SEPARATOR_REGEX = re.compile(r'\n\n+')
+# 句子结束符：中文标点直接断句，英文标点后需跟空白、引号/括号或位于末尾，以免切开小数和缩写；
+# 结束符后的引号、括号及空白归入当前句子
+SENTENCE_END_REGEX = re.compile(
+    r'(?:[。！？；…]+|[.!?]+(?=[\s"\'”’)）\]】」』]|$))[”’"\')）\]】」』]*\s*')
+
+
+def split_long_section(section, max_split_length, length_function=len):
     """
     分割超长段落
     Args:
         section (dict): 段落对象
         max_split_length (int): 最大分割字数
+        length_function (callable, optional): 长度函数，默认按字符计数，传入 TokenCounter 时按Token计数
     Returns:
         list: 分割后的段落数组
     """
-    content = section['content']
-    paragraphs = re.split(r'\n\n+', content)
+    return _split_content(section['content'], max_split_length, length_function)
+
+
+def _split_content(content, max_split_length, length_function=len):
+    return [content[start:end] for start, end in _pack_spans(content, max_split_length, length_function)]
+
+
+def _pack_spans(content, max_split_length, length_function=len):
+    """
+    先按段落、再按句子装箱，全程只记录偏移量
+    Returns:
+        list: 各分块去除首尾空白后的 (start, end) 范围
+    """
+    by_chars = length_function is len
     result = []
-    current_chunk = ''
-
-    for paragraph in paragraphs:
-        # 如果当前段落本身超过最大长度，可能需要进一步拆分
-        if len(paragraph) > max_split_length:
-            # 如果当前块不为空，先加入结果
-            if len(current_chunk) > 0:
-                result.append(current_chunk)
-                current_chunk = ''
-
-            # 对超长段落进行分割（例如，按句子或固定长度）
-            sentence_split = re.findall(r'[^.!?]+[.!?]+', paragraph) or [paragraph]
-
-            # 处理分割后的句子
-            sentence_chunk = ''
-            for sentence in sentence_split:
-                if len(sentence_chunk + sentence) <= max_split_length:
-                    sentence_chunk += sentence
-                else:
-                    if len(sentence_chunk) > 0:
-                        result.append(sentence_chunk)
-                    # 如果单个句子超过最大长度，可能需要进一步拆分
-                    if len(sentence) > max_split_length:
-                        # 简单地按固定长度分割
-                        for i in range(0, len(sentence), max_split_length):
-                            result.append(sentence[i:i + max_split_length])
-                    else:
-                        sentence_chunk = sentence
-
-            if len(sentence_chunk) > 0:
-                current_chunk = sentence_chunk
-        elif len(current_chunk + '\n\n' + paragraph) <= max_split_length:
-            # 如果添加当前段落不超过最大长度，则添加到当前块
-            current_chunk = current_chunk + '\n\n' + paragraph if len(current_chunk) > 0 else paragraph
+
+    def joined_length(chunk_length, chunk_end, piece_start, piece_length):
+        """
+        当前块追加一个片段后的长度，两者之间的分隔符一并计入
+        按Token计数时累加已度量的长度，只对拼接处附近的文本重新计数，不会重复度量整个块
+        """
+        if by_chars:
+            return chunk_length + (piece_start - chunk_end) + piece_length
+        length = chunk_length + piece_length
+        if piece_start > chunk_end:
+            length += length_function(content[chunk_end:piece_start]) + _join_delta(content, chunk_end, length_function)
+        return length + _join_delta(content, piece_start, length_function)
+
+    def emit(start, end):
+        # 与 strip() 一致地去除首尾空白，只移动偏移量
+        while start < end and content[start].isspace():
+            start += 1
+        while end > start and content[end - 1].isspace():
+            end -= 1
+        if start < end:
+            result.append((start, end))
+
+    # 段落边界只计算一次
+    paragraphs = []
+    position = 0
+    for match in PARAGRAPH_SEPARATOR_REGEX.finditer(content):
+        paragraphs.append((position, match.start()))
+        position = match.end()
+    paragraphs.append((position, len(content)))
+
+    # 按Token计数时批量度量各段落的长度
+    if by_chars:
+        paragraph_lengths = [end - start for start, end in paragraphs]
+    else:
+        paragraph_lengths = measure_batch([content[start:end] for start, end in paragraphs], length_function)
+
+    # 当前块的范围及长度，相邻段落之间连续，扩展时只需移动结束位置并累加长度
+    chunk_start = chunk_end = None
+    chunk_length = 0
+
+    for (paragraph_start, paragraph_end), paragraph_length in zip(paragraphs, paragraph_lengths):
+        if paragraph_length <= max_split_length:
+            if chunk_start is None:
+                chunk_start, chunk_end, chunk_length = paragraph_start, paragraph_end, paragraph_length
+                continue
+
+            length = joined_length(chunk_length, chunk_end, paragraph_start, paragraph_length)
+            if length <= max_split_length:
+                # 如果添加当前段落不超过最大长度，则添加到当前块
+                chunk_end, chunk_length = paragraph_end, length
+            else:
+                # 否则将当前块加入结果，并重新开始一个新块
+                emit(chunk_start, chunk_end)
+                chunk_start, chunk_end, chunk_length = paragraph_start, paragraph_end, paragraph_length
+            continue
+
+        # 当前段落本身超过最大长度：先输出当前块，再按句子装箱
+        if chunk_start is not None:
+            emit(chunk_start, chunk_end)
+            chunk_start = chunk_end = None
+
+        sentences = _sentence_spans(content, paragraph_start, paragraph_end)
+        if by_chars:
+            sentence_lengths = [end - start for start, end in sentences]
         else:
-            # 如果添加当前段落超过最大长度，则将当前块加入结果，并重新开始一个新块
-            result.append(current_chunk)
-            current_chunk = paragraph
+            sentence_lengths = measure_batch([content[start:end] for start, end in sentences], length_function)
+
+        for (sentence_start, sentence_end), sentence_length in zip(sentences, sentence_lengths):
+            if chunk_start is not None:
+                length = joined_length(chunk_length, chunk_end, sentence_start, sentence_length)
+                if length <= max_split_length:
+                    chunk_end, chunk_length = sentence_end, length
+                    continue
+                emit(chunk_start, chunk_end)
+                chunk_start = chunk_end = None
+
+            if sentence_length <= max_split_length:
+                chunk_start, chunk_end, chunk_length = sentence_start, sentence_end, sentence_length
+            else:
+                # 单个句子超过最大长度，按固定长度切分
+                for piece_start, piece_end in _slice_spans(content, sentence_start, sentence_end,
+                                                           max_split_length, length_function):
+                    emit(piece_start, piece_end)
+
+        # 未满的句子块留作当前块，可继续与后续段落合并
 
     # 添加最后一个块（如果有）
-    if len(current_chunk) > 0:
-        result.append(current_chunk)
+    if chunk_start is not None:
+        emit(chunk_start, chunk_end)
 
     return result
 
-def process_sections(sections, outline, min_split_length, max_split_length):
+
+# 按Token计数时，拼接处前后重新计数的字符数
+JOIN_WINDOW = 16
+
+
+def _join_delta(content, boundary, length_function):
+    """
+    拼接处的Token数修正：边界两侧的文本可能合并为一个Token，也可能相反，
+    只对边界附近的文本计数，得到拼接后与分别计数之间的差值
+    """
+    left = content[max(boundary - JOIN_WINDOW, 0):boundary]
+    right = content[boundary:boundary + JOIN_WINDOW]
+    if not left or not right:
+        return 0
+    return length_function(left + right) - length_function(left) - length_function(right)
+
+
+def _sentence_spans(content, start, end):
+    """
+    计算段落内各句子的范围，末尾没有结束符的内容作为最后一句
+    """
+    spans = []
+    position = start
+    for match in SENTENCE_END_REGEX.finditer(content, start, end):
+        spans.append((position, match.end()))
+        position = match.end()
+    if position < end:
+        spans.append((position, end))
+    return spans
+
+
+def _slice_spans(content, start, end, max_split_length, length_function=len):
+    """
+    按固定长度切分范围，保证每一片的长度都不超过上限
+    """
+    if length_function is len:
+        return [(i, min(i + max_split_length, end)) for i in range(start, end, max_split_length)]
+
+    spans = []
+    while start < end:
+        # 二分查找不超过上限的最长前缀，至少前进一个字符
+        low, high = start + 1, end
+        while low < high:
+            middle = (low + high + 1) // 2
+            if length_function(content[start:middle]) <= max_split_length:
+                low = middle
+            else:
+                high = middle - 1
+        spans.append((start, low))
+        start = low
+    return spans
+
+
+def process_sections(sections, outline, min_split_length, max_split_length, length_function=len):
     """
     处理段落，根据最小和最大分割字数进行分割
     Args:
         sections (list): 段落数组
-        outline (list): 目录大纲
+        outline (list | OutlineIndex): 目录大纲
         min_split_length (int): 最小分割字数
         max_split_length (int): 最大分割字数
+        length_function (callable, optional): 长度函数，默认按字符计数，传入 TokenCounter 时按Token计数
     Returns:
         list: 处理后的段落数组
     """
-    # 预处理：将相邻的小段落合并
-    preprocessed_sections = []
+    return list(iter_process_sections(sections, outline, min_split_length, max_split_length, length_function))
+
+
+def _merge_small_sections(sections, outline, min_split_length, max_split_length, length_function=len):
+    """
+    预处理：将相邻的小段落合并
+    Args:
+        sections (Iterable[dict]): 段落
+        outline (OutlineIndex): 大纲索引
+        min_split_length (int): 最小分割字数
+        max_split_length (int): 最大分割字数
+        length_function (callable, optional): 长度函数
+    Returns:
+        Generator[SectionGroup]: 合并后的段落
+    """
+    by_chars = length_function is len
+    positions = outline.positions
     current_section = None
+    next_index = 0  # 段落按顺序对应大纲中的标题，通常下一个标题段落即对应下一个下标
     for section in sections:
-        content_length = len(section['content'].strip())
+        heading = section.get('heading')
+        level = section.get('level')
+        content = section['content']
+
+        # 定位标题在大纲中的下标
+        if not level:
+            index = -1
+        elif next_index < len(positions) and positions[next_index] == section['position']:
+            index = next_index
+        else:
+            index = outline.locate(section['position'])
+        if index >= 0:
+            next_index = index + 1
+
+        content_length = length_function(content.strip())
 
         if content_length < min_split_length and current_section:
             # 如果当前段落小于最小长度且有累积段落，尝试合并
-            heading_str = '#' * section['level'] + ' ' + section['heading'] + '\n' if section.get('heading') else ''
-            merged_content = f"{current_section['content']}\n\n{heading_str}{section['content']}"
+            heading_str = '#' * level + ' ' + heading + '\n' if heading else ''
+            if by_chars:
+                # 按字符计数时直接由长度判断，合并后超出上限的内容无需拼接
+                fits = len(current_section.content) + 2 + len(heading_str) + len(content) <= max_split_length
+                merged_content = f"{current_section.content}\n\n{heading_str}{content}" if fits else None
+            else:
+                merged_content = f"{current_section.content}\n\n{heading_str}{content}"
+                fits = length_function(merged_content) <= max_split_length
 
-            if len(merged_content) <= max_split_length:
+            if fits:
                 # 如果合并后不超过最大长度，则合并
-                current_section['content'] = merged_content
-                if section.get('heading'):
-                    if 'headings' not in current_section:
-                        current_section['headings'] = []
-                    current_section['headings'].append({
-                        'heading': section['heading'],
-                        'level': section['level'],
-                        'position': section['position']
-                    })
+                layout = [('\n\n' + heading_str, section['start'])] + section['layout'] if 'layout' in section else None
+                current_section.merge(index, merged_content, section.get('end'), layout)
                 continue
 
         # 如果无法合并，则开始新的段落
         if current_section:
-            preprocessed_sections.append(current_section)
+            yield current_section
 
-        current_section = section.copy()
-        current_section['headings'] = ([{
-            'heading': section['heading'],
-            'level': section['level'],
-            'position': section['position']
-        }] if section.get('heading') else [])
+        current_section = SectionGroup(heading, level, content, section.get('position'), index,
+                                       section.get('start'), section.get('end'), section.get('layout'))
 
     # 添加最后一个段落
     if current_section:
-        preprocessed_sections.append(current_section)
+        yield current_section
 
-    result = []
+
+def iter_process_sections(sections, outline, min_split_length, max_split_length, length_function=len,
+                          split_function=None):
+    """
+    以生成器方式处理段落，结果与 process_sections 一致
+    outline 只需包含已产出段落及其之前的标题，因此可以与 iter_sections 配合边扫描边处理
+    段落带有原文范围（start、end）时，结果也会带上对应的范围
+    Args:
+        sections (Iterable[dict]): 段落
+        outline (list | OutlineIndex): 目录大纲
+        min_split_length (int): 最小分割字数
+        max_split_length (int): 最大分割字数
+        length_function (callable, optional): 长度函数，默认按字符计数，传入 TokenCounter 时按Token计数
+        split_function (callable, optional): 超长段落的分割函数，接收 SectionGroup，
+            返回 {'content', 'start', 'end'} 列表，默认使用 split_long_section
+    Returns:
+        Generator[dict]: 处理后的段落
+    """
+    # 每篇文档只构建一次大纲索引
+    outline = build_outline_index(outline)
+
+    if split_function is None:
+        def split_function(section):
+            return [{'content': piece} for piece in _split_content(section.content, max_split_length, length_function)]
+
+    def add_parts(section, summary_texts, sub_sections):
+        for summary_text, sub_section in zip(summary_texts, sub_sections):
+            result.append({
+                'summary': summary_text,
+                **sub_section
+            })
+
+    def add_accumulated(section):
+        summary_text = summary.generate_enhanced_summary(section, outline)
+        if length_function(section.content.strip()) > max_split_length:
+            # 如果累积段落超过最大长度，进一步分割
+            sub_sections = split_function(section)
+            add_parts(section, [f"{summary_text} - Part {j + 1}/{len(sub_sections)}"
+                                for j in range(len(sub_sections))], sub_sections)
+        else:
+            # 添加到结果中
+            result.append({
+                'summary': summary_text,
+                'content': section.content,
+                **section.source_range()
+            })
+
+    def add_whole(section):
+        # 生成增强的摘要，并将标题行与内容一起添加到结果
+        result.append({
+            'summary': summary.generate_enhanced_summary(section, outline),
+            'content': f"{section.heading_line}{section.content}",
+            **section.source_range(with_heading=True)
+        })
+
+    # 最后一个结果可能与末尾的小段落合并，因此始终保留最后一个结果暂不产出
+    result = deque()
     accumulated_section = None  # 用于累积小于最小分割字数的段落
 
-    for section in preprocessed_sections:
-        content_length = len(section['content'].strip())
+    for section in _merge_small_sections(sections, outline, min_split_length, max_split_length, length_function):
+        while len(result) > 1:
+            yield result.popleft()
+
+        content_length = length_function(section.content.strip())
 
         # 检查是否需要累积段落
         if content_length < min_split_length:
-            # 如果还没有累积过段落，创建新的累积段落
             if not accumulated_section:
-                accumulated_section = {
-                    'heading': section.get('heading'),
-                    'level': section.get('level'),
-                    'content': section['content'],
-                    'position': section.get('position'),
-                    'headings': [{
-                        'heading': section['heading'],
-                        'level': section['level'],
-                        'position': section['position']
-                    }] if section.get('heading') else []
-                }
+                # 如果还没有累积过段落，创建新的累积段落，只保留段落自身的标题
+                accumulated_section = section.detached()
             else:
-                # 已经有累积段落，将当前段落添加到累积段落中
-                heading_str = '#' * section['level'] + ' ' + section['heading'] + '\n' if section.get('heading') else ''
-                accumulated_section['content'] += f"\n\n{heading_str}{section['content']}"
-                if section.get('heading'):
-                    accumulated_section['headings'].append({
-                        'heading': section['heading'],
-                        'level': section['level'],
-                        'position': section['position']
-                    })
+                # 已经有累积段落，将当前段落及其标题添加到累积段落中
+                accumulated_section.accumulate(
+                    section, f"{accumulated_section.content}\n\n{section.heading_line}{section.content}")
 
             # 只有当累积内容达到最小长度时才处理
-            accumulated_length = len(accumulated_section['content'].strip())
-            if accumulated_length >= min_split_length:
-                summary_text = summary.generate_enhanced_summary(accumulated_section, outline)
-
-                if accumulated_length > max_split_length:
-                    # 如果累积段落超过最大长度，进一步分割
-                    sub_sections = split_long_section(accumulated_section, max_split_length)
-
-                    for j, sub_section in enumerate(sub_sections):
-                        result.append({
-                            'summary': f"{summary_text} - Part {j + 1}/{len(sub_sections)}",
-                            'content': sub_section
-                        })
-                else:
-                    # 添加到结果中
-                    result.append({
-                        'summary': summary_text,
-                        'content': accumulated_section['content']
-                    })
-
+            if length_function(accumulated_section.content.strip()) >= min_split_length:
+                add_accumulated(accumulated_section)
                 accumulated_section = None  # 重置累积段落
 
             continue
 
         # 如果有累积的段落，先处理它
         if accumulated_section:
-            summary_text = summary.generate_enhanced_summary(accumulated_section, outline)
-            accumulated_length = len(accumulated_section['content'].strip())
-
-            if accumulated_length > max_split_length:
-                # 如果累积段落超过最大长度，进一步分割
-                sub_sections = split_long_section(accumulated_section, max_split_length)
-
-                for j, sub_section in enumerate(sub_sections):
-                    result.append({
-                        'summary': f"{summary_text} - Part {j + 1}/{len(sub_sections)}",
-                        'content': sub_section
-                    })
-            else:
-                # 添加到结果中
-                result.append({
-                    'summary': summary_text,
-                    'content': accumulated_section['content']
-                })
-
+            add_accumulated(accumulated_section)
             accumulated_section = None  # 重置累积段落
 
         # 处理当前段落
         # 如果段落长度超过最大分割字数，需要进一步分割
         if content_length > max_split_length:
-            sub_sections = split_long_section(section, max_split_length)
-
-            # 为当前段落创建一个标准的headings数组
-            if not section.get('headings') and section.get('heading'):
-                section['headings'] = [{
-                    'heading': section['heading'],
-                    'level': section['level'],
-                    'position': section['position']
-                }]
-
-            for i, sub_section in enumerate(sub_sections):
-                summary_text = summary.generate_enhanced_summary(section, outline, i + 1, len(sub_sections))
-                result.append({
-                    'summary': summary_text,
-                    'content': sub_section
-                })
+            sub_sections = split_function(section)
+            add_parts(section, summary.generate_part_summaries(section, outline, len(sub_sections)), sub_sections)
         else:
-            # 为当前段落创建一个标准的headings数组
-            if not section.get('headings') and section.get('heading'):
-                section['headings'] = [{
-                    'heading': section['heading'],
-                    'level': section['level'],
-                    'position': section['position']
-                }]
-
-            # 生成增强的摘要并添加到结果
-            summary_text = summary.generate_enhanced_summary(section, outline)
-            heading_str = '#' * section['level'] + ' ' + section['heading'] + '\n' if section.get('heading') else ''
-            content = f"{heading_str}{section['content']}"
-
-            result.append({
-                'summary': summary_text,
-                'content': content
-            })
+            add_whole(section)
 
     # 处理最后剩余的小段落
     if accumulated_section:
         if result:
             # 尝试将剩余的小段落与最后一个结果合并
             last_result = result[-1]
-            merged_content = f"{last_result['content']}\n\n{accumulated_section['content']}"
-
-            if len(merged_content) <= max_split_length:
-                # 如果合并后不超过最大长度，则合并
-                summary_text = summary.generate_enhanced_summary({
-                    **accumulated_section,
-                    'content': merged_content
-                }, outline)
+            merged_content = f"{last_result['content']}\n\n{accumulated_section.content}"
 
+            if length_function(merged_content) <= max_split_length:
+                # 如果合并后不超过最大长度，则合并，摘要只包含剩余段落的标题
                 result[-1] = {
-                    'summary': summary_text,
+                    'summary': summary.generate_enhanced_summary(accumulated_section, outline),
                     'content': merged_content
                 }
+                if 'start' in last_result and accumulated_section.end is not None:
+                    result[-1].update(start=last_result['start'], end=accumulated_section.end)
+                if 'layout' in last_result and accumulated_section.layout is not None:
+                    result[-1]['layout'] = (last_result['layout'] + [('\n\n', accumulated_section.start)]
+                                            + accumulated_section.layout)
             else:
                 # 如果合并后超过最大长度，将accumulated_section作为单独的段落添加
-                summary_text = summary.generate_enhanced_summary(accumulated_section, outline)
-                heading_str = '#' * accumulated_section['level'] + ' ' + accumulated_section['heading'] + '\n' if accumulated_section.get('heading') else ''
-                content = f"{heading_str}{accumulated_section['content']}"
-                result.append({
-                    'summary': summary_text,
-                    'content': content
-                })
+                add_whole(accumulated_section)
         else:
             # 如果result为空，直接添加accumulated_section
-            summary_text = summary.generate_enhanced_summary(accumulated_section, outline)
-            heading_str = '#' * accumulated_section['level'] + ' ' + accumulated_section['heading'] + '\n' if accumulated_section.get('heading') else ''
-            content = f"{heading_str}{accumulated_section['content']}"
-            result.append({
-                'summary': summary_text,
-                'content': content
-            })
+            add_whole(accumulated_section)
 
-    return result
\ No newline at end of file
+    yield from result
@@ -0,0 +1,88 @@
+"""
+Token计数模块
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List
+
+DEFAULT_ENCODING = 'cl100k_base'
+
+
+@lru_cache(maxsize=None)
+def get_encoder(encoding_name: str = DEFAULT_ENCODING):
+    """
+    获取 tiktoken 编码器，每个进程每种编码只加载一次
+    Args:
+        encoding_name: 编码名称
+    Returns:
+        tiktoken.Encoding: 编码器
+    """
+    import tiktoken
+    return tiktoken.get_encoding(encoding_name)
+
+
+class TokenCounter:
+    """
+    带缓存的Token计数器，可直接作为分割函数的 length_function 使用
+    分割过程中同一段文本会被反复度量，因此按文本缓存计数结果
+    """
+
+    def __init__(self, encoding_name: str = DEFAULT_ENCODING, cache_size: int = 4096):
+        self.encoding_name = encoding_name
+        self.encoder = get_encoder(encoding_name)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def __call__(self, text: str) -> int:
+        count = self._cache.get(text)
+        if count is not None:
+            self._cache.move_to_end(text)
+            return count
+
+        count = len(self.encoder.encode_ordinary(text))
+        self._remember(text, count)
+        return count
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        """
+        批量计数，未命中缓存的文本一次性交给编码器并行编码
+        Args:
+            texts: 文本列表
+        Returns:
+            List[int]: 每段文本的Token数
+        """
+        missing = list(dict.fromkeys(text for text in texts if text not in self._cache))
+        if missing:
+            for text, tokens in zip(missing, self.encoder.encode_ordinary_batch(missing)):
+                self._remember(text, len(tokens))
+        return [self(text) for text in texts]
+
+    def __reduce__(self):
+        # 传给子进程时只传编码名称，由子进程加载自己的编码器
+        return get_token_counter, (self.encoding_name,)
+
+    def _remember(self, text: str, count: int):
+        self._cache[text] = count
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(encoding_name: str = DEFAULT_ENCODING) -> TokenCounter:
+    """获取共享的Token计数器"""
+    return TokenCounter(encoding_name)
+
+
+def measure_batch(texts: List[str], length_function=len) -> List[int]:
+    """
+    批量度量文本长度，length_function 支持 count_batch 时使用批量计数
+    Args:
+        texts: 文本列表
+        length_function: 长度函数
+    Returns:
+        List[int]: 每段文本的长度
+    """
+    count_batch = getattr(length_function, 'count_batch', None)
+    if count_batch is not None:
+        return count_batch(texts)
+    return [length_function(text) for text in texts]
@@ -4,6 +4,8 @@ Markdown目录提取模块
 import re
 from typing import List, Dict, Any, Optional, Union
 
+from app.core.markdown import parser
+
 
 def extract_table_of_contents(text: str, options: Dict[str, Any] = None) -> List[Dict[str, Any]]:
     """
@@ -17,32 +19,41 @@ def extract_table_of_contents(text: str, options: Dict[str, Any] = None) -> List
     Returns:
         目录结构数组
     """
+    # 与分割共用同一个逐行扫描，代码块中的 # 行不视为标题
+    return outline_to_table_of_contents(parser.extract_outline(text), options)
+
+def outline_to_table_of_contents(outline: List[Dict[str, Any]], options: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """
+    根据已提取的目录大纲生成目录结构，避免再次扫描全文
+    Args:
+        outline: 目录大纲，每项包含 level、title、position
+        options: 配置选项，同 extract_table_of_contents
+    Returns:
+        目录结构数组
+    """
     options = options or {}
     max_level = options.get('maxLevel', 6)
     include_links = options.get('includeLinks', True)
     flat_list = options.get('flatList', False)
 
-    # 匹配标题的正则表达式
-    heading_regex = re.compile(r'^(#{1,6})\s+(.+?)(?:\s*\{#[\w-]+\})?\s*$', re.MULTILINE)
     toc_items = []
 
-    for match in heading_regex.finditer(text):
-        level = len(match.group(1))
+    for item in outline:
+        level = item['level']
 
         # 如果标题级别超过了设定的最大级别，则跳过
         if level > max_level:
             continue
 
-        title = match.group(2).strip()
-        position = match.start()
+        title = item['title']
 
-        # 生成锚点ID（用于链接）
-        anchor_id = generate_anchor_id(title)
+        # 生成锚点ID（用于链接），扫描时已生成的直接使用
+        anchor_id = item.get('anchorId') or generate_anchor_id(title)
 
         toc_items.append({
             'level': level,
             'title': title,
-            'position': position,
+            'position': item['position'],
             'anchorId': anchor_id,
             'children': []
         })
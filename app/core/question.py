@@ -1,10 +1,103 @@
+import asyncio
+import json
 import logging
 import os
-from typing import List, Any
+from collections import defaultdict
+from typing import List, Any, AsyncIterator, Optional
 
-from app.core.base import read_json_file, ensure_dir, write_json_file
-from app.lib.db import get_db_directory
+from sqlalchemy import select, delete, insert, tuple_, exists, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
+from app.core.base import read_json_file, write_json_snapshot, delete_json_file, get_json_directory
+from app.db.base import Base
+from app.db.session import engine, SessionLocal
+from app.modules.dataset.model.question import Question, QuestionChunk
+
+# 单条删除语句中 IN 条件的最大数量，避免超过SQLite的变量个数限制
+DELETE_BATCH_SIZE = 500
+
+# 问题表是否已创建，以及已导入 questions.json 的项目
+_tables_ready = False
+_imported_projects = set()
+_init_lock = asyncio.Lock()
+
+
+def get_questions_path(project_id: str) -> str:
+    return os.path.join(get_json_directory(), project_id, 'questions.json')
+
+async def _ensure_project(project_id: str):
+    """
+    首次访问项目时创建问题表，并导入旧版本的 questions.json
+    Args:
+        project_id: 项目ID
+    """
+    global _tables_ready
+    if _tables_ready and project_id in _imported_projects:
+        return
+
+    async with _init_lock:
+        if not _tables_ready:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all, tables=[QuestionChunk.__table__, Question.__table__])
+            _tables_ready = True
+
+        if project_id not in _imported_projects:
+            await _import_questions_file(project_id, get_questions_path(project_id))
+            _imported_projects.add(project_id)
+
+async def _import_questions_file(project_id: str, questions_path: str) -> int:
+    # questions.json 可能只存在于项目的JSON日志中，通过 read_json_file 读取
+    questions = await read_json_file(questions_path)
+    if questions is None:
+        return 0
+
+    async with SessionLocal() as session:
+        async with session.begin():
+            await _replace_questions(session, project_id, questions)
+
+    # 导入后保留一份副本并删除原文件，避免再次导入；如需回退可通过 export_questions_json 导出
+    await write_json_snapshot(f"{questions_path}.imported", questions)
+    await delete_json_file(questions_path)
+    logging.info(f"已将 {questions_path} 导入数据库，共 {len(questions)} 个文本块")
+    return len(questions)
+
+def _question_rows(project_id: str, chunk_id: str, questions: List[Any]) -> List[dict[str, Any]]:
+    """问题为对象时 meta 保存完整对象，content 保存问题文本用于查询和删除"""
+    rows = []
+    for position, question in enumerate(questions):
+        if isinstance(question, dict):
+            content = str(question.get('question', ''))
+            meta = json.dumps(question, ensure_ascii=False)
+        else:
+            content = str(question)
+            meta = None
+        rows.append({
+            'project_id': project_id,
+            'chunk_id': chunk_id,
+            'position': position,
+            'content': content,
+            'meta': meta
+        })
+    return rows
+
+def _question_value(content: str, meta: Optional[str]) -> Any:
+    return json.loads(meta) if meta is not None else content
+
+async def _replace_questions(session, project_id: str, questions: List[dict[str, Any]]):
+    """在当前事务中用问题列表替换项目的所有问题"""
+    await session.execute(delete(Question).where(Question.project_id == project_id))
+    await session.execute(delete(QuestionChunk).where(QuestionChunk.project_id == project_id))
+
+    chunk_rows = []
+    question_rows = []
+    for item in questions:
+        chunk_rows.append({'project_id': project_id, 'chunk_id': item['chunkId']})
+        question_rows.extend(_question_rows(project_id, item['chunkId'], item.get('questions') or []))
+
+    if chunk_rows:
+        await session.execute(insert(QuestionChunk), chunk_rows)
+    if question_rows:
+        await session.execute(insert(Question), question_rows)
 
 async def get_questions(project_id: str) -> List[dict[str, Any]]:
     """
@@ -12,15 +105,128 @@ async def get_questions(project_id: str) -> List[dict[str, Any]]:
     Args:
         project_id: 项目ID
     Returns:
-        问题列表
+        问题列表，格式与 questions.json 一致：[{'chunkId', 'questions'}]
     """
-    # project_root = await get_project_root()
-    project_root = get_db_directory()
-    project_path = os.path.join(project_root, project_id)
-    questions_path = os.path.join(project_path, 'questions.json')
-    logging.info(f"questions_path: {questions_path}")
-    questions = await read_json_file(questions_path)
-    return questions or []
+    await _ensure_project(project_id)
+
+    async with SessionLocal() as session:
+        chunk_ids = (await session.execute(
+            select(QuestionChunk.chunk_id)
+            .where(QuestionChunk.project_id == project_id)
+            .order_by(QuestionChunk.id)
+        )).scalars().all()
+        grouped = await _group_questions(session, project_id)
+
+    return [{'chunkId': chunk_id, 'questions': grouped.get(chunk_id, [])} for chunk_id in chunk_ids]
+
+async def _group_questions(session, project_id: str, chunk_ids: Optional[List[str]] = None) -> dict[str, List[Any]]:
+    grouped = defaultdict(list)
+    # 指定文本块时分批查询，避免超过SQLite的变量个数限制
+    batches = [None] if chunk_ids is None else [chunk_ids[i:i + DELETE_BATCH_SIZE]
+                                                for i in range(0, len(chunk_ids), DELETE_BATCH_SIZE)]
+    for batch in batches:
+        query = select(Question.chunk_id, Question.content, Question.meta).where(Question.project_id == project_id)
+        if batch is not None:
+            query = query.where(Question.chunk_id.in_(batch))
+        rows = await session.execute(query.order_by(Question.chunk_id, Question.position))
+        for chunk_id, content, meta in rows:
+            grouped[chunk_id].append(_question_value(content, meta))
+    return grouped
+
+async def get_questions_by_chunk(project_id: str, chunk_ids: Optional[List[str]] = None) -> dict[str, List[Any]]:
+    """
+    一次查询获取项目文本块的问题
+    Args:
+        project_id: 项目ID
+        chunk_ids: 文本块ID列表，默认为所有文本块
+    Returns:
+        文本块ID -> 问题列表，没有问题的文本块不包含在结果中
+    """
+    await _ensure_project(project_id)
+
+    async with SessionLocal() as session:
+        return dict(await _group_questions(session, project_id, chunk_ids))
+
+async def get_question_chunk_ids(project_id: str) -> set[str]:
+    """
+    获取有问题的文本块ID，只查询ID，用于按是否有问题筛选文本块
+    Args:
+        project_id: 项目ID
+    Returns:
+        文本块ID集合
+    """
+    await _ensure_project(project_id)
+
+    async with SessionLocal() as session:
+        rows = await session.execute(
+            select(Question.chunk_id).where(Question.project_id == project_id).distinct()
+        )
+        return set(rows.scalars().all())
+
+async def get_questions_page(project_id: str, cursor: Optional[str] = None, limit: int = 100,
+                             chunk_prefix: Optional[str] = None,
+                             has_questions: Optional[bool] = None) -> dict[str, Any]:
+    """
+    按文本块ID顺序分页获取问题，以上一页最后一个文本块ID作为游标
+    Args:
+        project_id: 项目ID
+        cursor: 游标，返回ID大于游标的文本块，默认从头开始
+        limit: 每页的文本块数量
+        chunk_prefix: 只返回ID为该前缀加序号的文本块，如 "文件名-part-"
+        has_questions: True 只返回有问题的文本块，False 只返回没有问题的文本块
+    Returns:
+        Dict: {'items': [{'chunkId', 'questions'}], 'nextCursor': 下一页的游标，没有下一页时为None}
+    """
+    await _ensure_project(project_id)
+
+    query = select(QuestionChunk.chunk_id).where(QuestionChunk.project_id == project_id)
+    if cursor is not None:
+        query = query.where(QuestionChunk.chunk_id > cursor)
+    if chunk_prefix:
+        # 按前缀的字符串范围筛选，可以使用 (project_id, chunk_id) 唯一索引
+        query = query.where(QuestionChunk.chunk_id >= chunk_prefix,
+                            QuestionChunk.chunk_id < chunk_prefix + '\U0010ffff')
+        # 前缀之后只能是序号，排除前缀相同的其他文件，如 a.md 与 a-part-x.md
+        suffix = func.substr(QuestionChunk.chunk_id, len(chunk_prefix) + 1)
+        query = query.where(suffix != '', suffix.op('NOT GLOB')('*[^0-9]*'))
+    if has_questions is not None:
+        has_any = exists().where(Question.project_id == project_id, Question.chunk_id == QuestionChunk.chunk_id)
+        query = query.where(has_any if has_questions else ~has_any)
+
+    async with SessionLocal() as session:
+        # 多取一条判断是否还有下一页
+        chunk_ids = (await session.execute(
+            query.order_by(QuestionChunk.chunk_id).limit(limit + 1)
+        )).scalars().all()
+        page_ids = list(chunk_ids[:limit])
+        grouped = await _group_questions(session, project_id, page_ids) if page_ids else {}
+
+    return {
+        'items': [{'chunkId': chunk_id, 'questions': grouped.get(chunk_id, [])} for chunk_id in page_ids],
+        'nextCursor': page_ids[-1] if len(chunk_ids) > limit else None
+    }
+
+async def iter_questions(project_id: str, chunk_prefix: Optional[str] = None,
+                         has_questions: Optional[bool] = None,
+                         page_size: int = 100) -> AsyncIterator[dict[str, Any]]:
+    """
+    按文本块ID顺序逐页读取问题，同一时间只保留一页
+    Args:
+        project_id: 项目ID
+        chunk_prefix: 只返回ID为该前缀加序号的文本块
+        has_questions: 按是否有问题筛选
+        page_size: 每次读取的文本块数量
+    Returns:
+        AsyncIterator[Dict]: {'chunkId', 'questions'}
+    """
+    cursor = None
+    while True:
+        page = await get_questions_page(project_id, cursor, page_size, chunk_prefix, has_questions)
+        for item in page['items']:
+            yield item
+        cursor = page['nextCursor']
+        if cursor is None:
+            return
 
 async def get_questions_for_chunk(project_id: str, chunk_id: str) -> List[dict[str, Any]]:
     """
@@ -31,59 +237,157 @@ async def get_questions_for_chunk(project_id: str, chunk_id: str) -> List[dict[s
     Returns:
         问题列表
     """
-    questions = await get_questions(project_id)
-    chunk_questions = next((item for item in questions if item['chunkId'] == chunk_id), None)
-    return chunk_questions['questions'] if chunk_questions else []
+    await _ensure_project(project_id)
+
+    async with SessionLocal() as session:
+        rows = await session.execute(
+            select(Question.content, Question.meta)
+            .where(Question.project_id == project_id, Question.chunk_id == chunk_id)
+            .order_by(Question.position)
+        )
+        return [_question_value(content, meta) for content, meta in rows]
 
 async def add_questions_for_chunk(project_id: str, chunk_id: str, new_questions: List[dict[str, Any]]) -> List[dict[str, Any]]:
     """
-    添加问题到项目
+    添加问题到项目，替换该文本块原有的问题
     Args:
         project_id: 项目ID
         chunk_id: 文本块ID
         new_questions: 新问题列表
     Returns:
-        更新后的问题列表
+        该文本块保存后的问题列表
     """
-
     new_questions = new_questions or []
+    await _ensure_project(project_id)
 
-    questions = await get_questions(project_id)
+    async with SessionLocal() as session:
+        async with session.begin():
+            # 文本块已存在时保留原有顺序
+            await session.execute(
+                sqlite_insert(QuestionChunk)
+                .values(project_id=project_id, chunk_id=chunk_id)
+                .on_conflict_do_nothing(index_elements=['project_id', 'chunk_id'])
+            )
+            await session.execute(
+                delete(Question).where(Question.project_id == project_id, Question.chunk_id == chunk_id)
+            )
+            rows = _question_rows(project_id, chunk_id, new_questions)
+            if rows:
+                await session.execute(insert(Question), rows)
 
-    # 检查是否已存在该文本块的问题
-    existing_index = next((i for i, item in enumerate(questions) if item['chunkId'] == chunk_id), -1)
+    return new_questions
 
-    if existing_index >= 0:
-        # 更新现有问题
-        questions[existing_index]['questions'] = new_questions
-    else:
-        # 添加新问题
-        questions.append({
-            'chunkId': chunk_id,
-            'questions': new_questions
-        })
+async def delete_questions_for_chunks(project_id: str, chunk_ids: List[str]) -> int:
+    """
+    删除多个文本块的问题
+    Args:
+        project_id: 项目ID
+        chunk_ids: 文本块ID列表
+    Returns:
+        删除的文本块数量
+    """
+    if not chunk_ids:
+        return 0
+    await _ensure_project(project_id)
 
-    return await save_questions(project_id, questions)
+    deleted = 0
+    async with SessionLocal() as session:
+        async with session.begin():
+            for i in range(0, len(chunk_ids), DELETE_BATCH_SIZE):
+                batch = chunk_ids[i:i + DELETE_BATCH_SIZE]
+                await session.execute(
+                    delete(Question).where(Question.project_id == project_id, Question.chunk_id.in_(batch))
+                )
+                result = await session.execute(
+                    delete(QuestionChunk).where(QuestionChunk.project_id == project_id, QuestionChunk.chunk_id.in_(batch))
+                )
+                deleted += result.rowcount
+    return deleted
+
+async def delete_question(project_id: str, question_id: str, chunk_id: str) -> int:
+    """
+    删除单个问题，文本块保留，以便后续添加新问题
+    Args:
+        project_id: 项目ID
+        question_id: 问题ID（问题文本）
+        chunk_id: 文本块ID
+    Returns:
+        删除的问题数量
+    """
+    return await batch_delete_questions(project_id, [{'questionId': question_id, 'chunkId': chunk_id}])
+
+async def batch_delete_questions(project_id: str, questions_to_delete: List[dict[str, str]]) -> int:
+    """
+    批量删除问题
+    Args:
+        project_id: 项目ID
+        questions_to_delete: 要删除的问题数组，每个元素包含 questionId 和 chunkId
+    Returns:
+        删除的问题数量
+    """
+    if not questions_to_delete:
+        return 0
+    await _ensure_project(project_id)
+
+    pairs = [(item['chunkId'], item['questionId']) for item in questions_to_delete]
+    deleted = 0
+    async with SessionLocal() as session:
+        async with session.begin():
+            for i in range(0, len(pairs), DELETE_BATCH_SIZE):
+                result = await session.execute(
+                    delete(Question).where(
+                        Question.project_id == project_id,
+                        tuple_(Question.chunk_id, Question.content).in_(pairs[i:i + DELETE_BATCH_SIZE])
+                    )
+                )
+                deleted += result.rowcount
+    return deleted
 
 async def save_questions(project_id: str, questions: List[dict[str, Any]]) -> List[dict[str, Any]]:
     """
-    保存项目的问题列表
+    保存项目的问题列表，替换项目原有的所有问题
     Args:
         project_id: 项目ID
         questions: 问题列表
     Returns:
         保存后的问题列表
     """
-    # project_root = await get_project_root()
-    project_root = get_db_directory()
-    project_path = os.path.join(project_root, project_id)
-    questions_path = os.path.join(project_path, 'questions.json')
-
-    await ensure_dir(project_path)
+    await _ensure_project(project_id)
 
     try:
-        await write_json_file(questions_path, questions)
+        async with SessionLocal() as session:
+            async with session.begin():
+                await _replace_questions(session, project_id, questions)
         return questions
     except Exception as error:
         print('保存问题列表失败:', str(error))
-        raise
\ No newline at end of file
+        raise
+
+async def import_questions_json(project_id: str, file_path: str) -> int:
+    """
+    从 questions.json 格式的文件导入问题，替换项目原有的所有问题
+    Args:
+        project_id: 项目ID
+        file_path: 文件路径
+    Returns:
+        导入的文本块数量
+    """
+    questions = await read_json_file(file_path)
+    if questions is None:
+        raise ValueError(f"问题文件 {file_path} 不存在或格式错误")
+    await save_questions(project_id, questions)
+    return len(questions)
+
+async def export_questions_json(project_id: str, file_path: Optional[str] = None) -> str:
+    """
+    将项目的问题导出为 questions.json 格式的文件
+    Args:
+        project_id: 项目ID
+        file_path: 导出路径，默认为项目目录下的 questions.export.json；
+            导出为 questions.json 时，下次启动会再次导入
+    Returns:
+        导出文件的路径
+    """
+    file_path = file_path or os.path.join(get_json_directory(), project_id, 'questions.export.json')
+    await write_json_snapshot(file_path, await get_questions(project_id))
+    return file_path
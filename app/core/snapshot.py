@@ -0,0 +1,214 @@
+"""
+项目快照模块
+一次读取项目配置、文本块、问题与目录文件，文本块列表等接口从同一份快照中取数据，
+不再为每个文本块分别读取文件和问题；
+大项目可按文本块ID顺序分页或逐页流式读取，每页只读取该页的文本块和问题
+"""
+import bisect
+import os
+from typing import Any, AsyncIterator, Dict, Optional
+
+from app.core import aio
+from app.core.base import read_json_file
+from app.core.markdown.topic import toc_to_markdown
+from app.core.question import get_questions_by_chunk, get_question_chunk_ids
+from app.core.texts import get_db_directory, open_chunk_store, CHUNK_ID_REGEX, get_chunk_prefix, is_file_chunk
+
+# 分页的默认与最大文本块数量
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+async def load_project_snapshot(project_id: str) -> Dict[str, Any]:
+    """
+    读取项目快照
+    Args:
+        project_id: 项目ID
+    Returns:
+        Dict: {
+            'id': 项目ID,
+            'project': 项目配置，不存在时为None,
+            'chunks': 文本块ID -> 内容，按写入顺序,
+            'questions': 文本块ID -> 问题列表,
+            'tocs': 文件名 -> 目录结构
+        }
+    """
+    project_path = os.path.join(get_db_directory(), project_id)
+
+    config = await read_json_file(os.path.join(project_path, 'config.json'))
+
+    # 一次打开数据文件按位置顺序读取所有文本块
+    store = await open_chunk_store(project_id)
+    chunks = await aio.run_io(store.get_many) if store is not None else {}
+
+    # 一次查询取出所有问题
+    questions = await get_questions_by_chunk(project_id)
+
+    tocs = {}
+    toc_dir = os.path.join(project_path, 'toc')
+    if await aio.exists(toc_dir):
+        for toc_file in sorted(await aio.listdir(toc_dir)):
+            if toc_file.endswith('-toc.json'):
+                toc = await read_json_file(os.path.join(toc_dir, toc_file))
+                if toc is not None:
+                    tocs[f"{toc_file[:-len('-toc.json')]}.md"] = toc
+
+    return {
+        'id': project_id,
+        'project': {'id': project_id, **config} if config else None,
+        'chunks': chunks,
+        'questions': questions,
+        'tocs': tocs
+    }
+
+
+def _chunk_item(chunk_id: str, content: str, file_name: str, questions: list) -> Dict[str, Any]:
+    return {
+        'id': chunk_id,
+        'content': content[:200] + ('...' if len(content) > 200 else ''),
+        'summary': content[:100] + ('...' if len(content) > 100 else ''),
+        'length': len(content),
+        'fileName': file_name,
+        'questions': questions
+    }
+
+
+async def get_project_chunks(project_id: str, snapshot: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取项目中的所有文本块，按原文件分组，附带各文本块的问题
+    Args:
+        project_id: 项目ID
+        snapshot: 已读取的项目快照，不提供时读取
+    Returns:
+        Dict: 文本块详细信息
+    """
+    snapshot = snapshot or await load_project_snapshot(project_id)
+    project = snapshot['project'] or {}
+    questions = snapshot['questions']
+
+    chunks_by_file = {}
+    for chunk_id, content in snapshot['chunks'].items():
+        file_name_match = CHUNK_ID_REGEX.match(chunk_id)
+        if not file_name_match:
+            continue
+        file_name = f"{file_name_match.group(1)}.md"
+
+        chunks_by_file.setdefault(file_name, []).append(
+            _chunk_item(chunk_id, content, file_name, questions.get(chunk_id, [])))
+
+    project_name_md = f"{project['name']}.md" if project.get('name') else None
+    tocs = ""
+    if snapshot['chunks'] and project_name_md in snapshot['tocs']:
+        tocs = toc_to_markdown(snapshot['tocs'][project_name_md], {'isNested': True})
+
+    file_result = {
+        'fileName': project_name_md,
+        'totalChunks': 0,
+        'chunks': [],
+        'toc': tocs
+    }
+    for chunks in chunks_by_file.values():
+        file_result['totalChunks'] += len(chunks)
+        file_result['chunks'].extend(chunks)
+
+    return {
+        'fileResult': file_result,
+        'chunks': list(snapshot['chunks'])
+    }
+
+
+class _ChunkListing:
+    """按文本块ID排序并筛选的文本块列表，ID与筛选条件只读取一次，内容和问题按页读取"""
+
+    def __init__(self, project_id: str, store, chunk_ids: list, prefix: Optional[str],
+                 with_questions: Optional[set], has_questions: Optional[bool]):
+        self.project_id = project_id
+        self.store = store
+        self.chunk_ids = chunk_ids
+        self.prefix = prefix
+        self.with_questions = with_questions
+        self.has_questions = has_questions
+
+    @classmethod
+    async def open(cls, project_id: str, file_name: Optional[str], has_questions: Optional[bool]):
+        store = await open_chunk_store(project_id)
+        chunk_ids = sorted(await aio.run_io(store.ids)) if store is not None else []
+        prefix = get_chunk_prefix(file_name)
+        with_questions = await get_question_chunk_ids(project_id) if has_questions is not None else None
+        return cls(project_id, store, chunk_ids, prefix, with_questions, has_questions)
+
+    def _matches(self, chunk_id: str) -> bool:
+        if self.with_questions is not None and (chunk_id in self.with_questions) != self.has_questions:
+            return False
+        if not self.prefix:
+            return CHUNK_ID_REGEX.match(chunk_id) is not None
+        return is_file_chunk(chunk_id, self.prefix)
+
+    async def page(self, cursor: Optional[str], limit: int) -> Dict[str, Any]:
+        start = bisect.bisect_right(self.chunk_ids, cursor) if cursor is not None else 0
+        # 指定文件时，该文件的文本块ID连续排列，从前缀处开始查找
+        if self.prefix:
+            start = max(start, bisect.bisect_left(self.chunk_ids, self.prefix))
+
+        page_ids = []
+        next_cursor = None
+        for chunk_id in self.chunk_ids[start:]:
+            if self.prefix and not chunk_id.startswith(self.prefix):
+                break
+            if not self._matches(chunk_id):
+                continue
+            if len(page_ids) == limit:
+                next_cursor = page_ids[-1]
+                break
+            page_ids.append(chunk_id)
+
+        if not page_ids:
+            return {'items': [], 'nextCursor': None}
+        contents = await aio.run_io(self.store.get_many, page_ids)
+        questions = await get_questions_by_chunk(self.project_id, page_ids)
+        items = [_chunk_item(chunk_id, content, f"{CHUNK_ID_REGEX.match(chunk_id).group(1)}.md",
+                             questions.get(chunk_id, []))
+                 for chunk_id, content in contents.items()]
+        return {'items': items, 'nextCursor': next_cursor}
+
+
+async def get_project_chunks_page(project_id: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                                  file_name: Optional[str] = None,
+                                  has_questions: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    按文本块ID顺序分页获取文本块，以上一页最后一个文本块ID作为游标
+    Args:
+        project_id: 项目ID
+        cursor: 游标，返回ID大于游标的文本块，默认从头开始
+        limit: 每页数量，不超过 MAX_PAGE_SIZE
+        file_name: 只返回该文件的文本块
+        has_questions: True 只返回有问题的文本块，False 只返回没有问题的文本块
+    Returns:
+        Dict: {'items': 文本块列表，格式与 get_project_chunks 中的文本块一致, 'nextCursor': 下一页的游标，没有下一页时为None}
+    """
+    listing = await _ChunkListing.open(project_id, file_name, has_questions)
+    return await listing.page(cursor, max(1, min(limit, MAX_PAGE_SIZE)))
+
+
+async def iter_project_chunks(project_id: str, file_name: Optional[str] = None,
+                              has_questions: Optional[bool] = None,
+                              page_size: int = DEFAULT_PAGE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+    """
+    逐页读取并逐个返回文本块，同一时间只保留一页的内容和问题
+    Args:
+        project_id: 项目ID
+        file_name: 只返回该文件的文本块
+        has_questions: 按是否有问题筛选
+        page_size: 每次读取的数量
+    Returns:
+        AsyncIterator[Dict]: 文本块
+    """
+    listing = await _ChunkListing.open(project_id, file_name, has_questions)
+    cursor = None
+    while True:
+        page = await listing.page(cursor, page_size)
+        for item in page['items']:
+            yield item
+        cursor = page['nextCursor']
+        if cursor is None:
+            return
@@ -1,11 +1,114 @@
-import json
+import asyncio
+import hashlib
 import logging
 import os
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any
 
-from app.core.markdown.spliter import split_markdown
-from app.core.markdown.topic import extract_table_of_contents, toc_to_markdown
-from app.core.texts import get_db_directory, ensure_dir, get_file_by_hash, save_text_chunk
+from app.core import aio
+from app.core.base import read_json_file, write_json_file, write_json_snapshot
+from app.core.blob_store import read_artifact, write_artifact
+from app.core.config import settings
+from app.core.file_manifest import set_split_status, SPLIT_DONE
+from app.core.markdown.outline import OutlineIndex
+from app.core.markdown.span import ChunkSpan, format_result, open_source
+from app.core.markdown.spliter import split_markdown_spans
+from app.core.markdown.tokens import get_token_counter
+from app.core.markdown.topic import outline_to_table_of_contents, toc_to_markdown
+from app.core.question import delete_questions_for_chunks
+from app.core.texts import get_db_directory, ensure_dir, get_file_by_hash, save_text_chunk, delete_text_chunk, \
+    text_chunk_exists
+
+
+def get_manifest_path(project_path: str, file_name: str) -> str:
+    """获取文件分块清单的路径"""
+    return os.path.join(project_path, 'manifest', f"{os.path.splitext(os.path.basename(file_name))[0]}-manifest.json")
+
+
+def get_split_options(task_config: dict[str, Any]) -> tuple:
+    """
+    根据任务配置获取分割参数
+    Args:
+        task_config: 任务配置，textSplitMode 为 token 时按Token预算分割
+    Returns:
+        tuple: (最小长度, 最大长度, 长度函数)
+    """
+    if task_config.get('textSplitMode', settings.TEXT_SPLIT_MODE) == 'token':
+        encoding_name = task_config.get('textSplitTokenEncoding', settings.TEXT_SPLIT_TOKEN_ENCODING)
+        return (int(task_config.get('textSplitMinTokens', settings.TEXT_SPLIT_MIN_TOKENS)),
+                int(task_config.get('textSplitMaxTokens', settings.TEXT_SPLIT_MAX_TOKENS)),
+                get_token_counter(encoding_name))
+
+    return (task_config.get('textSplitMinLength', 1500),
+            task_config.get('textSplitMaxLength', 2000),
+            len)
+
+
+# 分割结果的格式版本，格式变化时递增，旧版本的分割结果不再复用
+SPLIT_ARTIFACT_VERSION = 2
+
+
+def get_split_artifact_name(min_length: int, max_length: int, length_function) -> str:
+    """分割结果按内容摘要复用，名称包含格式版本与影响分割结果的参数"""
+    encoding_name = getattr(length_function, 'encoding_name', None)
+    mode = f"token-{encoding_name}" if encoding_name else 'length'
+    return f"split-v{SPLIT_ARTIFACT_VERSION}-{mode}-{min_length}-{max_length}"
+
+
+# 分割文件的进程池，所有分割请求共用，应用退出时关闭
+_split_executor = None
+
+
+def get_split_executor() -> ProcessPoolExecutor:
+    """获取分割进程池，首次使用时创建，大小由 TEXT_SPLIT_MAX_WORKERS 配置"""
+    global _split_executor
+    if _split_executor is None:
+        _split_executor = ProcessPoolExecutor(max_workers=int(settings.TEXT_SPLIT_MAX_WORKERS))
+    return _split_executor
+
+
+def shutdown_split_executor():
+    """关闭分割进程池，在应用退出时调用"""
+    global _split_executor
+    if _split_executor is not None:
+        _split_executor.shutdown(wait=False, cancel_futures=True)
+        _split_executor = None
+
+
+def _split_spans_in_process(file_id: str, file_path: str, min_length: int, max_length: int,
+                            length_function=len) -> dict[str, Any]:
+    """
+    在子进程中分割文件，只返回分块范围与目录结构，内容由主进程从原文读取
+    Returns:
+        Dict: spans 为 [start, end, summary, layout] 列表，toc 为目录结构
+    """
+    outline = OutlineIndex()
+    with open_source(file_id, file_path) as source:
+        spans = [[span.start, span.end, span.summary, span.layout]
+                 for span in split_markdown_spans(source, min_length, max_length, outline, length_function)]
+    return {'spans': spans, 'toc': outline_to_table_of_contents(outline)}
+
+
+async def split_file_spans(file: dict[str, Any], min_length: int, max_length: int, length_function=len) -> dict[str, Any]:
+    """
+    在分割进程池中分割文件，不占用事件循环
+    Args:
+        file: 文件信息，包含 id 与 path
+        min_length: 最小分割长度
+        max_length: 最大分割长度
+        length_function: 长度函数，按Token分割时传入 TokenCounter
+    Returns:
+        Dict: 分块范围与目录结构，格式与按内容摘要保存的分割结果相同
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_split_executor(), _split_spans_in_process, file['id'], file['path'],
+                                      min_length, max_length, length_function)
+
+
+def hash_chunk(content: str) -> str:
+    """计算文本块内容的哈希"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
 
 async def split_project_file(project_id: str, file_hash: str) -> dict[str, Any]:
@@ -28,8 +131,7 @@ async def split_project_file(project_id: str, file_hash: str) -> dict[str, Any]:
         }
 
         # 获取分割参数
-        min_length = task_config.get('textSplitMinLength', 1500)
-        max_length = task_config.get('textSplitMaxLength', 2000)
+        min_length, max_length, length_function = get_split_options(task_config)
 
         # 确保chunks目录存在
         chunks_dir = os.path.join(project_path, 'chunks')
@@ -37,7 +139,6 @@ async def split_project_file(project_id: str, file_hash: str) -> dict[str, Any]:
 
         # 保存所有分割结果
         saved_chunks = []
-        file_content = ""
 
         file = await get_file_by_hash(project_id, file_hash)
 
@@ -45,52 +146,94 @@ async def split_project_file(project_id: str, file_hash: str) -> dict[str, Any]:
             raise FileNotFoundError(f"文件不存在")
 
         # 检查文件是否存在
-        if not os.path.exists(file['path']):
+        if not await aio.exists(file['path']):
             raise FileNotFoundError(f"文件 {file['name']} 不存在")
 
         file_name = file['name']
-
-        # 读取文件内容
-        with open(file['path'], 'r', encoding='utf-8') as f:
-            file_content = f.read()
-
-        # 分割文本
-        split_result = split_markdown(file_content, min_length, max_length)
-
-        # 保存分割结果到chunks目录
+        base_name = os.path.splitext(os.path.basename(file_name))[0]
+
+        # 读取上次分割的清单：内容未变化的文本块沿用原ID，不重写文件，也保留其问题
+        manifest_path = get_manifest_path(project_path, file_name)
+        manifest = await read_json_file(manifest_path)
+        reusable = defaultdict(deque)
+        if manifest:
+            for item in manifest['chunks']:
+                reusable[item['hash']].append(item['id'])
+            next_part = manifest['nextPart']
+        else:
+            next_part = 1
+
+        # 内容相同的文件已分割过时，直接沿用其分块范围和目录结构，否则在进程池中分割
+        artifact_name = get_split_artifact_name(min_length, max_length, length_function)
+        artifact = await read_artifact(file.get('digest'), artifact_name)
+        split_result = artifact or await split_file_spans(file, min_length, max_length, length_function)
+
+        # 通过 mmap 读取各分块的原文范围；每次分割持有各自的源文件映射，同一文件被同时分割时互不影响
         chunks = []
-        for index, part in enumerate(split_result):
-            chunk_id = f"{os.path.splitext(os.path.basename(file['name']))[0]}-part-{index + 1}"
-            await save_text_chunk(project_id, chunk_id, part['result'])
-
-            chunks.append({
-                'id': chunk_id,
-                'content': part['content'],
-                'summary': part['summary'],
-                'length': len(part['content']),
-                'fileName': file['name']
-            })
+        manifest_chunks = []
+        added_ids = []
+        with open_source(file['id'], file['path']) as source:
+            for start, end, summary, layout in split_result['spans']:
+                span = ChunkSpan(file['id'], start, end, summary, source, layout)
+                # 每个分块只解码一次
+                content = span.content
+                result = format_result(span.summary, content)
+                chunk_hash = hash_chunk(result)
+                if reusable[chunk_hash]:
+                    chunk_id = reusable[chunk_hash].popleft()
+                    if not await text_chunk_exists(project_id, chunk_id):
+                        await save_text_chunk(project_id, chunk_id, result)
+                else:
+                    chunk_id = f"{base_name}-part-{next_part}"
+                    next_part += 1
+                    await save_text_chunk(project_id, chunk_id, result)
+                    added_ids.append(chunk_id)
+
+                manifest_chunks.append({'id': chunk_id, 'hash': chunk_hash})
+                chunks.append({
+                    'id': chunk_id,
+                    'content': content,
+                    'summary': span.summary,
+                    'length': len(content),
+                    'fileName': file['name'],
+                    'fileId': span.file_id,
+                    'start': span.start,
+                    'end': span.end
+                })
 
         # 将当前文件的分割结果添加到总结果中
         saved_chunks.extend(chunks)
 
-        # 提取目录结构
-        toc_json = extract_table_of_contents(file_content)
+        # 清理内容已变化或已删除的文本块及其问题
+        removed_ids = [chunk_id for ids in reusable.values() for chunk_id in ids]
+        for chunk_id in removed_ids:
+            await delete_text_chunk(project_id, chunk_id)
+        await delete_questions_for_chunks(project_id, removed_ids)
+
+        await write_json_file(manifest_path, {
+            'fileName': file_name,
+            'nextPart': next_part,
+            'chunks': manifest_chunks
+        })
+
+        toc_json = split_result['toc']
+        if not artifact:
+            await write_artifact(file.get('digest'), artifact_name, split_result)
         toc = toc_to_markdown(toc_json, {'isNested': True})
 
-        # 保存目录结构到单独的toc文件夹
-        toc_dir = os.path.join(project_path, 'toc')
-        await ensure_dir(toc_dir)
-        toc_path = os.path.join(toc_dir, f"{os.path.splitext(os.path.basename(file_name))[0]}-toc.json")
+        # 保存目录结构到单独的toc文件夹，目录文件按文件列举，直接写入不经过项目日志
+        toc_path = os.path.join(project_path, 'toc', f"{os.path.splitext(os.path.basename(file_name))[0]}-toc.json")
+        await write_json_snapshot(toc_path, toc_json)
 
-        with open(toc_path, 'w', encoding='utf-8') as f:
-            json.dump(toc_json, f, ensure_ascii=False, indent=2)
+        await set_split_status(project_path, file['id'], SPLIT_DONE)
 
         return {
             'fileName': file['name'],
             'totalChunks': len(saved_chunks),
             'chunks': saved_chunks,
-            'toc': toc
+            'toc': toc,
+            'addedChunks': added_ids,
+            'removedChunks': removed_ids
         }
 
     except Exception as error:
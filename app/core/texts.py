@@ -1,121 +1,187 @@
 # 获取适合的数据存储目录
 import logging
 import os
-import hashlib  # 新增导入
-from typing import Union, List, Any, Dict
+import re
+from typing import Union, List, Any, Dict, Optional
 
-from app.core.base import ensure_dir
+from app.core import aio
+from app.core.base import ensure_dir, delete_json_file
+from app.core.blob_store import BlobWriter, release_blob
+from app.core.chunk_store import get_chunk_store, schedule_compaction
+from app.core.file_manifest import list_files, find_file, record_file, remove_file, get_file_id
+from app.core.markdown.span import ChunkSpan
+from app.core.question import delete_questions_for_chunks
 
 
 def get_db_directory():
     return os.path.join(os.getcwd(), 'local-db')
 
-# 获取项目中所有原始文件
-async def get_files(project_id: str) -> List[dict[str, Any]]:
-    project_root = get_db_directory()
-    project_path = os.path.join(project_root, project_id)
-    files_dir = os.path.join(project_path, 'files')
-
-    if not os.path.exists(files_dir):
-        return []
-
-    files = os.listdir(files_dir)
-    file_stats = []
+# 文本块ID的格式为: filename-part-X，X 为序号
+CHUNK_ID_REGEX = re.compile(r'(.+)-part-\d+$')
 
-    for file_name in files:
-        # 跳过非文件项目
-        file_path = os.path.join(files_dir, file_name)
-        if not os.path.isfile(file_path):
-            continue
+# 文件的文本块ID前缀，ID为前缀加序号；未指定文件时返回None
+def get_chunk_prefix(file_name: Optional[str]) -> Optional[str]:
+    return f"{os.path.splitext(file_name)[0]}-part-" if file_name else None
 
-        # 只返回Markdown文件，跳过其他文件
-        if not file_name.endswith('.md'):
-            continue
+# 判断文本块是否属于前缀对应的文件，前缀相同的其他文件不算，如 a.md 与 a-part-x.md
+def is_file_chunk(chunk_id: str, prefix: str) -> bool:
+    match = CHUNK_ID_REGEX.match(chunk_id)
+    return match is not None and f"{match.group(1)}-part-" == prefix
 
-        stats = os.stat(file_path)
-        file_stats.append({
-            'id': hashlib.md5(file_name.encode()).hexdigest(),
-            'name': file_name,
-            'path': file_path,
-            'size': stats.st_size
-        })
-
-    return file_stats
+# 获取项目中所有原始文件，从文件清单读取，不遍历目录
+async def get_files(project_id: str) -> List[dict[str, Any]]:
+    project_path = os.path.join(get_db_directory(), project_id)
+    return await list_files(project_path)
 
 # 根据hash值获取原始文件
 async def get_file_by_hash(project_id: str, file_hash: str) -> dict[str, str]:
-    files = await get_files(project_id)
-    for file_info in files:
-        if file_info['id'] == file_hash:
-            return file_info
-    return None
+    project_path = os.path.join(get_db_directory(), project_id)
+    return await find_file(project_path, file_hash)
+
+# 上传文件每次读取的块大小
+UPLOAD_BLOCK_SIZE = 1024 * 1024
 
-# 保存上传的原始文件
+
+# 保存上传的原始文件，内容按摘要保存一份，项目中的文件为指向它的硬链接
 async def save_file(project_id: str, file_buffer: Union[bytes, str], file_name: str) -> dict[str, str]:
-    project_root = get_db_directory()
-    project_path = os.path.join(project_root, project_id)
+    if isinstance(file_buffer, str):
+        file_buffer = file_buffer.encode('utf-8')
+
+    async with BlobWriter() as writer:
+        await writer.write(file_buffer)
+        return await _link_file(project_id, file_name, writer)
+
+# 分块保存上传的原始文件，边读取边写入并计算摘要，内存占用与文件大小无关
+async def save_file_stream(project_id: str, stream: Any, file_name: str, max_size: int = None) -> dict[str, Any]:
+    """
+    Args:
+        project_id: 项目ID
+        stream: 提供 async read(size) 的上传内容，如 UploadFile
+        file_name: 文件名
+        max_size: 最大字节数，超过时抛出 BlobTooLargeError，不保存文件
+    Returns:
+        Dict: 文件名、路径、内容摘要与大小
+    """
+    async with BlobWriter(max_size) as writer:
+        while True:
+            block = await stream.read(UPLOAD_BLOCK_SIZE)
+            if not block:
+                break
+            await writer.write(block)
+        return await _link_file(project_id, file_name, writer)
+
+# 提交写入的内容并链接到项目文件；同名文件已存在且内容不同时，释放其原有内容
+async def _link_file(project_id: str, file_name: str, writer: BlobWriter) -> dict[str, Any]:
+    project_path = os.path.join(get_db_directory(), project_id)
     files_dir = os.path.join(project_path, 'files')
 
     await ensure_dir(files_dir)
 
+    previous = await find_file(project_path, get_file_id(file_name))
     file_path = os.path.join(files_dir, file_name)
+    digest = await writer.commit(file_path)
 
-    # 根据file_buffer类型决定写入模式
-    mode = 'wb' if isinstance(file_buffer, bytes) else 'w'
-    encoding = None if isinstance(file_buffer, bytes) else 'utf-8'
-
-    with open(file_path, mode, encoding=encoding) as f:
-        f.write(file_buffer)
+    await record_file(project_path, file_name, digest)
+    if previous and previous.get('digest') and previous['digest'] != digest:
+        await aio.run_io(release_blob, previous['digest'])
 
     return {
         'name': file_name,
-        'path': file_path
+        'path': file_path,
+        'digest': digest,
+        'size': writer.size
     }
 
+# 删除原始文件及其文本块、问题和分割结果
+async def delete_file(project_id: str, file_hash: str) -> bool:
+    project_path = os.path.join(get_db_directory(), project_id)
+    file = await find_file(project_path, file_hash)
+    if file is None:
+        return False
+
+    try:
+        await aio.remove(file['path'])
+    except Exception as error:
+        print(f"删除文件 {file['name']} 失败:", str(error))
+        return False
+    await remove_file(project_path, file_hash)
+    await aio.run_io(release_blob, file['digest'])
+
+    base_name = os.path.splitext(file['name'])[0]
+    # 目录文件直接写入，同样直接删除；分块清单经过项目日志
+    await aio.remove(os.path.join(project_path, 'toc', f"{base_name}-toc.json"))
+    await delete_json_file(os.path.join(project_path, 'manifest', f"{base_name}-manifest.json"))
+
+    # 删除该文件的文本块及其问题
+    prefix = get_chunk_prefix(file['name'])
+    chunk_ids = [chunk_id for chunk_id in await get_text_chunk_ids(project_id) if is_file_chunk(chunk_id, prefix)]
+    for chunk_id in chunk_ids:
+        await delete_text_chunk(project_id, chunk_id)
+    await delete_questions_for_chunks(project_id, chunk_ids)
+    return True
+
+def get_chunks_dir(project_id: str) -> str:
+    return os.path.join(get_db_directory(), project_id, 'chunks')
+
+def _get_existing_chunk_store(chunks_dir: str):
+    return get_chunk_store(chunks_dir) if os.path.exists(chunks_dir) else None
+
+# 获取项目的文本块存储，打开时需读取索引，在文件操作线程池中执行；chunks 目录不存在时返回None
+async def open_chunk_store(project_id: str, create: bool = False):
+    chunks_dir = get_chunks_dir(project_id)
+    if create:
+        return await aio.run_io(get_chunk_store, chunks_dir)
+    return await aio.run_io(_get_existing_chunk_store, chunks_dir)
+
 # 获取项目中所有文本片段的ID
 async def get_text_chunk_ids(project_id: str) -> List[str]:
-    project_root = get_db_directory()
-    project_path = os.path.join(project_root, project_id)
-    chunks_dir = os.path.join(project_path, 'chunks')
-
-    if not os.path.exists(chunks_dir):
+    store = await open_chunk_store(project_id)
+    if store is None:
         return []
 
-    files = os.listdir(chunks_dir)
-    return [file.replace('.txt', '') for file in files if file.endswith('.txt')]
+    return await aio.run_io(store.ids)
 
 # 获取文本片段
 async def get_text_chunk(project_id: str, chunk_id: str):
-    # project_root = await get_project_root()
-    project_root = get_db_directory()
-    project_path = os.path.join(project_root, project_id)
-    chunk_path = os.path.join(project_path, 'chunks', f"{chunk_id}.txt")
-
     try:
-        if not os.path.exists(chunk_path):
+        store = await open_chunk_store(project_id)
+        if store is None:
             return None
 
-        with open(chunk_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = await aio.run_io(store.get, chunk_id)
+        if content is None:
+            return None
 
         return {
             'id': chunk_id,
             'content': content,
-            'path': chunk_path
+            'path': store.data_path
         }
     except Exception:
         return None
 
-# 保存文本片段
-async def save_text_chunk(project_id: str, chunk_id: str, content: str) -> dict[str, str]:
-    project_root = get_db_directory()
-    project_path = os.path.join(project_root, project_id)
-    chunks_dir = os.path.join(project_path, 'chunks')
-
-    await ensure_dir(chunks_dir)
-
-    chunk_path = os.path.join(chunks_dir, f"{chunk_id}.txt")
-    with open(chunk_path, 'w', encoding='utf-8') as f:
-        f.write(content)
-
-    return {'id': chunk_id, 'path': chunk_path}
\ No newline at end of file
+# 判断文本片段是否存在
+async def text_chunk_exists(project_id: str, chunk_id: str) -> bool:
+    store = await open_chunk_store(project_id)
+    return store is not None and await aio.run_io(store.__contains__, chunk_id)
+
+# 保存文本片段，content 为 ChunkSpan 时从源文件解码带摘要的内容
+async def save_text_chunk(project_id: str, chunk_id: str, content: Union[str, ChunkSpan]) -> dict[str, str]:
+    if isinstance(content, ChunkSpan):
+        content = content.result
+    store = await open_chunk_store(project_id, create=True)
+    await aio.run_io(store.put, chunk_id, content)
+
+    return {'id': chunk_id, 'path': store.data_path}
+# 删除文本片段，只追加删除标记，失效数据过多时在后台压缩
+async def delete_text_chunk(project_id: str, chunk_id: str) -> bool:
+    try:
+        store = await open_chunk_store(project_id)
+        if store is None:
+            return False
+        deleted = await aio.run_io(store.delete, chunk_id)
+        schedule_compaction(store)
+        return deleted
+    except Exception as error:
+        print(f"删除文本片段 {chunk_id} 失败:", str(error))
+    return False
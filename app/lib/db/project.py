@@ -2,6 +2,7 @@ import os
 import time
 from typing import Any
 
+from app.core import aio
 from app.lib.db import ensure_db_exists, get_project_root, write_json_file, read_json_file
 
 
@@ -22,11 +23,11 @@ async def get_projects() -> list[dict[str, Any]]:
 
     # 读取所有项目目录
     project_root = await get_project_root()
-    items = os.listdir(project_root)
+    items = await aio.listdir(project_root)
 
     for item in items:
         project_path = os.path.join(project_root, item)
-        if os.path.isdir(project_path):
+        if await aio.isdir(project_path):
             config_path = os.path.join(project_path, 'config.json')
             config_data = await read_json_file(config_path)
 
@@ -74,11 +75,11 @@ async def create_project(project_data: dict[str, Any]) -> dict[str, Any]:
     project_dir = os.path.join(project_root, project_id)
 
     # 创建项目目录
-    os.makedirs(project_dir, exist_ok=True)
+    await aio.makedirs(project_dir)
 
     # 创建子目录
-    os.makedirs(os.path.join(project_dir, 'files'), exist_ok=True)  # 原始文件
-    os.makedirs(os.path.join(project_dir, 'chunks'), exist_ok=True)  # 分割后的文本片段
+    await aio.makedirs(os.path.join(project_dir, 'files'))  # 原始文件
+    await aio.makedirs(os.path.join(project_dir, 'chunks'))  # 分割后的文本片段
 
     # 创建项目配置文件
     config_path = os.path.join(project_dir, 'config.json')
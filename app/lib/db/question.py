@@ -1,7 +1,8 @@
-import os
 from typing import List, Any
 
-from .base import get_project_root, ensure_dir, read_json_file, write_json_file
+# 问题与 app.core 共用同一个数据库，questions.json 只在首次访问项目时导入；
+# 这里只保留原有的返回值：修改后返回项目的所有问题
+from app.core import question as core_question
 
 
 async def get_questions(project_id: str) -> List[dict[str, Any]]:
@@ -12,11 +13,7 @@ async def get_questions(project_id: str) -> List[dict[str, Any]]:
     Returns:
         问题列表
     """
-    project_root = await get_project_root()
-    project_path = os.path.join(project_root, project_id)
-    questions_path = os.path.join(project_path, 'questions.json')
-    questions = await read_json_file(questions_path)
-    return questions or []
+    return await core_question.get_questions(project_id)
 
 
 async def save_questions(project_id: str, questions: List[dict[str, Any]]) -> List[dict[str, Any]]:
@@ -28,18 +25,7 @@ async def save_questions(project_id: str, questions: List[dict[str, Any]]) -> Li
     Returns:
         保存后的问题列表
     """
-    project_root = await get_project_root()
-    project_path = os.path.join(project_root, project_id)
-    questions_path = os.path.join(project_path, 'questions.json')
-
-    await ensure_dir(project_path)
-
-    try:
-        await write_json_file(questions_path, questions)
-        return questions
-    except Exception as error:
-        print('保存问题列表失败:', str(error))
-        raise
+    return await core_question.save_questions(project_id, questions)
 
 
 async def add_questions_for_chunk(project_id: str, chunk_id: str, new_questions: List[dict[str, Any]]) -> List[dict[str, Any]]:
@@ -52,25 +38,8 @@ async def add_questions_for_chunk(project_id: str, chunk_id: str, new_questions:
     Returns:
         更新后的问题列表
     """
-
-    new_questions = new_questions or []
-
-    questions = await get_questions(project_id)
-
-    # 检查是否已存在该文本块的问题
-    existing_index = next((i for i, item in enumerate(questions) if item['chunkId'] == chunk_id), -1)
-
-    if existing_index >= 0:
-        # 更新现有问题
-        questions[existing_index]['questions'] = new_questions
-    else:
-        # 添加新问题
-        questions.append({
-            'chunkId': chunk_id,
-            'questions': new_questions
-        })
-
-    return await save_questions(project_id, questions)
+    await core_question.add_questions_for_chunk(project_id, chunk_id, new_questions)
+    return await get_questions(project_id)
 
 
 async def get_questions_for_chunk(project_id: str, chunk_id: str) -> List[dict[str, Any]]:
@@ -82,9 +51,7 @@ async def get_questions_for_chunk(project_id: str, chunk_id: str) -> List[dict[s
     Returns:
         问题列表
     """
-    questions = await get_questions(project_id)
-    chunk_questions = next((item for item in questions if item['chunkId'] == chunk_id), None)
-    return chunk_questions['questions'] if chunk_questions else []
+    return await core_question.get_questions_for_chunk(project_id, chunk_id)
 
 
 async def delete_questions_for_chunk(project_id: str, chunk_id: str) -> List[dict[str, Any]]:
@@ -96,9 +63,8 @@ async def delete_questions_for_chunk(project_id: str, chunk_id: str) -> List[dic
     Returns:
         更新后的问题列表
     """
-    questions = await get_questions(project_id)
-    updated_questions = [item for item in questions if item['chunkId'] != chunk_id]
-    return await save_questions(project_id, updated_questions)
+    await core_question.delete_questions_for_chunks(project_id, [chunk_id])
+    return await get_questions(project_id)
 
 
 async def delete_question(project_id: str, question_id: str, chunk_id: str) -> List[dict[str, Any]]:
@@ -111,29 +77,8 @@ async def delete_question(project_id: str, question_id: str, chunk_id: str) -> L
     Returns:
         更新后的问题列表
     """
-    questions = await get_questions(project_id)
-
-    # 找到包含该问题的文本块
-    chunk_index = next((i for i, item in enumerate(questions) if item['chunkId'] == chunk_id), -1)
-
-    if chunk_index == -1:
-        # 如果没有找到文本块，返回原有问题列表
-        return questions
-
-    # 复制问题列表，避免直接修改原有对象
-    updated_questions = questions.copy()
-    chunk = updated_questions[chunk_index].copy()
-
-    # 从文本块中移除指定问题
-    chunk['questions'] = [q for q in chunk['questions'] if q['question'] != question_id]
-
-    # 更新文本块
-    updated_questions[chunk_index] = chunk
-
-    # 如果文本块中没有问题了，可以选择移除该文本块
-    # 这里选择保留空文本块，以便后续可能添加新问题
-
-    return await save_questions(project_id, updated_questions)
+    await core_question.delete_question(project_id, question_id, chunk_id)
+    return await get_questions(project_id)
 
 
 async def batch_delete_questions(project_id: str, questions_to_delete: List[dict[str, str]]) -> List[dict[str, Any]]:
@@ -145,25 +90,5 @@ async def batch_delete_questions(project_id: str, questions_to_delete: List[dict
     Returns:
         更新后的问题列表
     """
-    questions = await get_questions(project_id)
-
-    # 对每个要删除的问题，从其所属的文本块中移除
-    for question_info in questions_to_delete:
-        question_id = question_info['questionId']
-        chunk_id = question_info['chunkId']
-
-        # 找到包含该问题的文本块
-        chunk_index = next((i for i, item in enumerate(questions) if item['chunkId'] == chunk_id), -1)
-
-        if chunk_index != -1:
-            # 复制文本块对象
-            chunk = questions[chunk_index].copy()
-
-            # 从文本块中移除指定问题
-            chunk['questions'] = [q for q in chunk['questions'] if q['question'] != question_id]
-
-            # 更新文本块
-            questions[chunk_index] = chunk
-
-    # 保存更新后的问题列表
-    return await save_questions(project_id, questions)
\ No newline at end of file
+    await core_question.batch_delete_questions(project_id, questions_to_delete)
+    return await get_questions(project_id)
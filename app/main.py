@@ -18,6 +18,10 @@ from lightrag.utils import EmbeddingFunc
 import pipmaster as pm
 from starlette.exceptions import HTTPException
 
+from app.core.cache import read_cache
+from app.core.llm.cache import llm_cache
+from app.core.llm.transport import close_http_clients
+from app.core.text_splitter import shutdown_split_executor
 from app.core.config import settings
 from app.routes import create_routes
 from app.core.logging import setup_logging
@@ -50,6 +54,8 @@ def create_app() -> FastAPI:
             yield
         finally:
             await rag.finalize_storages()
+            await close_http_clients()
+            shutdown_split_executor()
 
     # Initialize FastAPI
     app_kwargs = {
@@ -167,6 +173,28 @@ def create_app() -> FastAPI:
             }
         )
 
+    # 上传文件的请求体超过大小限制时，在读取请求体之前直接拒绝；
+    # 上传接口的表单参数在进入接口前就会被完整读取，因此在中间件中按路径检查，其他接口不受限制
+    upload_path = f"{settings.API_V1_STR}/dataset/files/upload_file"
+
+    @app.middleware("http")
+    async def limit_upload_size(request: Request, call_next):
+        if request.url.path != upload_path:
+            return await call_next(request)
+        content_length = request.headers.get("content-length")
+        # 留出 multipart 表单边界和字段的余量
+        max_size = int(settings.UPLOAD_MAX_BYTES) + 64 * 1024
+        if content_length and content_length.isdigit() and int(content_length) > max_size:
+            return JSONResponse(
+                status_code=413,
+                content={
+                    "code": 413,
+                    "message": "请求内容超过大小限制",
+                    "data": None
+                }
+            )
+        return await call_next(request)
+
     # 健康检查
     @app.get("/health")
     async def health_check():
@@ -175,7 +203,9 @@ def create_app() -> FastAPI:
             "message": "success",
             "data": {
                 "status": "healthy",
-                "version": settings.VERSION
+                "version": settings.VERSION,
+                "readCache": read_cache.stats(),
+                "llmCache": await llm_cache.stats()
             }
         }
 
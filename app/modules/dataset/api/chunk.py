@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
 
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.snapshot import get_project_chunks, get_project_chunks_page, iter_project_chunks, \
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.core.text_splitter import split_project_file
 from app.core.texts import get_text_chunk_ids
+from app.util import ndjson_lines, NDJSON_MEDIA_TYPE
 
 router = APIRouter()
 
@@ -11,6 +17,34 @@ async def get_text_chunks():
     ret = await get_text_chunk_ids(project_id)
     return ret
 
+@router.get("/detail")
+async def get_text_chunk_details():
+    project_id = "000000"
+    ret = await get_project_chunks(project_id)
+    return ret
+
+@router.get("/page")
+async def get_text_chunk_page(cursor: Optional[str] = None,
+                              limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                              file: Optional[str] = None,
+                              has_questions: Optional[bool] = None):
+    """
+    按文本块ID顺序分页获取文本块，nextCursor 作为下一页的 cursor 参数
+    """
+    project_id = "000000"
+    return await get_project_chunks_page(project_id, cursor, limit, file, has_questions)
+
+@router.get("/stream")
+async def stream_text_chunks(file: Optional[str] = None, has_questions: Optional[bool] = None):
+    """
+    以 NDJSON 流式返回文本块，每行一个文本块
+    """
+    project_id = "000000"
+    return StreamingResponse(
+        ndjson_lines(iter_project_chunks(project_id, file, has_questions)),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
 @router.post("/file_chunk_by_hash/{file_hash}")
 async def chunk_file_by_hash(file_hash: str):
     project_id = "000000"
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, UploadFile, File
 from fastapi.responses import JSONResponse
 
-from app.core.texts import save_file, get_files, get_file_by_hash
+from app.core.blob_store import BlobTooLargeError
+from app.core.config import settings
+from app.core.texts import save_file_stream, get_files, get_file_by_hash, delete_file
 
 router = APIRouter()
 
@@ -16,27 +18,35 @@ async def file_by_hash(file_hash: str):
     project_id = "000000"
     return await get_file_by_hash(project_id, file_hash)
 
+@router.delete("/{file_hash}")
+async def delete_file_by_hash(file_hash: str):
+    project_id = "000000"
+    return await delete_file(project_id, file_hash)
+
 
 @router.post("/upload_file")
 async def upload_file(file: UploadFile = File(...)):
     """
-    接收并解析上传的文件
+    接收并解析上传的文件，分块写入磁盘，超过大小限制时拒绝
     """
+    max_size = int(settings.UPLOAD_MAX_BYTES)
     try:
-        # 读取文件内容
-        contents = await file.read()
-
         project_id = "000000"
-        ret = await save_file(project_id, contents, file.filename)
-        
+        ret = await save_file_stream(project_id, file, file.filename, max_size)
+
         # 返回解析结果
         return JSONResponse({
             "filename": file.filename,
             "content_type": file.content_type,
             "file_path": ret["path"],
-            "size": len(contents),
+            "size": ret["size"],
             # "parsed_content": parsed_content  # 实际解析后的内容
         })
+    except BlobTooLargeError as e:
+        return JSONResponse(
+            {"error": str(e)},
+            status_code=413
+        )
     except Exception as e:
         return JSONResponse(
             {"error": str(e)},
@@ -1,14 +1,20 @@
+import asyncio
 import logging
 import math
+from typing import Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from app.core.llm.common import extract_json_from_llm_output
 from app.core.llm.llm import LLMClient
 from app.core.llm.question import get_question_prompt
 from app.core.llm.question_en import get_question_en_prompt
-from app.core.question import get_questions, get_questions_for_chunk, add_questions_for_chunk
+from app.core.question import get_questions, get_questions_for_chunk, add_questions_for_chunk, get_questions_page, \
+    iter_questions
+from app.core.snapshot import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, get_chunk_prefix
 from app.core.texts import get_text_chunk, get_text_chunk_ids
+from app.util import ndjson_lines, NDJSON_MEDIA_TYPE
 
 router = APIRouter()
 
@@ -18,6 +24,28 @@ async def get_question_list():
     ret = await get_questions(project_id)
     return ret
 
+@router.get("/page")
+async def get_question_page(cursor: Optional[str] = None,
+                            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                            file: Optional[str] = None,
+                            has_questions: Optional[bool] = None):
+    """
+    按文本块ID顺序分页获取问题，nextCursor 作为下一页的 cursor 参数
+    """
+    project_id = "000000"
+    return await get_questions_page(project_id, cursor, limit, get_chunk_prefix(file), has_questions)
+
+@router.get("/stream")
+async def stream_questions(file: Optional[str] = None, has_questions: Optional[bool] = None):
+    """
+    以 NDJSON 流式返回问题，每行一个文本块的问题
+    """
+    project_id = "000000"
+    return StreamingResponse(
+        ndjson_lines(iter_questions(project_id, get_chunk_prefix(file), has_questions)),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
 @router.get("by_chunk/{chunk_id}")
 async def get_question_by_chunk(chunk_id: str):
     project_id = "000000"
@@ -116,72 +144,72 @@ async def gen_questions():
         "concurrency_limit": 5
     }
     question_generation_length = task_config['question_generation_length']
-    results = []
-    errors = []
+    # 限制同时进行的生成请求数，模型服务可并行处理多个请求
+    semaphore = asyncio.Semaphore(task_config['concurrency_limit'])
+    # SQLite 同一时间只允许一个写事务，保存问题时串行执行
+    save_lock = asyncio.Lock()
+
+    async def generate(chunk_id: str) -> dict:
+        """为一个文本块生成问题，出错时返回错误信息，不影响其他文本块"""
+        async with semaphore:
+            try:
+                chunk = await get_text_chunk(project_id, chunk_id)
+                if not chunk:
+                    return {'chunkId': chunk_id, 'error': '文本块不存在'}
+
+                # 根据文本长度自动计算问题数量
+                question_number = math.floor(len(chunk['content']) / question_generation_length)
+
+                # 根据语言选择相应的提示词函数
+                prompt_func = get_question_en_prompt if language == 'en' else get_question_prompt
+                # 生成问题
+                prompt = prompt_func(chunk['content'], question_number, language)
+                # 并发生成时提示词与响应按文本块整条记录，不同文本块的输出不会交错
+                logging.debug(f"prompt: {chunk_id}\n{prompt}")
+                response = await client.get_response(prompt)
+                logging.debug(f"response: {chunk_id}\n{response}")
+
+                # 从LLM输出中提取JSON格式的问题列表
+                questions = extract_json_from_llm_output(response)
+                logging.info(f"questions: {questions}")
+
+                if isinstance(questions, dict):
+                    qs = questions["questions"]
+                    new_questions = []
+                    for question in qs:
+                        if isinstance(question, dict):
+                            question = question['question']
+                            new_questions.append(question)
+                        else:
+                            new_questions.append(question)
+
+                    questions = new_questions
+
+                logging.info(f"after questions:{questions}")
+
+                if not questions or not isinstance(questions, list):
+                    return {'chunkId': chunk_id, 'error': '解析问题失败'}
 
-    for chunk_id in chunk_ids:
-        chunk = await get_text_chunk(project_id, chunk_id)
-        if not chunk:
-            raise HTTPException(status_code=404, detail="chunk not found")
-
-        try:
-            # 根据文本长度自动计算问题数量
-            question_number = math.floor(len(chunk['content']) / question_generation_length)
-
-            # 根据语言选择相应的提示词函数
-            prompt_func = get_question_en_prompt if language == 'en' else get_question_prompt
-            # 生成问题
-            prompt = prompt_func(chunk['content'], question_number, language)
-            print('prompt')
-            print("=" * 30)
-            print(prompt)
-            response = await client.get_response(prompt)
-            print('response')
-            print("=" * 30)
-            print(response)
-
-            # 从LLM输出中提取JSON格式的问题列表
-            questions = extract_json_from_llm_output(response)
-            logging.info(f"questions: {questions}")
-
-            if isinstance(questions, dict):
-                qs = questions["questions"]
-                new_questions = []
-                for question in qs:
-                    if isinstance(question, dict):
-                        question = question['question']
-                        new_questions.append(question)
-                    else:
-                        new_questions.append(question)
-
-                questions = new_questions
-
-            logging.info(f"after questions:{questions}")
-
-            if questions and isinstance(questions, list):
                 # 保存问题到数据库
-                await add_questions_for_chunk(project_id, chunk['id'], questions)
+                async with save_lock:
+                    await add_questions_for_chunk(project_id, chunk['id'], questions)
 
-                results.append({
+                return {
                     'chunkId': chunk['id'],
                     'success': True,
                     'questions': questions,
                     'total': len(questions)
-                })
-            else:
-                errors.append({
-                    'chunkId': chunk['id'],
-                    'error': '解析问题失败'
-                })
-        except Exception as error:
-            print(chunk)
-            print(f"为文本块 {chunk['id']} 生成问题出错:", str(error))
-            errors.append({
-                'chunkId': chunk['id'],
-                'error': str(error) or '生成问题失败'
-            })
+                }
+            except Exception as error:
+                logging.exception(f"为文本块 {chunk_id} 生成问题出错")
+                return {'chunkId': chunk_id, 'error': str(error) or '生成问题失败'}
+
+    # gather 按文本块顺序返回结果
+    outcomes = await asyncio.gather(*(generate(chunk_id) for chunk_id in chunk_ids))
+    results = [outcome for outcome in outcomes if outcome.get('success')]
+    errors = [outcome for outcome in outcomes if not outcome.get('success')]
 
     return {
         "results": results,
         "errors": errors
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,30 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, UniqueConstraint
+from app.db.base import Base
+
+class QuestionChunk(Base):
+    """已生成问题的文本块，保留问题列表为空的文本块及其添加顺序"""
+    __tablename__ = "question_chunk"
+    __table_args__ = (
+        UniqueConstraint("project_id", "chunk_id", name="uq_question_chunk_project_chunk"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(String(100), nullable=False)
+    chunk_id = Column(String(500), nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class Question(Base):
+    __tablename__ = "question"
+    __table_args__ = (
+        Index("ix_question_project_chunk", "project_id", "chunk_id", "position"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(String(100), nullable=False)
+    chunk_id = Column(String(500), nullable=False)
+    position = Column(Integer, nullable=False, default=0)  # 在文本块问题列表中的顺序
+    content = Column(Text, nullable=False)  # 问题文本
+    meta = Column(Text)  # 问题为对象时，除问题文本外的其他字段（JSON），为空表示问题是字符串
+    created_at = Column(DateTime, default=datetime.now)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter
 from lightrag import LightRAG
 
-from app.modules import base, prompt, dataset
+from app.modules import base, prompt
 from app.modules.chat.api import create_chat_routes
+from app.modules.dataset.api import dataset
 from app.modules.edu.api import edu
 
 api_router = APIRouter()
@@ -1,4 +1,5 @@
 import argparse
+import json
 import logging
 import os
 import sys
@@ -8,6 +9,9 @@ from ascii_colors import ASCIIColors
 from app import __version__ as core_version
 from app.core.config import settings
 
+# NDJSON 流式响应的媒体类型
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
 
 def check_env_file():
     if not os.path.exists(".env"):
@@ -88,4 +92,16 @@ def display_splash_screen(args: argparse.Namespace) -> None:
     ASCIIColors.white("    ├─ LightRAGEmbedModelHost: ", end="")
     ASCIIColors.yellow(f"{settings.LIGHTRAG_EMBED_MODEL_HOST}")
     ASCIIColors.white("    ├─ LightRAGEmbedModelAPIKey: ", end="")
-    ASCIIColors.yellow(f"{settings.LIGHTRAG_EMBED_MODEL_API_KEY}")
\ No newline at end of file
+    ASCIIColors.yellow(f"{settings.LIGHTRAG_EMBED_MODEL_API_KEY}")
+
+
+async def ndjson_lines(items):
+    """
+    将异步迭代的对象逐行序列化为 NDJSON，用于 StreamingResponse
+    Args:
+        items: 异步迭代器
+    Returns:
+        AsyncIterator[str]: 每个对象一行JSON
+    """
+    async for item in items:
+        yield json.dumps(item, ensure_ascii=False) + '\n'
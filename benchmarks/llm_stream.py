@@ -0,0 +1,147 @@
+"""
+LLM 流式响应解析基准测试
+
+用法：
+    PYTHONPATH=. python benchmarks/llm_stream.py
+    PYTHONPATH=. python benchmarks/llm_stream.py --tokens 200000 --block-size 16 --block-size 65536
+
+生成合成的 OpenAI 兼容 SSE 流与 Ollama NDJSON 流，按固定大小切成数据块（可能截断消息和多字节字符），
+测量 app.core.llm.stream 的解析吞吐量（tokens/s）与每个 token 的解析开销，
+并与逐块解码、按行切分的旧实现比较；解析出的文本与原文不一致时以非零状态退出
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from app.core.llm.stream import SSEDecoder, SSE_DONE, iter_ndjson
+
+TOKENS = ('的', '模型', '数据', '问题', 'the', ' model', ' data', ' answer', '，', '。', '\n', ' 🚀', 'é', '```')
+
+
+def generate_tokens(count, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(TOKENS) for _ in range(count)]
+
+
+def build_sse(tokens, keepalive_every=50, line_end='\n'):
+    """生成 OpenAI 兼容的 SSE 流，穿插保活注释与 id 字段"""
+    parts = []
+    for index, token in enumerate(tokens):
+        if keepalive_every and index % keepalive_every == 0:
+            parts.append(f": keepalive{line_end}{line_end}")
+        payload = json.dumps({'choices': [{'delta': {'content': token}}]}, ensure_ascii=False)
+        parts.append(f"id: {index}{line_end}data: {payload}{line_end}{line_end}")
+    parts.append(f"data: {SSE_DONE}{line_end}{line_end}")
+    return ''.join(parts).encode('utf-8')
+
+
+def build_ndjson(tokens):
+    """生成 Ollama 的 NDJSON 流"""
+    lines = [json.dumps({'response': token, 'done': False}, ensure_ascii=False) for token in tokens]
+    lines.append(json.dumps({'response': '', 'done': True}))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def split_blocks(data, block_size):
+    return [data[i:i + block_size] for i in range(0, len(data), block_size)]
+
+
+def parse_sse(blocks):
+    decoder = SSEDecoder()
+    pieces = []
+    for block in blocks:
+        for event in decoder.feed(block):
+            if event.data == SSE_DONE:
+                return ''.join(pieces)
+            content = event.json()['choices'][0]['delta'].get('content')
+            if content:
+                pieces.append(content)
+    return ''.join(pieces)
+
+
+def parse_sse_legacy(blocks):
+    """旧实现：每个数据块单独解码并按换行切分，截断的字符与消息被丢弃"""
+    pieces = []
+    for block in blocks:
+        for line in block.decode('utf-8', errors='ignore').split('\n'):
+            if line.startswith('data: '):
+                data = line[6:]
+                if data == SSE_DONE:
+                    return ''.join(pieces)
+                try:
+                    content = json.loads(data)['choices'][0]['delta'].get('content')
+                except ValueError:
+                    continue
+                if content:
+                    pieces.append(content)
+    return ''.join(pieces)
+
+
+def parse_ndjson(blocks):
+    async def source():
+        for block in blocks:
+            yield block
+
+    async def collect():
+        pieces = []
+        async for data in iter_ndjson(source()):
+            if data.get('response'):
+                pieces.append(data['response'])
+        return ''.join(pieces)
+
+    return asyncio.run(collect())
+
+
+def measure(function, blocks, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(blocks)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='LLM 流式响应解析基准测试')
+    parser.add_argument('--tokens', type=int, default=100000, help='token 数量')
+    parser.add_argument('--block-size', type=int, action='append', help='数据块大小（字节），可重复指定')
+    parser.add_argument('--crlf', action='store_true', help='SSE 使用 \\r\\n 换行')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最短耗时')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args(argv)
+
+    tokens = generate_tokens(args.tokens, args.seed)
+    expected = ''.join(tokens)
+    streams = {
+        'sse': (build_sse(tokens, line_end='\r\n' if args.crlf else '\n'), parse_sse),
+        'sse-legacy': (build_sse(tokens), parse_sse_legacy),
+        'ndjson': (build_ndjson(tokens), parse_ndjson),
+    }
+
+    problems = []
+    for block_size in args.block_size or [7, 1024, 16384]:
+        for name, (data, function) in streams.items():
+            blocks = split_blocks(data, block_size)
+            seconds, text = measure(function, blocks, args.repeat)
+            correct = text == expected
+            print(f"[{name}] block={block_size}B: {args.tokens / seconds:,.0f} tokens/s, "
+                  f"{seconds / args.tokens * 1e6:.2f} us/token, {len(data) / seconds / 1024 / 1024:.1f} MB/s, "
+                  f"{'ok' if correct else f'lost {len(expected) - len(text)} chars'}")
+            # 旧实现只作为对照，不要求结果正确
+            if not correct and name != 'sse-legacy':
+                problems.append(f"[{name}] block={block_size}B 解析结果与原文不一致")
+
+    if problems:
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
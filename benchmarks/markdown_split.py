@@ -0,0 +1,291 @@
+"""
+Markdown分割流水线基准测试
+
+用法：
+    PYTHONPATH=. python benchmarks/markdown_split.py --size 1 --size 16
+    PYTHONPATH=. python benchmarks/markdown_split.py --size 1 --save-baseline
+    PYTHONPATH=. python benchmarks/markdown_split.py --size 1 --impl core --no-memory
+
+对 app/core/markdown 与 app/lib/split/markdown 两套实现分别测量各阶段耗时、吞吐量（MB/s）
+与峰值内存（tracemalloc），并与保存的基准结果比较：输出摘要不一致或耗时超过阈值时以非零状态退出
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+IMPLEMENTATIONS = {
+    'core': 'app.core.markdown',
+    'lib': 'app.lib.split.markdown',
+}
+
+LATIN_WORDS = ('lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit', 'sed', 'do',
+               'eiusmod', 'tempor', 'incididunt', 'labore', 'magna', 'aliqua', 'version', '3.14', 'e.g.')
+CJK_WORDS = ('文档', '分割', '模型', '数据', '问题', '答案', '目录', '标题', '段落', '句子', '处理', '生成', '内容')
+CODE_LINES = ('def main():', '    return 0', '# 注释行，不是标题', '## also not a heading', 'print("hello")',
+              'for i in range(10):', '    pass')
+
+
+def generate_corpus(size_mb=1.0, heading_density=2.0, max_depth=4, cjk_ratio=0.5, code_ratio=0.1, seed=0):
+    """
+    生成合成的Markdown语料
+    Args:
+        size_mb (float): 目标大小（MB，按UTF-8字节计）
+        heading_density (float): 每KB正文的标题数
+        max_depth (int): 标题的最大嵌套深度（1-6）
+        cjk_ratio (float): 中文段落所占比例
+        code_ratio (float): 代码块所占比例，代码块中包含 # 开头的行
+        seed (int): 随机种子，相同参数生成的语料完全一致
+    Returns:
+        str: Markdown文本
+    """
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    max_depth = max(1, min(6, max_depth))
+    # 正文块平均约 300 字节，按每KB的标题数换算为每个块是标题的概率
+    ratio = heading_density * 300 / 1024
+    heading_probability = ratio / (1 + ratio)
+    parts = []
+    size = 0
+    level = 1
+    counter = 0
+
+    while size < target:
+        if rng.random() < heading_probability:
+            # 标题级别在相邻级别之间游走，偶尔回到一级
+            level = max(1, min(max_depth, level + rng.choice((-1, 0, 1, 1)) if rng.random() > 0.1 else 1))
+            counter += 1
+            if rng.random() < cjk_ratio:
+                title = f"{rng.choice(CJK_WORDS)}{rng.choice(CJK_WORDS)} {counter}"
+            else:
+                title = f"{rng.choice(LATIN_WORDS).title()} {rng.choice(LATIN_WORDS)} {counter}"
+            block = f"{'#' * level} {title}\n\n"
+        elif rng.random() < code_ratio:
+            lines = [rng.choice(CODE_LINES) for _ in range(rng.randint(3, 12))]
+            block = "```python\n" + '\n'.join(lines) + "\n```\n\n"
+        elif rng.random() < cjk_ratio:
+            sentences = [''.join(rng.choice(CJK_WORDS) for _ in range(rng.randint(4, 20))) + rng.choice('。！？；')
+                         for _ in range(rng.randint(2, 8))]
+            block = ''.join(sentences) + "\n\n"
+        else:
+            sentences = [' '.join(rng.choice(LATIN_WORDS) for _ in range(rng.randint(5, 18))).capitalize()
+                         + rng.choice('.!?') for _ in range(rng.randint(2, 6))]
+            block = ' '.join(sentences) + "\n\n"
+
+        parts.append(block)
+        size += len(block.encode('utf-8'))
+
+    return ''.join(parts)
+
+
+def load_implementation(name):
+    """导入一套Markdown实现的各个模块"""
+    package = IMPLEMENTATIONS[name]
+    return {
+        'parser': importlib.import_module(f'{package}.parser'),
+        'spliter': importlib.import_module(f'{package}.spliter'),
+        'summary': importlib.import_module(f'{package}.summary'),
+        'topic': importlib.import_module(f'{package}.topic'),
+    }
+
+
+def _summary_outline(summary, outline):
+    """支持大纲索引的实现与 process_sections 一样每篇文档只构建一次索引"""
+    build_outline_index = getattr(summary, 'build_outline_index', None)
+    return build_outline_index(outline) if build_outline_index else outline
+
+
+def run_stages(modules, text, min_length, max_length):
+    """
+    依次执行各阶段
+    Returns:
+        tuple: (各阶段耗时, 各阶段输出)
+    """
+    parser, spliter, summary, topic = modules['parser'], modules['spliter'], modules['summary'], modules['topic']
+    timings = {}
+    outputs = {}
+
+    def stage(name, function, *args):
+        start = time.perf_counter()
+        outputs[name] = function(*args)
+        timings[name] = time.perf_counter() - start
+        return outputs[name]
+
+    outline = stage('extract_outline', parser.extract_outline, text)
+    sections = stage('split_by_headings', parser.split_by_headings, text, outline)
+    # 摘要阶段单独计时，process_sections 内部会再次生成摘要
+    summary_outline = _summary_outline(summary, outline)
+    stage('generate_enhanced_summary',
+          lambda: [summary.generate_enhanced_summary(section, summary_outline) for section in sections])
+    stage('process_sections', spliter.process_sections, [dict(section) for section in sections], outline,
+          min_length, max_length)
+    stage('extract_table_of_contents', topic.extract_table_of_contents, text)
+    return timings, outputs
+
+
+def digest(outputs):
+    """计算各阶段输出的摘要，用于判断结果是否与基准一致"""
+    return {
+        name: hashlib.sha256(json.dumps(output, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8'))
+        .hexdigest()[:16]
+        for name, output in outputs.items()
+    }
+
+
+def measure_memory(modules, text, min_length, max_length):
+    """在 tracemalloc 下重新执行各阶段，返回每个阶段的峰值内存（字节）"""
+    parser, spliter, summary, topic = modules['parser'], modules['spliter'], modules['summary'], modules['topic']
+    peaks = {}
+
+    def stage(name, function, *args):
+        tracemalloc.start()
+        try:
+            result = function(*args)
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result
+
+    outline = stage('extract_outline', parser.extract_outline, text)
+    sections = stage('split_by_headings', parser.split_by_headings, text, outline)
+    summary_outline = _summary_outline(summary, outline)
+    stage('generate_enhanced_summary',
+          lambda: [summary.generate_enhanced_summary(section, summary_outline) for section in sections])
+    stage('process_sections', spliter.process_sections, [dict(section) for section in sections], outline,
+          min_length, max_length)
+    stage('extract_table_of_contents', topic.extract_table_of_contents, text)
+    return peaks
+
+
+def benchmark(impl, text, min_length, max_length, memory=True, repeat=1):
+    """
+    对一套实现执行基准测试
+    Returns:
+        dict: 测试结果
+    """
+    modules = load_implementation(impl)
+    size_mb = len(text.encode('utf-8')) / (1024 * 1024)
+
+    best = None
+    outputs = None
+    for _ in range(repeat):
+        timings, outputs = run_stages(modules, text, min_length, max_length)
+        if best is None:
+            best = timings
+        else:
+            best = {name: min(best[name], timings[name]) for name in best}
+
+    total = sum(best.values())
+    result = {
+        'sizeMB': round(size_mb, 3),
+        'seconds': {name: round(value, 4) for name, value in best.items()},
+        'totalSeconds': round(total, 4),
+        'throughputMBs': round(size_mb / total, 3) if total else None,
+        'chunks': len(outputs['process_sections']),
+        'headings': len(outputs['extract_outline']),
+        'digest': digest(outputs),
+    }
+    if memory:
+        result['peakMemory'] = measure_memory(modules, text, min_length, max_length)
+    return result
+
+
+def compare(current, baseline, tolerance):
+    """
+    与基准结果比较
+    Returns:
+        list: 问题描述，为空表示没有回归
+    """
+    problems = []
+    for name, value in current['digest'].items():
+        expected = baseline.get('digest', {}).get(name)
+        if expected is not None and expected != value:
+            problems.append(f"{name} 输出与基准不一致")
+
+    for name, value in current['seconds'].items():
+        expected = baseline.get('seconds', {}).get(name)
+        # 过短的阶段受计时抖动影响较大，不参与比较
+        if expected and expected >= 0.01 and value > expected * tolerance:
+            problems.append(f"{name} 耗时 {value:.3f}s，基准 {expected:.3f}s")
+    return problems
+
+
+def format_bytes(value):
+    return f"{value / (1024 * 1024):.1f}MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Markdown分割流水线基准测试')
+    parser.add_argument('--size', type=float, action='append', help='语料大小（MB），可重复指定，默认 1')
+    parser.add_argument('--heading-density', type=float, default=2.0, help='每KB的标题数')
+    parser.add_argument('--max-depth', type=int, default=4, help='标题最大嵌套深度')
+    parser.add_argument('--cjk-ratio', type=float, default=0.5, help='中文段落比例')
+    parser.add_argument('--code-ratio', type=float, default=0.1, help='代码块比例')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--min-length', type=int, default=1500, help='最小分割长度')
+    parser.add_argument('--max-length', type=int, default=2000, help='最大分割长度')
+    parser.add_argument('--impl', choices=sorted(IMPLEMENTATIONS), action='append', help='要测试的实现，默认全部')
+    parser.add_argument('--repeat', type=int, default=1, help='重复次数，取最短耗时')
+    parser.add_argument('--no-memory', action='store_true', help='不测量峰值内存')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基准结果文件')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基准')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='耗时超过基准的倍数时视为回归')
+    args = parser.parse_args(argv)
+
+    sizes = args.size or [1.0]
+    impls = args.impl or sorted(IMPLEMENTATIONS)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {}
+    problems = []
+    for size in sizes:
+        text = generate_corpus(size, args.heading_density, args.max_depth, args.cjk_ratio, args.code_ratio, args.seed)
+        # 语料参数相同的结果才可以相互比较
+        key = (f"size={size:g},density={args.heading_density:g},depth={args.max_depth},cjk={args.cjk_ratio:g},"
+               f"code={args.code_ratio:g},seed={args.seed},split={args.min_length}-{args.max_length}")
+
+        for impl in impls:
+            result = benchmark(impl, text, args.min_length, args.max_length, not args.no_memory, args.repeat)
+            results.setdefault(key, {})[impl] = result
+
+            stages = ', '.join(f"{name} {value:.3f}s" for name, value in result['seconds'].items())
+            print(f"[{impl}] {size:g}MB: {result['throughputMBs']} MB/s, {result['chunks']} chunks, "
+                  f"{result['headings']} headings")
+            print(f"    {stages}")
+            if 'peakMemory' in result:
+                print('    peak: ' + ', '.join(f"{name} {format_bytes(value)}"
+                                              for name, value in result['peakMemory'].items()))
+
+            expected = baseline.get(key, {}).get(impl)
+            if expected:
+                for problem in compare(result, expected, args.tolerance):
+                    problems.append(f"[{impl}] {size:g}MB: {problem}")
+
+    if args.save_baseline:
+        for key, value in results.items():
+            baseline.setdefault(key, {}).update(value)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"基准结果已保存到 {args.baseline}")
+
+    if problems:
+        print('与基准相比存在回归：')
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+import pytest
+
+# 数据库引擎在导入 app.db.session 时创建，需在导入应用模块之前指向临时数据库
+os.environ['DATABASE_URL'] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ['DEBUG'] = 'false'
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+
+import pytest
+
+from app.core import chunk_store
+from app.core.chunk_store import ChunkStore, DATA_FILE, INDEX_FILE, RECORD_PUT, RECORD_DELETE, _HEADER
+
+
+def read_records(chunks_dir):
+    """按记录头逐条解析数据文件"""
+    records = []
+    with open(os.path.join(chunks_dir, DATA_FILE), 'rb') as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if not header:
+                return records
+            kind, id_length, content_length, _ = _HEADER.unpack(header)
+            body = f.read(id_length + content_length)
+            records.append((kind, body[:id_length].decode('utf-8'), body[id_length:].decode('utf-8')))
+
+
+@pytest.fixture
+def chunks_dir(tmp_path):
+    return str(tmp_path / 'chunks')
+
+
+def test_records_and_index_round_trip(chunks_dir):
+    store = ChunkStore(chunks_dir)
+    store.put('a-part-1', '第一段')
+    store.put('a-part-2', 'second')
+    store.flush_index()
+    # 索引之后追加的记录在打开时重放
+    store.put('a-part-3', 'third')
+
+    assert read_records(chunks_dir) == [(RECORD_PUT, 'a-part-1', '第一段'), (RECORD_PUT, 'a-part-2', 'second'),
+                                        (RECORD_PUT, 'a-part-3', 'third')]
+    with open(os.path.join(chunks_dir, INDEX_FILE), encoding='utf-8') as f:
+        index = json.load(f)
+    assert set(index['chunks']) == {'a-part-1', 'a-part-2'}
+
+    reopened = ChunkStore(chunks_dir)
+    assert reopened.ids() == ['a-part-1', 'a-part-2', 'a-part-3']
+    assert reopened.get_many() == {'a-part-1': '第一段', 'a-part-2': 'second', 'a-part-3': 'third'}
+    assert reopened.size == os.path.getsize(os.path.join(chunks_dir, DATA_FILE))
+
+
+def test_overwrite_keeps_latest_content(chunks_dir):
+    store = ChunkStore(chunks_dir)
+    store.put('a-part-1', 'old')
+    store.put('a-part-1', 'new')
+
+    assert store.get('a-part-1') == 'new'
+    assert ChunkStore(chunks_dir).get('a-part-1') == 'new'
+    assert store.dead_bytes == _HEADER.size + len('a-part-1') + len('old')
+
+
+def test_delete_appends_tombstone(chunks_dir):
+    store = ChunkStore(chunks_dir)
+    store.put('a-part-1', 'one')
+    store.put('a-part-2', 'two')
+
+    assert store.delete('a-part-1') is True
+    assert store.delete('a-part-1') is False
+    assert store.get('a-part-1') is None
+    assert 'a-part-1' not in store
+    assert read_records(chunks_dir)[-1] == (RECORD_DELETE, 'a-part-1', '')
+
+    reopened = ChunkStore(chunks_dir)
+    assert reopened.ids() == ['a-part-2']
+    assert reopened.dead_bytes == store.dead_bytes
+
+
+def test_compaction_thresholds(chunks_dir, monkeypatch):
+    monkeypatch.setattr(chunk_store, 'COMPACT_MIN_BYTES', 100)
+    store = ChunkStore(chunks_dir)
+    store.put('keep', 'k' * 400)
+    store.put('drop', 'd' * 100)
+    store.delete('drop')
+    # 失效数据超过最小字节数，但未超过比例
+    assert store.dead_bytes >= 100
+    assert not store.needs_compaction()
+
+    store.put('keep', 'k' * 10)
+    assert store.needs_compaction()
+
+    store.compact()
+    assert store.dead_bytes == 0
+    assert not store.needs_compaction()
+    assert read_records(chunks_dir) == [(RECORD_PUT, 'keep', 'k' * 10)]
+    assert ChunkStore(chunks_dir).get_many() == {'keep': 'k' * 10}
+
+
+def test_compaction_below_min_bytes(chunks_dir):
+    store = ChunkStore(chunks_dir)
+    store.put('a', 'x')
+    store.delete('a')
+    assert store.dead_bytes >= store.size * chunk_store.COMPACT_RATIO
+    assert not store.needs_compaction()
+
+
+def test_migrates_legacy_txt_files(chunks_dir):
+    os.makedirs(chunks_dir)
+    for name, content in [('a-part-2', 'two'), ('a-part-1', '一')]:
+        with open(os.path.join(chunks_dir, f"{name}.txt"), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    store = ChunkStore(chunks_dir)
+    assert store.ids() == ['a-part-1', 'a-part-2']
+    assert store.get('a-part-1') == '一'
+    assert not [name for name in os.listdir(chunks_dir) if name.endswith('.txt')]
+
+    # 再次打开时不会重复导入
+    assert len(read_records(chunks_dir)) == 2
+    assert ChunkStore(chunks_dir).ids() == ['a-part-1', 'a-part-2']
+
+
+@pytest.mark.parametrize('tail', [b'\x01\x05', _HEADER.pack(RECORD_PUT, 3, 5, 0) + b'abcde'],
+                         ids=['torn', 'bad-checksum'])
+def test_truncates_incomplete_tail(chunks_dir, tail):
+    store = ChunkStore(chunks_dir)
+    store.put('a-part-1', 'one')
+    data_path = os.path.join(chunks_dir, DATA_FILE)
+    valid_size = os.path.getsize(data_path)
+    with open(data_path, 'ab') as f:
+        f.write(tail)
+
+    reopened = ChunkStore(chunks_dir)
+    assert os.path.getsize(data_path) == valid_size
+    assert reopened.get_many() == {'a-part-1': 'one'}
+
+    reopened.put('a-part-2', 'two')
+    assert ChunkStore(chunks_dir).get_many() == {'a-part-1': 'one', 'a-part-2': 'two'}
+
+
+def test_compaction_keeps_records_appended_by_another_store(chunks_dir, monkeypatch):
+    # 同一目录的两个存储实例各自持有锁文件，与两个工作进程相同
+    monkeypatch.setattr(chunk_store, 'COMPACT_MIN_BYTES', 1)
+    first = ChunkStore(chunks_dir)
+    second = ChunkStore(chunks_dir)
+    for i in range(200):
+        first.put(f"old-{i}", 'x' * 100)
+        first.delete(f"old-{i}")
+    first.put('kept', 'kept')
+
+    writer = threading.Thread(target=lambda: [second.put(f"new-{i}", str(i)) for i in range(300)])
+    writer.start()
+    first.compact()
+    writer.join()
+
+    expected = {'kept': 'kept', **{f"new-{i}": str(i) for i in range(300)}}
+    assert first.get_many() == expected
+    assert second.get_many() == expected
+    assert ChunkStore(chunks_dir).get_many() == expected
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from app.core import journal
+from app.core.journal import JsonJournal, JOURNAL_FILE, OP_SET, OP_MERGE, OP_UPSERT, OP_REMOVE, OP_DELETE
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    path = tmp_path / 'project'
+    path.mkdir()
+    return str(path)
+
+
+def read_log(project_dir):
+    with open(os.path.join(project_dir, JOURNAL_FILE), encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def write_file(project_dir, path, data):
+    file_path = os.path.join(project_dir, path)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+async def wait_flushed(store):
+    # 写入在提交后返回，压缩在同一个后台任务中随后执行
+    while store._flushing:
+        await asyncio.sleep(0.001)
+
+
+async def test_replays_records_over_files(project_dir):
+    write_file(project_dir, 'config.json', {'name': 'a', 'size': 1})
+    write_file(project_dir, 'files.json', [{'id': 1}, {'id': 2}])
+    store = JsonJournal(project_dir)
+    await store.write('config.json', OP_MERGE, value={'size': 2})
+    await store.write('files.json', OP_UPSERT, key='id', value={'id': 3})
+    await store.write('files.json', OP_REMOVE, key='id', values=[1])
+    await store.write('toc/a.json', OP_SET, value=['x'])
+    await store.write('toc/a.json', OP_DELETE)
+
+    # JSON文件保持不变，修改只在日志中
+    with open(os.path.join(project_dir, 'config.json'), encoding='utf-8') as f:
+        assert json.load(f) == {'name': 'a', 'size': 1}
+    assert len(read_log(project_dir)) == 5
+
+    reopened = JsonJournal(project_dir)
+    assert reopened.records == 5
+    assert await reopened.read('config.json') == {'name': 'a', 'size': 2}
+    assert await reopened.read('files.json') == [{'id': 2}, {'id': 3}]
+    assert await reopened.read('toc/a.json') is None
+
+
+@pytest.mark.parametrize('tail', [b'{"path":"a.json","op":"set","val', b'not json\n'], ids=['torn', 'invalid'])
+async def test_truncates_incomplete_tail(project_dir, tail):
+    store = JsonJournal(project_dir)
+    await store.write('a.json', OP_SET, value=1)
+    log_path = os.path.join(project_dir, JOURNAL_FILE)
+    valid_size = os.path.getsize(log_path)
+    with open(log_path, 'ab') as f:
+        f.write(tail)
+
+    reopened = JsonJournal(project_dir)
+    assert os.path.getsize(log_path) == valid_size
+    assert await reopened.read('a.json') == 1
+
+    await reopened.write('a.json', OP_SET, value=2)
+    assert [record['value'] for record in read_log(project_dir)] == [1, 2]
+    assert await JsonJournal(project_dir).read('a.json') == 2
+
+
+async def test_group_commit(project_dir, monkeypatch):
+    store = JsonJournal(project_dir)
+    batches = []
+    append = store._append
+    monkeypatch.setattr(store, '_append', lambda data: (batches.append(data), append(data)))
+
+    await asyncio.gather(*(store.write('files.json', OP_UPSERT, key='id', value={'id': i}) for i in range(50)))
+
+    # 同时到达的写入一次写入并 fsync
+    assert len(batches) == 1
+    assert await store.read('files.json') == [{'id': i} for i in range(50)]
+    assert len(read_log(project_dir)) == 50
+
+    await store.write('files.json', OP_REMOVE, key='id', values=[0])
+    assert len(batches) == 2
+
+
+async def test_compaction_writes_files_and_clears_log(project_dir, monkeypatch):
+    monkeypatch.setattr(journal, 'COMPACT_RECORDS', 3)
+    write_file(project_dir, 'old.json', {'a': 1})
+    store = JsonJournal(project_dir)
+    await store.write('config.json', OP_SET, value={'name': 'a'})
+    await store.write('old.json', OP_DELETE)
+    await store.write('toc/a.json', OP_SET, value=['x'])
+    await wait_flushed(store)
+
+    assert store.records == 0
+    assert store.documents == {}
+    assert os.path.getsize(os.path.join(project_dir, JOURNAL_FILE)) == 0
+    assert not os.path.exists(os.path.join(project_dir, 'old.json'))
+    with open(os.path.join(project_dir, 'config.json'), encoding='utf-8') as f:
+        assert json.load(f) == {'name': 'a'}
+    assert await store.read('toc/a.json') == ['x']
+
+    # 压缩后的修改基于写回的文件
+    await store.write('config.json', OP_MERGE, value={'size': 1})
+    assert await JsonJournal(project_dir).read('config.json') == {'name': 'a', 'size': 1}
@@ -0,0 +1,131 @@
+import json
+import os
+import uuid
+
+import pytest
+
+from app.core import question
+from app.core.base import read_json_file, write_json_file
+from app.db.session import engine
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def project_id(tmp_path, monkeypatch):
+    # 数据目录为工作目录下的 local-db，数据库为各测试共用，项目ID不重复
+    monkeypatch.chdir(tmp_path)
+    yield f"project-{uuid.uuid4().hex}"
+    # 连接池中的连接属于当前事件循环
+    await engine.dispose()
+
+
+def write_questions_file(project_id, questions):
+    path = question.get_questions_path(project_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(questions, f, ensure_ascii=False)
+    return path
+
+
+async def test_imports_questions_file_once(project_id):
+    questions = [
+        {'chunkId': 'a-part-2', 'questions': ['问题一', {'question': '问题二', 'label': 'x'}]},
+        {'chunkId': 'a-part-1', 'questions': []}
+    ]
+    path = write_questions_file(project_id, questions)
+
+    assert await question.get_questions(project_id) == questions
+    # 原文件的删除先记录在项目日志中
+    assert await read_json_file(path) is None
+    with open(f"{path}.imported", encoding='utf-8') as f:
+        assert json.load(f) == questions
+
+    # 模拟重新启动：导入后的文件不会再次导入
+    question._imported_projects.discard(project_id)
+    await question.add_questions_for_chunk(project_id, 'a-part-3', ['问题三'])
+    question._imported_projects.discard(project_id)
+    assert await question.get_questions(project_id) == questions + [{'chunkId': 'a-part-3', 'questions': ['问题三']}]
+
+
+async def test_imports_questions_only_in_journal(project_id):
+    questions = [{'chunkId': 'a-part-1', 'questions': ['问题']}]
+    path = question.get_questions_path(project_id)
+    os.makedirs(os.path.dirname(path))
+    await write_json_file(path, questions)
+    assert not os.path.exists(path)
+
+    assert await question.get_questions(project_id) == questions
+    assert await read_json_file(path) is None
+    with open(f"{path}.imported", encoding='utf-8') as f:
+        assert json.load(f) == questions
+
+
+async def test_questions_page_by_prefix(project_id):
+    chunk_ids = [f"a-part-{i}" for i in range(1, 13)] + ['a-part-x-part-1', 'a-part-', 'ab-part-1', 'b-part-1']
+    for chunk_id in chunk_ids:
+        await question.add_questions_for_chunk(project_id, chunk_id, [f"{chunk_id} 的问题"])
+
+    pages = []
+    cursor = None
+    while True:
+        page = await question.get_questions_page(project_id, cursor, 5, 'a-part-')
+        pages.append([item['chunkId'] for item in page['items']])
+        cursor = page['nextCursor']
+        if cursor is None:
+            break
+
+    expected = sorted(f"a-part-{i}" for i in range(1, 13))
+    assert pages == [expected[:5], expected[5:10], expected[10:]]
+    first = await question.get_questions_page(project_id, None, 1, 'a-part-')
+    assert first['items'] == [{'chunkId': 'a-part-1', 'questions': ['a-part-1 的问题']}]
+
+    # 不指定前缀时返回所有文本块
+    items = [item async for item in question.iter_questions(project_id, page_size=3)]
+    assert [item['chunkId'] for item in items] == sorted(chunk_ids)
+
+
+async def test_questions_page_has_questions(project_id):
+    await question.add_questions_for_chunk(project_id, 'a-part-1', ['问题'])
+    await question.add_questions_for_chunk(project_id, 'a-part-2', [])
+    await question.add_questions_for_chunk(project_id, 'a-part-3', ['问题'])
+
+    with_questions = await question.get_questions_page(project_id, chunk_prefix='a-part-', has_questions=True)
+    without_questions = await question.get_questions_page(project_id, chunk_prefix='a-part-', has_questions=False)
+    assert [item['chunkId'] for item in with_questions['items']] == ['a-part-1', 'a-part-3']
+    assert without_questions == {'items': [{'chunkId': 'a-part-2', 'questions': []}], 'nextCursor': None}
+
+
+@pytest.mark.parametrize('batch_size', [3, question.DELETE_BATCH_SIZE])
+async def test_delete_questions_for_chunks_in_batches(project_id, monkeypatch, batch_size):
+    monkeypatch.setattr(question, 'DELETE_BATCH_SIZE', batch_size)
+    # 数量超过批大小，默认批大小时也超过旧版SQLite 999 个变量的限制
+    count = max(batch_size * 3 + 1, 1200)
+    await question.save_questions(project_id, [{'chunkId': f"a-part-{i}", 'questions': [f"问题{i}"]}
+                                               for i in range(count)])
+
+    deleted = await question.delete_questions_for_chunks(project_id, [f"a-part-{i}" for i in range(1, count)] + ['missing'])
+    assert deleted == count - 1
+    assert await question.get_questions(project_id) == [{'chunkId': 'a-part-0', 'questions': ['问题0']}]
+    assert await question.delete_questions_for_chunks(project_id, []) == 0
+
+
+async def test_batch_delete_questions(project_id, monkeypatch):
+    monkeypatch.setattr(question, 'DELETE_BATCH_SIZE', 2)
+    await question.add_questions_for_chunk(project_id, 'a-part-1', ['q1', {'question': 'q2', 'label': 'x'}, 'q3'])
+    await question.add_questions_for_chunk(project_id, 'a-part-2', ['q1', 'q2'])
+
+    deleted = await question.batch_delete_questions(project_id, [
+        {'questionId': 'q1', 'chunkId': 'a-part-1'},
+        {'questionId': 'q2', 'chunkId': 'a-part-1'},
+        {'questionId': 'q2', 'chunkId': 'a-part-2'},
+        {'questionId': 'missing', 'chunkId': 'a-part-2'},
+        {'questionId': 'q1', 'chunkId': 'b-part-1'}
+    ])
+    assert deleted == 3
+    # 文本块保留，问题为空时仍在列表中
+    assert await question.delete_question(project_id, 'q1', 'a-part-2') == 1
+    assert await question.get_questions(project_id) == [
+        {'chunkId': 'a-part-1', 'questions': ['q3']},
+        {'chunkId': 'a-part-2', 'questions': []}
+    ]